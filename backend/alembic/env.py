@@ -6,6 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 
 from app.models import Base
+from app.core.online_migrations import DEFAULT_LOCK_TIMEOUT_MS, TASKS_TABLE, set_lock_timeout
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -22,6 +23,12 @@ if config.config_file_name is not None:
 # target_metadata = None
 target_metadata = Base.metadata 
 
+
+def include_name(name, type_, parent_names):
+    # 在线迁移任务表由 app.core.online_migrations 管理，不参与 autogenerate
+    return not (type_ == "table" and name == TASKS_TABLE)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -44,6 +51,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -66,8 +74,14 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # 迁移语句等待锁超过上限时直接失败，避免排在锁队列中阻塞线上读写
+        # 可通过 `alembic -x lock_timeout_ms=10000 upgrade head` 调整
+        lock_timeout_ms = int(context.get_x_argument(as_dictionary=True).get("lock_timeout_ms", DEFAULT_LOCK_TIMEOUT_MS))
+        set_lock_timeout(connection, lock_timeout_ms)
+        connection.commit()
+
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,31 @@
+"""add user token_version
+
+Revision ID: 30c606970aac
+Revises: ee2179283e84
+Create Date: 2026-10-17 09:40:05.771362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '30c606970aac'
+down_revision: Union[str, Sequence[str], None] = 'ee2179283e84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+    # 吊销过滤器按 updated_at 增量同步
+    op.create_index(op.f('ix_users_updated_at'), 'users', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_updated_at'), table_name='users')
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,29 @@
+"""add users is_superuser
+
+Revision ID: 5c1e9b7d2f40
+Revises: a3808c5be511
+Create Date: 2026-10-17 18:20:31.104527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9b7d2f40'
+down_revision: Union[str, Sequence[str], None] = 'a3808c5be511'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 带常量默认值的 NOT NULL 列在 PostgreSQL 11+ 上只修改元数据，不重写表
+    op.add_column('users', sa.Column('is_superuser', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'is_superuser')
@@ -0,0 +1,41 @@
+"""use uuidv7 server default for users.id
+
+Revision ID: a3808c5be511
+Revises: adfdf1a2cdc9
+Create Date: 2026-10-17 12:41:05.502917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3808c5be511'
+down_revision: Union[str, Sequence[str], None] = 'adfdf1a2cdc9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _supports_uuidv7() -> bool:
+    # uuidv7() 从 PostgreSQL 18 开始内置
+    dialect = op.get_bind().dialect
+    return dialect.name == 'postgresql' and (dialect.server_version_info or (0,)) >= (18,)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 应用写入的新行由 ORM 生成 UUIDv7（app.core.ids.uuid7），无需数据库支持；
+    # 数据库支持时再加上服务端默认值，使绕过 ORM 的写入（手工 SQL、COPY 导入）同样使用 UUIDv7。
+    # 已有的 UUIDv4 主键不做改写，新旧主键共存于同一 UUID 列。
+    if not _supports_uuidv7():
+        return
+    op.alter_column('users', 'id', server_default=sa.text('uuidv7()'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not _supports_uuidv7():
+        return
+    op.alter_column('users', 'id', server_default=None)
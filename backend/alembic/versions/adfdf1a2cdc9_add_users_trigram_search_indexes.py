@@ -0,0 +1,45 @@
+"""add users trigram search indexes
+
+Revision ID: adfdf1a2cdc9
+Revises: ff6eb419f4c9
+Create Date: 2026-10-17 12:10:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'adfdf1a2cdc9'
+down_revision: Union[str, Sequence[str], None] = 'ff6eb419f4c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm 仅 PostgreSQL 可用，其他数据库的搜索退化为普通 LIKE 匹配
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # GIN 索引在大表上构建较慢，使用 CONCURRENTLY 在事务之外构建，期间不阻塞写入
+    create_index_concurrently(
+        'ix_users_full_name_trgm', 'users', ['full_name'],
+        postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'},
+    )
+    create_index_concurrently(
+        'ix_users_email_trgm', 'users', ['email'],
+        postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    drop_index_concurrently('ix_users_email_trgm')
+    drop_index_concurrently('ix_users_full_name_trgm')
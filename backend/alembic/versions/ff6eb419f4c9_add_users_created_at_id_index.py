@@ -0,0 +1,28 @@
+"""add users (created_at, id) index
+
+Revision ID: ff6eb419f4c9
+Revises: 30c606970aac
+Create Date: 2026-10-17 11:02:17.406915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ff6eb419f4c9'
+down_revision: Union[str, Sequence[str], None] = '30c606970aac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_at_id', table_name='users')
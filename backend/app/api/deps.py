@@ -1,16 +1,19 @@
-from typing import Annotated
+import hmac
+import uuid
+from typing import Annotated, Optional
 
-import jwt
 from jwt.exceptions import InvalidTokenError
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import ValidationError
 
 from app.core.db import get_db
 from app.core.config import settings
+from app.core.logger import bind_log_context
+from app.core.revocation import revocation_filter
+from app.core.security import decode_access_token
 from app.models import User
-from app.schemas import TokenPayload
 from app.providers.storage import BaseStorageService,StorageFactory
 from app.services.user_service import UserService
 
@@ -20,7 +23,8 @@ DBSessionDep = Annotated[AsyncSession, Depends(get_db)]
 
 
 def get_storage_service() -> BaseStorageService:
-    return StorageFactory.get_service("cos",settings)
+    # 使用 lifespan 中创建的共享实例，客户端和连接池在请求间复用
+    return StorageFactory.get_shared_service(settings.STORAGE_PROVIDER, settings)
 StorageServiceDep = Annotated[BaseStorageService, Depends(get_storage_service)]
 
 
@@ -36,20 +40,32 @@ TokenDep = Annotated[str, Depends(oauth2_scheme)]
 
 async def get_current_user(user_service:UserServiceDep,token:TokenDep) -> User:
     try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
+        token_data = decode_access_token(token)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = await user_service.get_user_by_id(token_data.sub)
+    if settings.AUTH_STATELESS_TOKENS and token_data.ver is not None:
+        # 无状态模式: 直接由令牌声明构造用户，仅检查进程内吊销过滤器。
+        # 令牌不携带姓名、邮箱，需要资料的接口应从数据库读取（见 /users/me）
+        if revocation_filter.is_revoked(token_data.sub, token_data.ver):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        bind_log_context(user_id=token_data.sub)
+        return User(
+            id=uuid.UUID(token_data.sub),
+            is_active=token_data.act,
+            token_version=token_data.ver,
+            is_superuser=bool(token_data.su),
+        )
+    user = await user_service.get_principal(token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    bind_log_context(user_id=str(user.id))
     return user
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
 
@@ -58,4 +74,25 @@ async def get_current_active_user(current_user: CurrentUserDep) -> User:
     if current_user.is_active is False:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
-CurrentActiveUserDep = Annotated[User, Depends(get_current_active_user)]
\ No newline at end of file
+CurrentActiveUserDep = Annotated[User, Depends(get_current_active_user)]
+
+
+async def get_current_active_superuser(current_user: CurrentActiveUserDep) -> User:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges",
+        )
+    return current_user
+CurrentSuperuserDep = Annotated[User, Depends(get_current_active_superuser)]
+
+
+def verify_metrics_token(authorization: Annotated[Optional[str], Header()] = None) -> None:
+    """校验 Prometheus 抓取 /metrics 时携带的 Bearer 令牌，未配置 METRICS_TOKEN 时一律拒绝。"""
+    scheme, _, token = (authorization or "").partition(" ")
+    expected = settings.METRICS_TOKEN
+    if not expected or scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to read metrics",
+        )
@@ -3,12 +3,43 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRoute
 
+from app.api.middleware import RequestContextMiddleware, ServerTimingMiddleware
 from app.api.v1.api_v1 import api_router
+from app.api.v1.endpoints import internal
 from app.core.config import settings
+from app.core.db import db_engine, db_sessionmaker
+from app.core.hashing import hashing_engine
+from app.core.logger import logger
+from app.core.online_migrations import list_tasks
+from app.core.revocation import revocation_filter
+from app.providers.storage import StorageFactory
+
+async def check_online_migrations() -> None:
+    """启动时检查是否有未执行的在线迁移任务（延迟模式下只登记），有则记录错误日志提醒执行。"""
+    try:
+        async with db_engine.connect() as conn:
+            tasks = await conn.run_sync(list_tasks)
+    except Exception:
+        logger.warning("Failed to check online migration tasks", exc_info=True)
+        return
+    pending = [task.name for task in tasks if task.status != "done"]
+    if pending:
+        logger.error(
+            f"{len(pending)} online migration task(s) not finished: {', '.join(pending)}. "
+            "Run `python -m app.cli online-migrate`"
+        )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await check_online_migrations()
+    if settings.AUTH_STATELESS_TOKENS:
+        revocation_filter.start(db_sessionmaker)
+    # 存储服务在启动时创建一次，客户端连接池在请求间复用
+    await StorageFactory.get_shared_service(settings.STORAGE_PROVIDER, settings).start()
     yield
+    await revocation_filter.stop()
+    await StorageFactory.close_all()
+    hashing_engine.shutdown()
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     """为 OpenAPI 生成更可读的操作ID。"""
@@ -29,12 +60,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 阶段耗时统计，位于请求上下文中间件之内，慢请求日志可以带上 request_id
+app.add_middleware(ServerTimingMiddleware)
+
+# 最外层中间件，访问日志中的耗时覆盖整个请求
+app.add_middleware(RequestContextMiddleware)
+
 @app.get("/", tags=["Default"])
 async def read_root():
     return {"message": f"Welcome to {settings.PROJECT_NAME}"}
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+if settings.METRICS_ENABLED:
+    app.include_router(internal.prometheus_router, tags=["内部"])
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,197 @@
+"""
+请求级中间件
+"""
+
+import functools
+import inspect
+import random
+import time
+import uuid
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logger import logger, new_log_context
+from app.core.metrics import current_request_phases, start_request_phases
+
+REQUEST_ID_HEADER = "x-request-id"
+
+
+def _route_template(scope: Scope) -> str:
+    """
+    返回匹配到的路由模板，例如 /api/v1/users/{user_id}、/api/v1/files/{key:path}，便于按路由聚合。
+    scope["route"].path 可能只是相对于所属 APIRouter 的路径，此时从请求路径中找出被路由正则匹配、
+    且参数值与 path_params 一致的后缀，把它之前的部分作为前缀补上。
+    """
+    route = scope["route"]
+    template = getattr(route, "path", None)
+    path_regex = getattr(route, "path_regex", None)
+    if template is None or path_regex is None:
+        return scope["path"]
+
+    path = scope["path"]
+    path_params = scope.get("path_params", {})
+    for index, char in enumerate(path):
+        if char != "/":
+            continue
+        match = path_regex.match(path[index:])
+        if match and all(
+            route.param_convertors[name].convert(value) == path_params.get(name)
+            for name, value in match.groupdict().items()
+        ):
+            return path[:index] + template
+    return template
+
+
+class RequestContextMiddleware:
+    """
+    为每个请求建立日志上下文：request_id（沿用请求头 X-Request-ID，没有时生成）、method、path，
+    认证后由依赖补充 user_id；请求结束时补充 route、status 和 latency_ms 并记录一条访问日志。
+    INFO 日志的采样决定在请求开始时做出，同一请求的日志整体保留或丢弃。
+    使用纯 ASGI 实现，依赖中对上下文的修改在请求结束时仍然可见。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        context = new_log_context(request_id=request_id, method=scope["method"], path=scope["path"])
+        if settings.LOG_INFO_SAMPLE_RATE < 1:
+            context["sampled"] = random.random() < settings.LOG_INFO_SAMPLE_RATE
+
+        status_code = 500
+        start = time.perf_counter_ns()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", []).append((REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency_ms = (time.perf_counter_ns() - start) / 1_000_000
+            if scope.get("route") is not None:
+                context["route"] = _route_template(scope)
+            logger.info(
+                f"{scope['method']} {scope['path']} {status_code} {latency_ms:.1f}ms",
+                extra={"status": status_code, "latency_ms": round(latency_ms, 3)},
+            )
+
+
+# Server-Timing 中各阶段的输出顺序
+SERVER_TIMING_PHASES = ("db", "db_conn", "hash", "storage", "serialize")
+
+
+def _mark_endpoint_done(endpoint: Callable) -> Callable:
+    """包装路由函数，记录其返回的时刻。保持原函数的同步 / 异步类型，FastAPI 通过 __wrapped__ 解析参数。"""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_endpoint(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                phases = current_request_phases()
+                if phases is not None:
+                    phases.endpoint_done = time.perf_counter_ns()
+        return async_endpoint
+
+    @functools.wraps(endpoint)
+    def sync_endpoint(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            phases = current_request_phases()
+            if phases is not None:
+                phases.endpoint_done = time.perf_counter_ns()
+    return sync_endpoint
+
+
+class TimedAPIRoute(APIRoute):
+    """记录响应序列化耗时（路由函数返回到响应对象构建完成）的路由类，通过 APIRouter(route_class=...) 启用。"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            phases = current_request_phases()
+            if phases is not None and phases.endpoint_done is not None:
+                phases.add("serialize", time.perf_counter_ns() - phases.endpoint_done)
+            return response
+
+        return timed_handler
+
+
+class ServerTimingMiddleware:
+    """
+    统计每个请求的阶段耗时：数据库语句执行（db）、数据库连接占用（db_conn）、密码哈希（hash）、
+    对象存储（storage）和响应序列化（serialize）。
+    SERVER_TIMING_ENABLED 时通过 Server-Timing 响应头返回；总耗时超过 SLOW_REQUEST_THRESHOLD_MS 的请求
+    按 SLOW_REQUEST_LOG_SAMPLE_RATE 抽样记录一条带阶段明细的 WARNING 日志。
+    总耗时截至响应头发送，不含流式响应体的传输时间。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases = start_request_phases()
+        start = time.perf_counter_ns()
+        total_ns = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal total_ns
+            if message["type"] == "http.response.start":
+                total_ns = time.perf_counter_ns() - start
+                if settings.SERVER_TIMING_ENABLED:
+                    message.setdefault("headers", []).append(
+                        (b"server-timing", _server_timing_header(phases.totals, total_ns).encode("latin-1"))
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            total_ns = total_ns or time.perf_counter_ns() - start
+            total_ms = total_ns / 1_000_000
+            if total_ms >= settings.SLOW_REQUEST_THRESHOLD_MS and random.random() < settings.SLOW_REQUEST_LOG_SAMPLE_RATE:
+                breakdown = {phase: round(duration / 1_000_000, 3) for phase, duration in phases.totals.items()}
+                details = ", ".join(f"{phase}={duration:.1f}ms" for phase, duration in breakdown.items())
+                logger.warning(
+                    f"Slow request {scope['method']} {scope['path']} took {total_ms:.1f}ms ({details or 'no phases'})",
+                    extra={"phases_ms": breakdown, "total_ms": round(total_ms, 3)},
+                )
+
+
+def _server_timing_header(totals: dict[str, int], total_ns: int) -> str:
+    entries = [f"{phase};dur={totals[phase] / 1_000_000:.3f}" for phase in SERVER_TIMING_PHASES if phase in totals]
+    entries.extend(
+        f"{phase};dur={duration / 1_000_000:.3f}" for phase, duration in totals.items() if phase not in SERVER_TIMING_PHASES
+    )
+    entries.append(f"total;dur={total_ns / 1_000_000:.3f}")
+    return ", ".join(entries)
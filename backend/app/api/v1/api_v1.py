@@ -1,11 +1,18 @@
 from fastapi import APIRouter
 
 from app.api.v1.endpoints import (
+    files,
+    internal,
     login, 
     users,
 )
+from app.core.config import settings
 
 api_router = APIRouter()
 
 api_router.include_router(login.router,prefix="/login",tags=["用户验证"])
-api_router.include_router(users.router,prefix="/users", tags=["用户"])
\ No newline at end of file
+api_router.include_router(users.router,prefix="/users", tags=["用户"])
+api_router.include_router(files.router,prefix="/files", tags=["文件"])
+
+if settings.METRICS_ENABLED:
+    api_router.include_router(internal.router,prefix="/internal",tags=["内部"])
\ No newline at end of file
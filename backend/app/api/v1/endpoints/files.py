@@ -0,0 +1,180 @@
+import datetime
+import re
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.api.deps import CurrentActiveUserDep, StorageServiceDep
+from app.api.middleware import TimedAPIRoute
+from app.core.config import settings
+from app.models import User
+from app.providers.storage import BaseStorageService, InvalidRangeError, LocalStorageService, ObjectInfo
+
+router = APIRouter(route_class=TimedAPIRoute)
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _normalize_range(value: str) -> Optional[str]:
+    """
+    只支持单个字节范围。多个范围或格式错误时忽略 Range 头，返回完整内容（RFC 9110 允许）。
+    """
+    match = _RANGE_PATTERN.match(value.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return f"bytes={start}-{end}"
+
+
+def _user_key(current_user: User, key: str) -> str:
+    """
+    将请求中的文件路径限定到当前用户的目录下，用户只能读写自己上传的文件。
+    拒绝绝对路径、空路径段和 . / .. 路径段，避免拼接后越出用户目录。
+    """
+    segments = key.split("/")
+    if key.startswith("/") or "\\" in key or any(segment in ("", ".", "..") for segment in segments):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file key")
+    return f"{current_user.id}/{key}"
+
+
+def _if_range_matches(if_range: str, info: ObjectInfo) -> bool:
+    """If-Range 与当前对象一致时才返回部分内容，否则返回完整内容。"""
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # If-Range 只允许强校验，弱 ETag 一律视为不匹配
+        return not if_range.startswith("W/") and info.etag == if_range
+    try:
+        date = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    return info.last_modified is not None and info.last_modified.replace(microsecond=0) == date
+
+
+async def _local_file_response(storage: LocalStorageService, key: str) -> FileResponse:
+    """直接发送本地文件：Range / If-Range 由 FileResponse 处理，服务器支持时走 sendfile 零拷贝发送。"""
+    path = storage.resolve_file(key)
+    info = await storage.head_object(key) if path is not None else None
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return FileResponse(
+        path,
+        media_type=info.content_type or "application/octet-stream",
+        headers={"ETag": info.etag},
+    )
+
+
+def _signed_storage(
+    storage: BaseStorageService, method: str, key: str, expires: int, signature: str, content_type: str = ""
+) -> LocalStorageService:
+    # 签名路由只在使用 local 存储时可用
+    if not isinstance(storage, LocalStorageService):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not storage.verify_signature(method, key, expires, signature, content_type):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature")
+    return storage
+
+
+@router.get("/_signed/{key:path}")
+async def download_signed_file(
+    key: str,
+    storage: StorageServiceDep,
+    expires: int = Query(...),
+    signature: str = Query(...),
+):
+    """通过 local 存储生成的预签名 URL 下载文件，无需登录。"""
+    local_storage = _signed_storage(storage, "GET", key, expires, signature)
+    return await _local_file_response(local_storage, key)
+
+
+@router.put("/_signed/{key:path}")
+async def upload_signed_file(
+    key: str,
+    request: Request,
+    storage: StorageServiceDep,
+    expires: int = Query(...),
+    signature: str = Query(...),
+):
+    """通过 local 存储生成的预签名 URL 上传文件，请求头的 Content-Type 必须与签名时一致。"""
+    content_type = request.headers.get("content-type") or ""
+    local_storage = _signed_storage(storage, "PUT", key, expires, signature, content_type)
+    if not await local_storage.upload_from_stream(key, request.stream(), content_type):
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Upload failed")
+    return {"key": key}
+
+
+@router.get("/{key:path}")
+async def download_file(
+    key: str,
+    request: Request,
+    storage: StorageServiceDep,
+    current_user: CurrentActiveUserDep,
+):
+    """
+    流式下载当前用户的文件，支持 Range / If-Range 断点续传。
+    文件按固定大小分块从存储读取并转发，单个下载的内存占用不超过一个分块。
+    """
+    key = _user_key(current_user, key)
+    if isinstance(storage, LocalStorageService):
+        return await _local_file_response(storage, key)
+
+    byte_range = request.headers.get("range")
+    byte_range = _normalize_range(byte_range) if byte_range else None
+
+    if_range = request.headers.get("if-range")
+    if byte_range and if_range:
+        info = await storage.head_object(key)
+        if info is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        if not _if_range_matches(if_range, info):
+            byte_range = None
+
+    try:
+        stream = await storage.open_stream(key, byte_range, settings.STORAGE_DOWNLOAD_CHUNK_SIZE)
+    except InvalidRangeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            detail=str(e),
+            headers={"Content-Range": f"bytes */{e.size}"} if e.size is not None else None,
+        )
+    if stream is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(stream.content_length)}
+    if stream.info.etag:
+        headers["ETag"] = stream.info.etag
+    if stream.info.last_modified:
+        headers["Last-Modified"] = format_datetime(
+            stream.info.last_modified.astimezone(datetime.timezone.utc), usegmt=True
+        )
+    if stream.content_range:
+        headers["Content-Range"] = stream.content_range
+
+    return StreamingResponse(
+        stream.chunks,
+        status_code=status.HTTP_206_PARTIAL_CONTENT if stream.content_range else status.HTTP_200_OK,
+        media_type=stream.info.content_type or "application/octet-stream",
+        headers=headers,
+    )
+
+
+@router.put("/{key:path}")
+async def upload_file(
+    key: str,
+    request: Request,
+    storage: StorageServiceDep,
+    current_user: CurrentActiveUserDep,
+):
+    """
+    流式上传文件到当前用户的目录，请求体即文件内容。
+    请求体边接收边分片并发上传到存储，不会整体读入内存；失败时不会留下不完整的对象。
+    """
+    content_type = request.headers.get("content-type") or "application/octet-stream"
+    if not await storage.upload_from_stream(_user_key(current_user, key), request.stream(), content_type):
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Upload failed")
+    return {"key": key}
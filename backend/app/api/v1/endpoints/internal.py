@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import CurrentSuperuserDep, verify_metrics_token
+from app.core.metrics import metrics_registry
+
+router = APIRouter()
+
+# 挂载在应用根路径下的 /metrics，供 Prometheus 抓取，需携带 METRICS_TOKEN
+prometheus_router = APIRouter(dependencies=[Depends(verify_metrics_token)])
+
+@router.get("/metrics")
+async def read_internal_metrics(current_user: CurrentSuperuserDep) -> dict:
+    """
+    内部运行指标：连接池、缓存、密码哈希队列、各操作的耗时统计等，仅超级用户可用。
+    """
+    return metrics_registry.collect()
+
+
+@prometheus_router.get("/metrics", include_in_schema=False)
+async def read_prometheus_metrics() -> PlainTextResponse:
+    """Prometheus 文本格式的指标：耗时直方图以及内部指标中的数值项。"""
+    return PlainTextResponse(metrics_registry.render_prometheus(), media_type="text/plain; version=0.0.4")
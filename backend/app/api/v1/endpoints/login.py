@@ -5,11 +5,37 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.api.deps import UserServiceDep
-from app.schemas import Token
+from app.api.middleware import TimedAPIRoute
+from app.models import User
+from app.schemas import Token, TokenRefreshRequest
 from app.core.config import settings
+from app.core.hashing import HashingBusyError
 from app.core.security import create_access_token
+from app.core.token_store import refresh_token_store
+from app.services.user_service import UserService
+
+router = APIRouter(route_class=TimedAPIRoute)
+
+# 未配置 ACCESS_TOKEN_EXPIRE_MINUTES 时的访问令牌有效期（分钟）
+_SHORT_ACCESS_TOKEN_MINUTES = 15
+_LONG_ACCESS_TOKEN_MINUTES = 60 * 24 * 8
+
+
+def _access_token_expire_minutes() -> int:
+    if settings.ACCESS_TOKEN_EXPIRE_MINUTES is not None:
+        return settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    # 只有客户端能用刷新令牌续期时才缩短访问令牌的有效期
+    return _SHORT_ACCESS_TOKEN_MINUTES if settings.REFRESH_TOKENS_ENABLED else _LONG_ACCESS_TOKEN_MINUTES
+
+
+def _create_user_access_token(user_service: UserService, user: User) -> str:
+    access_token_expires = timedelta(minutes=_access_token_expire_minutes())
+    return create_access_token(
+        subject=user.id,
+        expires_delta=access_token_expires,
+        extra_claims=user_service.token_claims(user) if settings.AUTH_STATELESS_TOKENS else None,
+    )
 
-router = APIRouter()
 
 @router.post("/access-token", response_model=Token)
 async def login_access_token(
@@ -21,23 +47,59 @@ async def login_access_token(
     """
     try:
         user = await user_service.authenticate_user(form_data.username, form_data.password)
+    except HashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+            )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-    
+
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
             )
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=user.id,
-        expires_delta=access_token_expires
-    )
-    
+
+    return Token(
+        access_token=_create_user_access_token(user_service, user),
+        token_type="bearer",
+        refresh_token=await refresh_token_store.issue(str(user.id)) if settings.REFRESH_TOKENS_ENABLED else None,
+        )
+
+
+@router.post("/refresh-token", response_model=Token)
+async def login_refresh_token(
+    user_service: UserServiceDep,
+    refresh_request: TokenRefreshRequest,
+) -> Token:
+    """
+    Exchange a refresh token for a new access token and a rotated refresh token.
+    """
+    if not settings.REFRESH_TOKENS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Refresh tokens are disabled")
+    rotated = await refresh_token_store.rotate(refresh_request.refresh_token)
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+            )
+    user_id, new_refresh_token = rotated
+
+    user = await user_service.get_principal(user_id)
+    if not user or not user.is_active:
+        await refresh_token_store.revoke_user(user_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
+            )
+
     return Token(
-        access_token=access_token,
+        access_token=_create_user_access_token(user_service, user),
         token_type="bearer",
-        )
\ No newline at end of file
+        refresh_token=new_refresh_token,
+        )
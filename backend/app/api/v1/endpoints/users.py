@@ -1,11 +1,19 @@
 import uuid
+from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 
-from app.api.deps import UserServiceDep, CurrentActiveUserDep
-from app.schemas import UserCreate, UserPublic, UserUpdate
+from app.api.deps import UserServiceDep, CurrentActiveUserDep, CurrentSuperuserDep
+from app.api.middleware import TimedAPIRoute
+from app.core.config import settings
+from app.core.db import db_sessionmaker
+from app.core.hashing import HashingBusyError
+from app.schemas import UserCreate, UserImportReport, UserPage, UserPublic, UserUpdate
+from app.services.user_import import import_users
+from app.services.user_service import UserSearchTimeout, UserService, decode_cursor
 
-router = APIRouter()
+router = APIRouter(route_class=TimedAPIRoute)
 
 @router.post("/", response_model=UserPublic)
 async def create_user(
@@ -18,20 +26,108 @@ async def create_user(
     try:
         new_user = await user_service.create_user(user_create=user_create)
         return new_user
+    except HashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
 
+@router.get("/", response_model=UserPage)
+async def list_users(
+    user_service: UserServiceDep,
+    current_user: CurrentSuperuserDep,
+    limit: int = Query(100, ge=1, le=1000, description="每页条数（format=ndjson 时忽略）。"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor。"),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson 时流式导出游标之后的全部用户。"),
+):
+    """
+    按创建时间键集分页列出用户，仅管理员可用。
+    """
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if format == "ndjson":
+        async def export_lines():
+            # 流式响应在依赖清理之后才开始发送，因此使用独立的会话
+            async with db_sessionmaker() as session:
+                async for row in UserService(session).stream_users(cursor):
+                    yield UserPublic.model_validate(row).model_dump_json() + "\n"
+
+        return StreamingResponse(export_lines(), media_type="application/x-ndjson")
+
+    rows, next_cursor = await user_service.list_users(limit=limit, cursor=cursor)
+    return UserPage(items=[UserPublic.model_validate(row) for row in rows], next_cursor=next_cursor)
+
+@router.get("/search", response_model=list[UserPublic])
+async def search_users(
+    user_service: UserServiceDep,
+    current_user: CurrentSuperuserDep,
+    q: str = Query(..., min_length=3, max_length=100, description="搜索词，匹配姓名或邮箱（至少 3 个字符）。"),
+    mode: Literal["substring", "prefix"] = Query("substring", description="匹配方式：子串或前缀。"),
+    limit: int = Query(20, ge=1, le=settings.USER_SEARCH_MAX_LIMIT, description="最多返回的结果数。"),
+):
+    """
+    按姓名或邮箱搜索用户，结果按匹配程度排序，仅管理员可用。
+    """
+    try:
+        rows = await user_service.search_users(q, mode=mode, limit=limit, timeout_ms=settings.USER_SEARCH_TIMEOUT_MS)
+    except UserSearchTimeout as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    return [UserPublic.model_validate(row) for row in rows]
+
+@router.post("/import", response_model=UserImportReport)
+async def import_users_file(
+    file: UploadFile,
+    user_service: UserServiceDep,
+    current_user: CurrentSuperuserDep,
+    format: Optional[Literal["ndjson", "csv"]] = Query(None, description="文件格式，缺省时根据文件名/类型判断。"),
+):
+    """
+    批量导入用户，支持 NDJSON（每行一个 JSON 对象）或带表头的 CSV，
+    字段与创建用户一致: full_name, email, password。返回各状态的行数和未成功行的明细。仅管理员可用。
+    密码哈希繁忙时已提交的批次保留，其余行在报告中标记为 failed，可从 retry_from_row 起重新导入。
+    """
+    if format is None:
+        is_csv = (file.content_type or "").startswith("text/csv") or (file.filename or "").lower().endswith(".csv")
+        format = "csv" if is_csv else "ndjson"
+
+    return await import_users(
+        user_service,
+        file,
+        format,
+        settings.USER_IMPORT_BATCH_SIZE,
+        max_line_bytes=settings.USER_IMPORT_MAX_LINE_BYTES,
+        max_report_rows=settings.USER_IMPORT_MAX_REPORT_ROWS,
+    )
+
 @router.get("/me", response_model=UserPublic)
 async def read_user_me(
     current_user: CurrentActiveUserDep,
+    user_service: UserServiceDep,
 ):
     """
     获取当前用户信息。
+    无状态令牌模式下认证得到的用户不含资料字段，从认证主体缓存或数据库读取，资料修改后立即可见。
     """
-    return current_user
+    if not settings.AUTH_STATELESS_TOKENS:
+        return current_user
+    user = await user_service.get_principal(current_user.id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user
 
 @router.put("/{user_id}", response_model=UserPublic)
 async def update_user(
@@ -49,5 +145,11 @@ async def update_user(
     try:
         updated_user = await user_service.update_user(user_id=user_id, user_update=user_update)
         return updated_user
+    except HashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="更新用户异常")
\ No newline at end of file
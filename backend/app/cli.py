@@ -0,0 +1,93 @@
+"""
+命令行工具
+
+用法:
+    python -m app.cli online-migrate [--task NAME ...] [--lock-timeout-ms 5000]
+        执行迁移中登记的在线迁移任务（CONCURRENTLY 建索引、分批回填），可随时中断后重新执行。
+    python -m app.cli online-status
+        查看在线迁移任务的状态和进度。
+    python -m app.cli set-superuser EMAIL [--revoke]
+        授予（或撤销）指定用户的管理员权限。
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from sqlalchemy import update
+
+from app.core.cache import principal_cache
+from app.core.db import db_engine, db_sessionmaker
+from app.core.logger import log_execution_time
+from app.core.online_migrations import DEFAULT_LOCK_TIMEOUT_MS, list_tasks, run_pending_tasks
+from app.models import User
+
+
+@log_execution_time
+async def online_migrate(names: list[str], lock_timeout_ms: int) -> int:
+    async with db_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        count = await conn.run_sync(run_pending_tasks, names, lock_timeout_ms)
+    await db_engine.dispose()
+    return count
+
+
+async def online_status() -> list:
+    async with db_engine.connect() as conn:
+        tasks = await conn.run_sync(list_tasks)
+    await db_engine.dispose()
+    return tasks
+
+
+async def set_superuser(email: str, is_superuser: bool) -> bool:
+    async with db_sessionmaker() as session:
+        # 同时递增令牌版本，使携带旧权限声明的无状态令牌失效
+        user_id = await session.scalar(
+            update(User)
+            .where(User.email == email)
+            .values(is_superuser=is_superuser, token_version=User.token_version + 1)
+            .returning(User.id)
+        )
+        await session.commit()
+    if user_id is not None:
+        await principal_cache.invalidate(str(user_id))
+    await db_engine.dispose()
+    return user_id is not None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("online-migrate", help="执行未完成的在线迁移任务")
+    migrate_parser.add_argument("--task", action="append", default=[], help="只执行指定名称的任务，可重复")
+    migrate_parser.add_argument("--lock-timeout-ms", type=int, default=DEFAULT_LOCK_TIMEOUT_MS, help="等待锁的上限（毫秒）")
+    subparsers.add_parser("online-status", help="查看在线迁移任务状态")
+    superuser_parser = subparsers.add_parser("set-superuser", help="授予或撤销用户的管理员权限")
+    superuser_parser.add_argument("email", help="用户邮箱")
+    superuser_parser.add_argument("--revoke", action="store_true", help="撤销管理员权限")
+
+    args = parser.parse_args(argv)
+    # 进度日志输出到控制台
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "online-migrate":
+        count = asyncio.run(online_migrate(args.task, args.lock_timeout_ms))
+        print(f"{count} online migration task(s) executed")
+    elif args.command == "set-superuser":
+        if not asyncio.run(set_superuser(args.email, not args.revoke)):
+            print(f"User not found: {args.email}", file=sys.stderr)
+            return 1
+        print(f"{args.email}: is_superuser={not args.revoke}")
+    else:
+        tasks = asyncio.run(online_status())
+        if not tasks:
+            print("No online migration tasks")
+        for task in tasks:
+            print(f"{task.name}\t{task.kind}\t{task.status}\trows_done={task.rows_done}\tlast_key={task.last_key}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+缓存模块
+提供认证主体（已登录用户）缓存，避免每个受保护请求都访问数据库；
+以及已验证令牌缓存，避免对同一令牌重复进行 JWT 签名校验。
+"""
+
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import Settings, settings
+from app.core.metrics import metrics_registry
+
+
+class BasePrincipalCache(ABC):
+    """
+    认证主体缓存的抽象基类。
+    缓存值是可 JSON 序列化的用户快照 (dict)，键为用户ID字符串。
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: dict) -> None:
+        pass
+
+    @abstractmethod
+    async def invalidate(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        pass
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self) -> dict[str, Any]:
+        """返回命中/未命中计数，用于监控。"""
+        total = self.hits + self.misses
+        return {
+            "backend": self.__class__.__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class NullPrincipalCache(BasePrincipalCache):
+    """不做任何缓存，每次都回源数据库。"""
+
+    async def _get(self, key: str) -> Optional[dict]:
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        return None
+
+    async def invalidate(self, key: str) -> None:
+        return None
+
+    async def clear(self) -> None:
+        return None
+
+
+class InMemoryPrincipalCache(BasePrincipalCache):
+    """
+    进程内缓存，带 TTL 过期和 LRU 淘汰。
+    仅在事件循环线程中访问，因此无需加锁。
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        super().__init__(ttl_seconds)
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.evictions = 0
+
+    async def _get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {**super().stats(), "size": len(self._entries), "evictions": self.evictions}
+
+
+class RedisPrincipalCache(BasePrincipalCache):
+    """
+    基于 Redis 的共享缓存，适用于多进程/多实例部署。
+    client 只需实现 redis.asyncio 的 get/set(ex=)/delete/scan_iter 接口，
+    因此测试时可以用内存实现替代。
+    """
+
+    def __init__(self, client: Any, ttl_seconds: int, prefix: str = "auth:principal:"):
+        super().__init__(ttl_seconds)
+        self.client = client
+        self.prefix = prefix
+
+    async def _get(self, key: str) -> Optional[dict]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    async def set(self, key: str, value: dict) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value, default=str), ex=self.ttl_seconds)
+
+    async def invalidate(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        async for redis_key in self.client.scan_iter(match=f"{self.prefix}*"):
+            await self.client.delete(redis_key)
+
+
+class VerifiedTokenCache:
+    """
+    已验证 JWT 的进程内 LRU 缓存。
+
+    键是以签名密钥为 key 的 BLAKE2b 摘要，因此不会在内存中保存原始令牌，
+    且密钥轮换后旧条目自然失效；条目在令牌的 exp 时间点过期。
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str, secret: str) -> bytes:
+        key = hashlib.sha256(secret.encode()).digest()
+        return hashlib.blake2b(token.encode(), key=key, digest_size=32).digest()
+
+    def get(self, token: str, secret: str) -> Optional[Any]:
+        digest = self._digest(token, secret)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return value
+
+    def set(self, token: str, secret: str, value: Any, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        digest = self._digest(token, secret)
+        self._entries[digest] = (expires_at, value)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存，在签名密钥轮换或需要强制重新校验时调用。"""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def create_redis_client(settings: Settings) -> Any:
+    """按需导入 redis，避免未使用 Redis 时引入额外依赖。"""
+    try:
+        from redis import asyncio as redis_asyncio
+    except ImportError as e:
+        raise RuntimeError("Redis backend requires the 'redis' package: pip install redis") from e
+    return redis_asyncio.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def build_principal_cache(settings: Settings) -> BasePrincipalCache:
+    backend = settings.AUTH_CACHE_BACKEND.lower()
+    if backend == "memory":
+        return InMemoryPrincipalCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_SIZE)
+    if backend == "redis":
+        return RedisPrincipalCache(create_redis_client(settings), settings.AUTH_CACHE_TTL_SECONDS)
+    if backend == "none":
+        return NullPrincipalCache(settings.AUTH_CACHE_TTL_SECONDS)
+    raise ValueError(f"不支持的认证缓存后端: {settings.AUTH_CACHE_BACKEND}. 可用选项: ['memory', 'redis', 'none']")
+
+
+# 全局认证主体缓存实例
+principal_cache = build_principal_cache(settings)
+
+# 全局已验证令牌缓存实例
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_MAX_SIZE)
+
+metrics_registry.register("principal_cache", principal_cache.stats)
+metrics_registry.register("token_cache", token_cache.stats)
@@ -1,20 +1,348 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker,create_async_engine
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from app.core.config import Settings, settings
+from app.core.logger import bind_log_context, logger
+from app.core.metrics import current_request_phases, metrics_registry
+
+# session.info 中的标记：为 True 时该会话的所有语句都发往主库
+USE_PRIMARY_KEY = "use_primary"
+# session.info 中记录该会话选中的只读副本
+REPLICA_KEY = "replica"
+
+
+class PoolStats:
+    """连接池运行时统计：签出等待时间、连接创建/关闭（连接抖动）等。"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.checkout_timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.total_wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_hold(self, seconds: float) -> None:
+        self.total_hold_seconds += seconds
+        self.max_hold_seconds = max(self.max_hold_seconds, seconds)
+
+
+class ConnectionUsage:
+    """单个请求占用数据库连接的统计：签出次数和累计占用时长。"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.hold_seconds = 0.0
+
+
+# 当前请求的连接占用统计，由 get_db 设置，连接池事件中累加
+_connection_usage: ContextVar[Optional[ConnectionUsage]] = ContextVar("connection_usage", default=None)
+
+# 每个请求累计占用数据库连接的时长
+connection_hold_histogram = metrics_registry.histogram(
+    "db_request_connection_hold_seconds", "Total time a request held database connections"
+)
+
+
+def report_connection_usage(usage: ConnectionUsage) -> None:
+    """
+    请求的会话关闭后汇报连接占用：写入访问日志字段（db_checkouts / db_hold_ms）和直方图。
+    未访问数据库的请求不记录。
+    """
+    if not usage.checkouts:
+        return
+    connection_hold_histogram.observe(usage.hold_seconds)
+    bind_log_context(db_checkouts=usage.checkouts, db_hold_ms=round(usage.hold_seconds * 1000, 3))
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """记录签出等待时间的连接池。"""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.checkout_timeouts += 1
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+def _engine_options(url: str, settings: Settings) -> dict[str, Any]:
+    options: dict[str, Any] = {"echo": settings.DB_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer 事务模式下连接在事务间复用，不能依赖服务端预编译语句
+        options["poolclass"] = NullPool
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    elif make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def instrument_engine(engine: AsyncEngine) -> PoolStats:
+    """为引擎的连接池挂载事件监听，返回对应的统计对象。"""
+    stats = PoolStats()
+    pool = engine.sync_engine.pool
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        pool.stats = stats
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_connection, connection_record):
+        stats.closes += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        connection_record.info["usage"] = _connection_usage.get()
+        connection_record.info["phases"] = current_request_phases()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+        if connection_record is None:
+            return
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        usage = connection_record.info.pop("usage", None)
+        phases = connection_record.info.pop("phases", None)
+        if checked_out_at is None:
+            return
+        held = time.perf_counter() - checked_out_at
+        stats.record_hold(held)
+        if usage is not None:
+            usage.checkouts += 1
+            usage.hold_seconds += held
+        if phases is not None:
+            # 连接在响应头发送前归还时计入 Server-Timing 的 db_conn 阶段
+            phases.add("db_conn", int(held * 1e9))
+
+    return stats
+
+
+def track_query_time(engine: AsyncEngine) -> None:
+    """把语句执行时间计入当前请求的 db 阶段，用于 Server-Timing 和慢请求日志。"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        phases = current_request_phases()
+        if phases is not None and context is not None:
+            phases.enter("db")
+            context._request_phases = phases
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        phases = getattr(context, "_request_phases", None)
+        if phases is not None:
+            del context._request_phases
+            phases.exit("db")
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _on_execute_error(exception_context):
+        context = exception_context.execution_context
+        phases = getattr(context, "_request_phases", None)
+        if phases is not None:
+            del context._request_phases
+            phases.exit("db")
+
+
+def pool_status(engine: AsyncEngine, stats: PoolStats) -> dict[str, Any]:
+    """导出连接池的实时状态与累计统计。"""
+    pool = engine.sync_engine.pool
+    status: dict[str, Any] = {
+        "pool_class": pool.__class__.__name__,
+        "checkouts": stats.checkouts,
+        "checkins": stats.checkins,
+        "connects": stats.connects,
+        "closes": stats.closes,
+        "invalidations": stats.invalidations,
+        "checkout_timeouts": stats.checkout_timeouts,
+        "avg_checkout_wait_seconds": stats.total_wait_seconds / stats.checkouts if stats.checkouts else 0.0,
+        "max_checkout_wait_seconds": stats.max_wait_seconds,
+        "avg_hold_seconds": stats.total_hold_seconds / stats.checkins if stats.checkins else 0.0,
+        "max_hold_seconds": stats.max_hold_seconds,
+    }
+    if hasattr(pool, "checkedout"):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    return status
+
+
+class ReplicaSelector:
+    """
+    在只读副本之间轮询选择，连接出错的副本在冷却时间内被跳过。
+    没有可用副本时返回 None，由调用方回退到主库。
+    """
+
+    def __init__(self, engines: list[AsyncEngine], retry_seconds: int):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._unhealthy_until: dict[int, float] = {}
+        self._next = 0
+        for index, engine in enumerate(engines):
+            self._watch(index, engine)
+
+    def _watch(self, index: int, engine: AsyncEngine) -> None:
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def _on_error(context):
+            # 连接失败或连接断开时才认为副本不健康，普通 SQL 错误不影响
+            if context.is_disconnect or context.connection is None:
+                self.mark_unhealthy(index)
+
+    def mark_unhealthy(self, index: int) -> None:
+        logger.warning(f"Read replica #{index} marked unhealthy for {self.retry_seconds}s")
+        self._unhealthy_until[index] = time.monotonic() + self.retry_seconds
+
+    def is_healthy(self, index: int) -> bool:
+        return self._unhealthy_until.get(index, 0.0) <= time.monotonic()
+
+    def choose(self) -> Optional[AsyncEngine]:
+        for _ in range(len(self.engines)):
+            index = self._next % len(self.engines)
+            self._next += 1
+            if self.is_healthy(index):
+                return self.engines[index]
+        return None
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话。
+    没有写入过的会话中，普通 SELECT 发往只读副本（同一会话固定使用同一个副本）；
+    写入、刷新 (flush)、SELECT ... FOR UPDATE 及其他语句发往主库，
+    并使该会话此后的所有语句都留在主库，保证读到自己的写入。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kw):
+        # 显式指定的 bind（见 primary_bind）直接使用，不改变会话的路由状态
+        if bind is not None:
+            return bind
+        if not self.info.get(USE_PRIMARY_KEY) and not self._flushing and _is_plain_select(clause):
+            replica = self.info.get(REPLICA_KEY)
+            if replica is None:
+                replica = replica_selector.choose()
+                if replica is None:
+                    return db_engine.sync_engine
+                self.info[REPLICA_KEY] = replica
+            return replica.sync_engine
+        self.info[USE_PRIMARY_KEY] = True
+        return db_engine.sync_engine
+
+
+def _is_plain_select(clause: Any) -> bool:
+    return (
+        clause is not None
+        and getattr(clause, "is_select", False)
+        and getattr(clause, "_for_update_arg", None) is None
+    )
+
+
+def use_primary(session: AsyncSession) -> None:
+    """强制该会话后续的所有语句都发往主库，用于需要强一致读取的写流程。"""
+    session.info[USE_PRIMARY_KEY] = True
+
+
+def primary_bind() -> dict[str, Any]:
+    """
+    作为单条语句的 bind_arguments，使其发往主库而不固定整个会话，之后仍可用 release_connection 提前归还连接。
+    用于结果会被缓存、不能读到副本延迟数据的查询。
+    """
+    return {"bind": db_engine.sync_engine}
+
+
+async def release_connection(session: AsyncSession) -> None:
+    """
+    只读操作结束后立即结束当前事务，把连接归还连接池，而不是等到请求结束才释放。
+    会话已固定到主库（可能有未提交的写入）或有待刷新的变更时不做任何处理。
+    expire_on_commit=False，已加载的对象在提交后仍可继续使用。
+    """
+    if (
+        session.in_transaction()
+        and not session.info.get(USE_PRIMARY_KEY)
+        and not (session.new or session.dirty or session.deleted)
+    ):
+        await session.commit()
 
-from app.core.config import settings
 
 # 1. 创建数据库引擎
-db_engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=settings.DB_ECHO)
+db_engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, **_engine_options(settings.SQLALCHEMY_DATABASE_URI, settings))
+db_pool_stats = instrument_engine(db_engine)
+track_query_time(db_engine)
+metrics_registry.register("db_pool", lambda: pool_status(db_engine, db_pool_stats))
+
+# 只读副本引擎（可选）
+replica_engines = [create_async_engine(uri, **_engine_options(uri, settings)) for uri in settings.SQLALCHEMY_REPLICA_URIS]
+replica_pool_stats = [instrument_engine(engine) for engine in replica_engines]
+for engine in replica_engines:
+    track_query_time(engine)
+replica_selector = ReplicaSelector(replica_engines, settings.DB_REPLICA_RETRY_SECONDS)
+metrics_registry.register(
+    "db_replicas",
+    lambda: {
+        f"replica_{index}": {"healthy": replica_selector.is_healthy(index), **pool_status(engine, stats)}
+        for index, (engine, stats) in enumerate(zip(replica_engines, replica_pool_stats))
+    },
+)
 
 # 2. 创建一个可复用的 sessionmaker (会话工厂)
-db_sessionmaker = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+db_sessionmaker = async_sessionmaker(
+    db_engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     一个依赖提供函数，为每个请求创建一个新的DB会话。
     它使用全局的 db_sessionmaker 创建会话。
+    会话在第一次执行语句时才从连接池签出连接，未访问数据库的请求（例如命中认证缓存）不占用连接。
+    连接占用次数和时长记录在 session.info["connection_usage"] 中，会话关闭后汇报（见 report_connection_usage）。
     """
-    
-    # 使用 sessionmaker 创建一个新的会话
-    async with db_sessionmaker() as session:
-            yield session
\ No newline at end of file
+    usage = ConnectionUsage()
+    _connection_usage.set(usage)
+
+    try:
+        # 使用 sessionmaker 创建一个新的会话
+        async with db_sessionmaker() as session:
+                session.info["connection_usage"] = usage
+                yield session
+    finally:
+        report_connection_usage(usage)
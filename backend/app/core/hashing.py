@@ -0,0 +1,175 @@
+"""
+密码哈希引擎
+为 bcrypt 哈希/校验提供独立、有界的执行器，避免与默认线程池中的其他阻塞调用互相争抢。
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from passlib.context import CryptContext
+
+from app.core.config import Settings, settings
+from app.core.metrics import metrics_registry
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HashingBusyError(Exception):
+    """哈希任务积压超过上限时抛出，调用方应快速失败（例如返回 503）。"""
+
+
+# 以下函数在工作进程/线程中执行，必须定义在模块顶层以便进程池序列化。
+# 返回值附带实际执行耗时，用于计算排队等待时间。
+def _hash_password(password: str) -> tuple[str, float]:
+    start = time.perf_counter()
+    hashed = pwd_context.hash(password)
+    return hashed, time.perf_counter() - start
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> tuple[bool, float]:
+    start = time.perf_counter()
+    result = pwd_context.verify(plain_password, hashed_password)
+    return result, time.perf_counter() - start
+
+
+class PasswordHashingEngine:
+    """
+    有界的密码哈希执行引擎。
+
+    - mode="thread": 专用线程池（bcrypt 计算期间释放 GIL，可利用多核）。
+    - mode="process": 进程池，完全隔离事件循环所在进程的 CPU。
+    未完成任务数超过 workers + max_queue 时立即抛出 HashingBusyError。
+    批量哈希最多同时占用 workers - reserved_workers 个工作者，其余留给交互式请求。
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        max_queue: int = 64,
+        reserved_workers: int = 1,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"不支持的哈希执行模式: {mode}. 可用选项: ['thread', 'process']")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.batch_workers = max(self.max_workers - reserved_workers, 1)
+        self._executor: Optional[Executor] = None
+        # 限制批量任务并发的信号量，绑定到创建它的事件循环
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # 使用 spawn 避免在已有线程的进程中 fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash",
+                )
+        return self._executor
+
+    def _get_batch_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._batch_loop is not loop:
+            self._batch_slots = asyncio.Semaphore(self.batch_workers)
+            self._batch_loop = loop
+        return self._batch_slots
+
+    async def _submit(self, func: Callable[..., tuple[Any, float]], *args: Any) -> Any:
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HashingBusyError("Password hashing backlog is full, please retry later")
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            result, run_seconds = await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+        wait_seconds = max(time.perf_counter() - start - run_seconds, 0.0)
+        self.completed += 1
+        self.total_run_seconds += run_seconds
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """
+        批量哈希，用于批量导入。每个密码单独提交并经过同样的积压检查，
+        同时最多占用 batch_workers 个工作者，单个任务只持有工作者一次哈希的时间，
+        交互式的哈希和校验始终有预留的工作者可用。积压已满时抛出 HashingBusyError。
+        """
+        slots = self._get_batch_slots()
+
+        async def hash_one(password: str) -> str:
+            async with slots:
+                return await self._submit(_hash_password, password)
+
+        try:
+            # 任一任务失败（例如积压已满）时取消其余尚未开始的任务
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(hash_one(password)) for password in passwords]
+        except ExceptionGroup as e:
+            raise e.exceptions[0]
+        return [task.result() for task in tasks]
+
+    def stats(self) -> dict[str, Any]:
+        """返回队列深度与等待时间等指标。"""
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "batch_workers": self.batch_workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(self.pending, self.max_workers),
+            "queue_depth": max(self.pending - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.total_wait_seconds / self.completed if self.completed else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "avg_run_seconds": self.total_run_seconds / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def build_hashing_engine(settings: Settings) -> PasswordHashingEngine:
+    return PasswordHashingEngine(
+        mode=settings.PASSWORD_HASH_EXECUTOR.lower(),
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+        reserved_workers=settings.PASSWORD_HASH_RESERVED_WORKERS,
+    )
+
+
+# 全局密码哈希引擎实例，执行器在首次使用时才创建
+hashing_engine = build_hashing_engine(settings)
+metrics_registry.register("password_hashing", hashing_engine.stats)
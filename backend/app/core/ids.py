@@ -0,0 +1,48 @@
+"""
+主键生成
+提供按时间排序的 UUIDv7（RFC 9562），新行按生成顺序追加到 B-tree 索引末尾，
+避免随机 UUIDv4 导致的页分裂和索引膨胀。与已有的 v4 主键存放在同一 UUID 列中，互不影响。
+"""
+
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+# rand_a 字段共 12 位，用作同一毫秒内的单调计数器
+_COUNTER_MAX = 0xFFF
+
+
+def uuid7() -> uuid.UUID:
+    """
+    生成 UUIDv7：48 位 Unix 毫秒时间戳 + 12 位毫秒内计数器 + 62 位随机数。
+    同一进程内生成的值严格递增；计数器用尽或时钟回拨时沿用上一毫秒并继续递增。
+    """
+    global _last_ms, _counter
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # 计数器以随机值起步（保留最高位作溢出余量），降低多进程间的碰撞概率
+            _counter = int.from_bytes(os.urandom(2)) & 0x7FF
+        else:
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = 0
+        timestamp_ms, counter = _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
@@ -3,16 +3,24 @@
 提供统一的日志记录功能
 """
 
+import atexit
+import copy
+import datetime
+import inspect
+import json
 import logging
+import queue
+import random
 import sys
+from contextvars import ContextVar
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
-from typing import Optional
-import asyncio
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Callable, Optional
 import time
 from functools import wraps
 
 from app.core.config import settings
+from app.core.metrics import metrics_registry
 
 # 创建logs目录
 Path("logs").mkdir(exist_ok=True)
@@ -21,8 +29,8 @@ Path("logs").mkdir(exist_ok=True)
 class ColoredFormatter(logging.Formatter):
     """
     带颜色的日志格式化器。
-    通过重写 format 方法为不同级别的日志应用不同的颜色，
-    而不是在每次调用时都创建一个新的 Formatter 实例。
+    每个级别的格式在初始化时预先构建为独立的 Formatter，format 时按级别直接选用，
+    不修改共享状态，可以在多线程中安全使用。
     """
     
     grey = "\x1b[38;20m"
@@ -42,34 +50,168 @@ class ColoredFormatter(logging.Formatter):
     
     def __init__(self, fmt: str, datefmt: Optional[str] = None):
         super().__init__(fmt, datefmt)
+        self._formatters = {
+            levelno: logging.Formatter(self._build_format(levelno, color), datefmt)
+            for levelno, color in self.COLORS.items()
+        }
+
+    def _build_format(self, levelno: int, color: str) -> str:
+        format_string = (
+            f"{color}%(asctime)s{self.reset} - "
+            f"%(name)s - "
+            f"{color}%(levelname)s{self.reset} - "
+            f"%(message)s"
+        )
+        # ERROR 及以上级别附带代码位置
+        if levelno >= logging.ERROR:
+            format_string += f"\n{color}%(pathname)s:%(lineno)d{self.reset}"
+        return format_string
 
     def format(self, record: logging.LogRecord) -> str:
-        log_color = self.COLORS.get(record.levelno)
-        
-        # 根据日志级别动态构建格式字符串
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
+            # 自定义级别使用最接近的标准级别的格式
+            levelno = max((level for level in self._formatters if level <= record.levelno), default=logging.DEBUG)
+            formatter = self._formatters[levelno]
+        return formatter.format(record)
+
+
+try:
+    import orjson
+except ImportError:
+    # 未安装 orjson 时退回标准库 json
+    orjson = None
+
+
+# 当前请求的日志上下文（request_id、user_id、route 等），由请求中间件设置，自动附加到每条日志
+_log_context: ContextVar[Optional[dict[str, Any]]] = ContextVar("log_context", default=None)
+
+# LogRecord 的标准属性，其余属性视为通过 extra 传入的自定义字段
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "context"}
+
+
+def new_log_context(**fields: Any) -> dict[str, Any]:
+    """为当前请求创建新的日志上下文，返回的 dict 在请求内可继续补充字段。"""
+    context = dict(fields)
+    _log_context.set(context)
+    return context
+
+
+def bind_log_context(**fields: Any) -> None:
+    """向当前请求的日志上下文补充字段（例如认证后的 user_id），不在请求中时忽略。"""
+    context = _log_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+class Lazy:
+    """
+    延迟求值的日志字段，通过 extra 传入，只在日志真正被格式化时才调用（在后台线程中），
+    被级别过滤或采样丢弃的日志不会产生计算开销。例如 extra={"payload": Lazy(lambda: obj.model_dump())}。
+    """
+
+    __slots__ = ("func",)
+
+    def __init__(self, func: Callable[[], Any]):
+        self.func = func
+
+    def __str__(self) -> str:
+        return str(self.func())
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，包含请求上下文和 extra 字段；安装 orjson 时使用 orjson 序列化。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.datetime.fromtimestamp(record.created, tz=datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        context = getattr(record, "context", None)
+        if context:
+            data.update(context)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value.func() if isinstance(value, Lazy) else value
         if record.levelno >= logging.ERROR:
-            format_string = (
-                f"{log_color}%(asctime)s{self.reset} - "
-                f"%(name)s - "
-                f"{log_color}%(levelname)s{self.reset} - "
-                f"%(message)s"
-                f"\n{log_color}%(pathname)s:%(lineno)d{self.reset}"
-            )
-        else:
-            format_string = (
-                f"{log_color}%(asctime)s{self.reset} - "
-                f"%(name)s - "
-                f"{log_color}%(levelname)s{self.reset} - "
-                f"%(message)s"
-            )
+            data["location"] = f"{record.pathname}:{record.lineno}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(data, default=str).decode()
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
 
-        # 临时设置格式字符串，然后调用父类的 format 方法
-        original_fmt = self._fmt
-        self._fmt = format_string
-        result = super().format(record)
-        self._fmt = original_fmt # 恢复原始格式
-        
-        return result
+
+class InfoSampler(logging.Filter):
+    """
+    按比例抽样 INFO 及以下级别的日志，WARNING 及以上始终保留。
+    请求上下文中带有 sampled 标记时按请求整体保留或丢弃，同一请求的日志不会被拆散。
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        context = _log_context.get()
+        if context is not None and "sampled" in context:
+            return context["sampled"]
+        return random.random() < self.rate
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    把日志记录放入有界队列，由后台线程中的 QueueListener 完成格式化和 I/O，调用方从不阻塞。
+    队列满时：WARNING 以下的记录直接丢弃；WARNING 及以上的记录挤掉队列中最旧的一条后入队。
+    丢弃数量记录在 dropped 中。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只在调用方线程里合并消息参数和渲染异常堆栈（参数可能是可变对象、堆栈引用调用帧），
+        # 时间和颜色等格式化交给后台线程中的处理器完成
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # 上下文变量在后台线程中不可见，入队前复制当前请求的上下文
+        context = _log_context.get()
+        if context:
+            record.context = {key: value for key, value in context.items() if key != "sampled"}
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno >= logging.WARNING:
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+                self.queue.put_nowait(record)
+                return
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+
+
+# 每个日志记录器对应的后台监听线程
+_listeners: dict[str, QueueListener] = {}
 
 
 def setup_logger(
@@ -79,6 +221,9 @@ def setup_logger(
 ) -> logging.Logger:
     """
     设置日志记录器
+
+    控制台和文件处理器运行在后台线程中，记录器本身只挂一个 BoundedQueueHandler，
+    请求路径上的日志调用只做一次入队，不做任何 I/O。
     
     Args:
         name: 日志记录器名称
@@ -92,24 +237,30 @@ def setup_logger(
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level or settings.LOG_LEVEL))
     
-    # 移除已存在的处理器，避免重复添加
-    # 仅移除由本函数添加的处理器，避免影响其他模块的日志配置
+    # 重复调用时先停止上一次创建的监听线程，并移除对应的队列处理器
+    previous = _listeners.pop(name, None)
+    if previous is not None:
+        previous.stop()
+        for handler in previous.handlers:
+            handler.close()
     for handler in logger.handlers[:]:
-        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
-            logger.removeHandler(handler)
-        elif isinstance(handler, RotatingFileHandler) and handler.baseFilename == Path(log_file_path).resolve().as_posix():
+        if isinstance(handler, BoundedQueueHandler):
             logger.removeHandler(handler)
     
     # 控制台处理器
     # 注意: ANSI颜色代码在某些环境（如旧版Windows CMD）下可能无法正常显示
     # 可以考虑使用 colorama 库来改善跨平台兼容性
+    json_mode = settings.LOG_FORMAT.lower() == "json"
     console_handler = logging.StreamHandler(sys.stdout)
-    console_formatter = ColoredFormatter(
-        '%(message)s', # 基础格式，具体格式在 format 方法中动态构建
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    if json_mode:
+        console_formatter = JsonFormatter()
+    else:
+        console_formatter = ColoredFormatter(
+            '%(message)s', # 基础格式，各级别的格式在初始化时构建
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    handlers: list[logging.Handler] = [console_handler]
     
     # 文件处理器
     log_file_path = log_file or settings.LOG_FILE
@@ -120,12 +271,28 @@ def setup_logger(
             backupCount=5,
             encoding='utf-8'
         )
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
+        if json_mode:
+            file_formatter = JsonFormatter()
+        else:
+            file_formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                datefmt="%Y-%m-%d %H:%M:%S"
+            )
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    queue_handler = BoundedQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    if settings.LOG_INFO_SAMPLE_RATE < 1:
+        # 在入队前抽样，被丢弃的日志不占用队列
+        queue_handler.addFilter(InfoSampler(settings.LOG_INFO_SAMPLE_RATE))
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
+    logger.addHandler(queue_handler)
+    metrics_registry.register(
+        f"logging_{name}",
+        lambda: {"queued": queue_handler.queue.qsize(), "dropped": queue_handler.dropped},
+    )
     
     # 防止日志消息传播到根记录器
     logger.propagate = False
@@ -133,6 +300,19 @@ def setup_logger(
     return logger
 
 
+def shutdown_logging() -> None:
+    """停止所有后台监听线程，停止前会写完队列中剩余的日志。可重复调用。"""
+    while _listeners:
+        _, listener = _listeners.popitem()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+# 进程退出时确保队列中的日志全部写出
+atexit.register(shutdown_logging)
+
+
 # 创建一个基础的根日志记录器
 logger = setup_logger(settings.PROJECT_NAME)
 
@@ -148,38 +328,38 @@ def get_logger(name: str) -> logging.Logger:
 def log_execution_time(func):
     """
     记录函数执行时间的装饰器。
-    优化后，直接使用 logging.getLogger 获取已配置的实例，而非重新配置。
+    耗时记录到 function_duration_seconds 直方图（标签 function=模块.函数名），正常调用不写日志；
+    调用抛出异常时记录一条带耗时的 ERROR 日志。
     """
+    func_logger = get_logger(func.__module__)
+    series = metrics_registry.histogram(
+        "function_duration_seconds", "Execution time of functions decorated with log_execution_time", ("function",)
+    ).labels(function=f"{func.__module__}.{func.__qualname__}")
+
     @wraps(func)
     async def async_wrapper(*args, **kwargs):
-        # 高效地获取已配置的 logger 实例
-        func_logger = get_logger(func.__module__)
-        start_time = time.time()
-        func_logger.info(f"Starting async function '{func.__name__}'...")
+        start = time.perf_counter_ns()
         try:
-            result = await func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            func_logger.info(f"Completed '{func.__name__}' in {execution_time:.2f}s")
-            return result
+            return await func(*args, **kwargs)
         except Exception as e:
-            execution_time = time.time() - start_time
-            func_logger.error(f"Error in '{func.__name__}' after {execution_time:.2f}s: {e}", exc_info=True)
+            func_logger.error(
+                f"Error in '{func.__name__}' after {(time.perf_counter_ns() - start) / 1e9:.3f}s: {e}", exc_info=True
+            )
             raise
+        finally:
+            series.observe((time.perf_counter_ns() - start) / 1e9)
     
     @wraps(func)
     def sync_wrapper(*args, **kwargs):
-        # 高效地获取已配置的 logger 实例
-        func_logger = get_logger(func.__module__)
-        start_time = time.time()
-        func_logger.info(f"Starting sync function '{func.__name__}'...")
+        start = time.perf_counter_ns()
         try:
-            result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            func_logger.info(f"Completed '{func.__name__}' in {execution_time:.2f}s")
-            return result
+            return func(*args, **kwargs)
         except Exception as e:
-            execution_time = time.time() - start_time
-            func_logger.error(f"Error in '{func.__name__}' after {execution_time:.2f}s: {e}", exc_info=True)
+            func_logger.error(
+                f"Error in '{func.__name__}' after {(time.perf_counter_ns() - start) / 1e9:.3f}s: {e}", exc_info=True
+            )
             raise
+        finally:
+            series.observe((time.perf_counter_ns() - start) / 1e9)
     
-    return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
\ No newline at end of file
+    return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
@@ -0,0 +1,279 @@
+"""
+内部指标模块
+各组件注册自己的指标采集函数，由内部指标接口统一导出。
+另外提供按标签分组的耗时直方图和计时工具（装饰器 / 上下文管理器），
+直方图和采集函数中的数值指标可以按 Prometheus 文本格式导出。
+"""
+
+import bisect
+import functools
+import inspect
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# 默认的耗时分桶上界（秒），覆盖从亚毫秒级的缓存命中到秒级的外部调用
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class HistogramSeries:
+    """直方图中一组标签值对应的计数，记录一次观测只做一次二分查找和几次加法。"""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        # 可能在线程池中记录，加锁保证计数一致
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram:
+    """带标签的分桶直方图，每组标签值对应一个 HistogramSeries，首次使用时创建。"""
+
+    def __init__(self, name: str, description: str, label_names: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple[str, ...], HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: Any) -> HistogramSeries:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, HistogramSeries(self.buckets))
+        return series
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self.labels(**labels).observe(value)
+
+    def collect(self) -> dict[str, Any]:
+        """按标签汇总的计数、总和与均值，供 JSON 格式的内部指标接口使用。"""
+        result = {}
+        for key, series in list(self._series.items()):
+            _, total, count = series.snapshot()
+            label = ",".join(f"{name}={value}" for name, value in zip(self.label_names, key)) or "all"
+            result[label] = {"count": count, "sum": total, "avg": total / count if count else 0.0}
+        return result
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, series in list(self._series.items()):
+            counts, total, count = series.snapshot()
+            labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, key)]
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if isinstance(bound, str) else repr(float(bound))
+                bucket_labels = ",".join([*labels, f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_text = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{label_text} {total}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _flatten(prefix: str, data: dict[str, Any]) -> Iterable[tuple[str, float]]:
+    for key, value in data.items():
+        name = f"{prefix}_{_INVALID_NAME_CHARS.sub('_', str(key))}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (bool, int, float)):
+            yield name, float(value)
+
+
+class MetricsRegistry:
+    """指标采集函数的注册表，采集函数返回一个可 JSON 序列化的 dict。"""
+
+    def __init__(self):
+        self._collectors: Dict[str, Callable[[], dict[str, Any]]] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, collector: Callable[[], dict[str, Any]]) -> None:
+        self._collectors[name] = collector
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        label_names: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """返回指定名称的直方图，不存在时创建。"""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(name, description, label_names, buckets))
+        return histogram
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        metrics = {name: collector() for name, collector in self._collectors.items()}
+        for name, histogram in self._histograms.items():
+            metrics[name] = histogram.collect()
+        return metrics
+
+    def render_prometheus(self) -> str:
+        """按 Prometheus 文本格式导出：直方图原样导出，采集函数中的数值指标导出为 gauge。"""
+        lines: list[str] = []
+        for histogram in list(self._histograms.values()):
+            lines.extend(histogram.render())
+        for collector_name, collector in list(self._collectors.items()):
+            for name, value in _flatten(f"app_{_INVALID_NAME_CHARS.sub('_', collector_name)}", collector()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+metrics_registry = MetricsRegistry()
+
+
+class RequestPhases:
+    """
+    单个请求内各阶段（db / hash / storage / serialize 等）的累计耗时，单位纳秒。
+    同一阶段嵌套或并发进入时按墙钟时间计算：从第一个进入到最后一个退出只计一次。
+    """
+
+    __slots__ = ("totals", "endpoint_done", "_depth", "_started")
+
+    def __init__(self):
+        self.totals: dict[str, int] = {}
+        # 路由函数返回的时刻，用于计算响应序列化耗时
+        self.endpoint_done: Optional[int] = None
+        self._depth: dict[str, int] = {}
+        self._started: dict[str, int] = {}
+
+    def enter(self, phase: str) -> None:
+        depth = self._depth.get(phase, 0)
+        if depth == 0:
+            self._started[phase] = time.perf_counter_ns()
+        self._depth[phase] = depth + 1
+
+    def exit(self, phase: str) -> None:
+        depth = self._depth.get(phase, 0) - 1
+        if depth < 0:
+            return
+        self._depth[phase] = depth
+        if depth == 0:
+            self.add(phase, time.perf_counter_ns() - self._started.pop(phase))
+
+    def add(self, phase: str, duration_ns: int) -> None:
+        self.totals[phase] = self.totals.get(phase, 0) + duration_ns
+
+
+# 当前请求的阶段耗时，由请求计时中间件设置；不在请求中时为 None
+_request_phases: ContextVar[Optional[RequestPhases]] = ContextVar("request_phases", default=None)
+
+
+def start_request_phases() -> RequestPhases:
+    phases = RequestPhases()
+    _request_phases.set(phases)
+    return phases
+
+
+def current_request_phases() -> Optional[RequestPhases]:
+    return _request_phases.get()
+
+
+class timed:
+    """
+    记录耗时到直方图，基于 time.perf_counter_ns，单位为秒。
+    可以作为装饰器（同步或异步函数），也可以作为上下文管理器（with / async with）：
+
+        @timed("user_service_duration_seconds", operation="create_user")
+        async def create_user(...): ...
+
+        with timed("db_phase_duration_seconds", phase="flush"):
+            ...
+
+    sample_rate 小于 1 时只记录部分调用，用于调用极其频繁的路径。
+    指定 phase 时，耗时同时计入当前请求的该阶段（见 RequestPhases），不受采样影响。
+    作为上下文管理器时每次使用应创建新的实例。
+    """
+
+    __slots__ = ("series", "sample_rate", "phase", "_start")
+
+    def __init__(
+        self, name: str, sample_rate: float = 1.0, description: str = "", phase: Optional[str] = None, **labels: Any
+    ):
+        self.series = metrics_registry.histogram(name, description, tuple(labels)).labels(**labels)
+        self.sample_rate = sample_rate
+        self.phase = phase
+        self._start: Optional[int] = None
+
+    def _begin(self) -> Optional[int]:
+        if self.phase is not None:
+            phases = _request_phases.get()
+            if phases is not None:
+                phases.enter(self.phase)
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        return time.perf_counter_ns()
+
+    def _end(self, start: Optional[int]) -> None:
+        if start is not None:
+            self.series.observe((time.perf_counter_ns() - start) / 1e9)
+        if self.phase is not None:
+            phases = _request_phases.get()
+            if phases is not None:
+                phases.exit(self.phase)
+
+    def __call__(self, func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = self._begin()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._end(start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            start = self._begin()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._end(start)
+        return sync_wrapper
+
+    def __enter__(self) -> "timed":
+        self._start = self._begin()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._end(self._start)
+
+    async def __aenter__(self) -> "timed":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.__exit__(*exc_info)
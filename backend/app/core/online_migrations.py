@@ -0,0 +1,336 @@
+"""
+在线迁移工具
+为大表提供不阻塞写入的迁移操作：CONCURRENTLY 方式建索引，以及分批、限速、可断点续跑的数据回填。
+
+在迁移脚本中调用 create_index_concurrently / backfill。默认在 `alembic upgrade` 时直接执行；
+以 `alembic -x online=defer upgrade head` 运行时只登记任务，
+之后由 `python -m app.cli online-migrate` 在应用启动流程之外单独执行。
+任务状态和回填进度记录在 online_migration_tasks 表中，中断后重新执行会从上次的位置继续。
+
+本模块不依赖应用配置，迁移环境 (alembic/env.py) 可以直接导入。
+"""
+
+import datetime
+import json
+import logging
+import time
+from typing import Any, Optional, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger("alembic.online")
+
+TASKS_TABLE = "online_migration_tasks"
+# 迁移语句等待表锁的默认上限，超时后报错而不是在锁队列中阻塞其他读写
+DEFAULT_LOCK_TIMEOUT_MS = 5000
+# 回填批次因锁超时失败时的重试次数
+BACKFILL_LOCK_RETRIES = 5
+# PostgreSQL lock_timeout 触发时的错误码
+_LOCK_NOT_AVAILABLE = "55P03"
+
+# 任务表不属于业务模型，使用独立的 MetaData，autogenerate 时由 env.py 排除
+tasks_table = sa.Table(
+    TASKS_TABLE,
+    sa.MetaData(),
+    sa.Column("name", sa.String(255), primary_key=True),
+    sa.Column("kind", sa.String(32), nullable=False),
+    sa.Column("payload", sa.Text, nullable=False),
+    sa.Column("status", sa.String(16), nullable=False),
+    sa.Column("last_key", sa.String(255)),
+    sa.Column("rows_done", sa.BigInteger, nullable=False),
+    sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+)
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def set_lock_timeout(conn: Connection, lock_timeout_ms: int) -> None:
+    """设置当前连接的锁等待上限（仅 PostgreSQL）。"""
+    if _is_postgres(conn):
+        conn.exec_driver_sql(f"SET lock_timeout = {int(lock_timeout_ms)}")
+
+
+def ensure_tasks_table(conn: Connection) -> None:
+    tasks_table.create(conn, checkfirst=True)
+
+
+def register_task(conn: Connection, name: str, kind: str, payload: dict[str, Any]) -> None:
+    """登记任务，已存在的同名任务保持原有状态和进度不变。"""
+    exists = conn.execute(sa.select(tasks_table.c.name).where(tasks_table.c.name == name)).first()
+    if exists:
+        return
+    now = _now()
+    conn.execute(
+        tasks_table.insert().values(
+            name=name,
+            kind=kind,
+            payload=json.dumps(payload),
+            status="pending",
+            rows_done=0,
+            created_at=now,
+            updated_at=now,
+        )
+    )
+
+
+def list_tasks(conn: Connection) -> list[sa.Row]:
+    if not sa.inspect(conn).has_table(TASKS_TABLE):
+        return []
+    return list(conn.execute(sa.select(tasks_table).order_by(tasks_table.c.created_at, tasks_table.c.name)))
+
+
+def _update_task(conn: Connection, name: str, **values: Any) -> None:
+    conn.execute(tasks_table.update().where(tasks_table.c.name == name).values(updated_at=_now(), **values))
+
+
+def run_task(conn: Connection, name: str, lock_timeout_ms: int = DEFAULT_LOCK_TIMEOUT_MS) -> None:
+    """
+    执行一个已登记的任务。连接必须处于自动提交模式：
+    CREATE INDEX CONCURRENTLY 不能在事务中执行，回填的每个批次也需要单独提交。
+    """
+    task = conn.execute(sa.select(tasks_table).where(tasks_table.c.name == name)).one()
+    if task.status == "done":
+        logger.info(f"[{name}] already done, skipping")
+        return
+
+    set_lock_timeout(conn, lock_timeout_ms)
+    _update_task(conn, name, status="running")
+    payload = json.loads(task.payload)
+    if task.kind == "index":
+        _build_index(conn, name, payload)
+    elif task.kind == "backfill":
+        _run_backfill(conn, name, payload, task.last_key, task.rows_done)
+    else:
+        raise ValueError(f"未知的在线迁移任务类型: {task.kind}")
+    _update_task(conn, name, status="done")
+
+
+def run_pending_tasks(
+    conn: Connection, names: Optional[Sequence[str]] = None, lock_timeout_ms: int = DEFAULT_LOCK_TIMEOUT_MS
+) -> int:
+    """按登记顺序执行所有未完成的任务（或 names 指定的任务），返回执行的任务数。"""
+    count = 0
+    for task in list_tasks(conn):
+        if task.status == "done" or (names and task.name not in names):
+            continue
+        run_task(conn, task.name, lock_timeout_ms)
+        count += 1
+    return count
+
+
+def _build_index(conn: Connection, name: str, payload: dict[str, Any]) -> None:
+    postgres = _is_postgres(conn)
+    if postgres:
+        # 之前中断的 CONCURRENTLY 构建会留下 INVALID 索引，需先删除再重建
+        valid = conn.execute(
+            sa.text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ),
+            {"name": name},
+        ).scalar_one_or_none()
+        if valid:
+            logger.info(f"[{name}] index already exists")
+            return
+        if valid is False:
+            logger.warning(f"[{name}] dropping invalid index left by an interrupted build")
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {conn.dialect.identifier_preparer.quote(name)}")
+
+    table = sa.Table(payload["table"], sa.MetaData(), *(sa.Column(column) for column in payload["columns"]))
+    dialect_kw = dict(payload.get("dialect_kw") or {})
+    if postgres:
+        dialect_kw["postgresql_concurrently"] = True
+    index = sa.Index(name, *(table.c[column] for column in payload["columns"]), unique=payload.get("unique", False), **dialect_kw)
+
+    logger.info(f"[{name}] building index on {payload['table']}({', '.join(payload['columns'])})")
+    start = time.perf_counter()
+    conn.execute(sa.schema.CreateIndex(index, if_not_exists=True))
+    logger.info(f"[{name}] index built in {time.perf_counter() - start:.1f}s")
+
+
+def _estimate_rows(conn: Connection, table: str) -> Optional[int]:
+    """PostgreSQL 下从统计信息读取表的估算行数，避免全表 COUNT(*)。"""
+    if not _is_postgres(conn):
+        return None
+    estimate = conn.execute(
+        sa.text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"), {"table": table}
+    ).scalar_one_or_none()
+    return estimate if estimate and estimate > 0 else None
+
+
+def _key_column(conn: Connection, table: str, key: str) -> sa.ColumnClause:
+    """
+    返回带数据库类型的分批键列，分批边界和断点续跑的 last_key 按该类型绑定，
+    例如 PostgreSQL 的 integer/uuid 主键不会与 varchar 参数比较而报错。
+    SQLite 会把无法识别的声明类型（例如 UUID）反射为 NUMERIC，且比较时按列亲和性自动转换，因此不带类型。
+    """
+    if conn.dialect.name == "sqlite":
+        return sa.table(table, sa.column(key)).c[key]
+    return sa.Table(table, sa.MetaData(), autoload_with=conn, include_columns=[key]).c[key]
+
+
+def _parse_key(column: sa.ColumnClause, value: Optional[str]) -> Any:
+    """把任务表中以字符串保存的 last_key 转换回键列的 Python 类型。"""
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is object:
+        # 不带类型的列（见 _key_column）
+        return value
+    if python_type in (datetime.datetime, datetime.date):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def _run_backfill(
+    conn: Connection, name: str, payload: dict[str, Any], last_key: Optional[str], rows_done: int
+) -> None:
+    quote = conn.dialect.identifier_preparer.quote
+    table, key = payload["table"], payload["key"]
+    batch_size, sleep_seconds = payload["batch_size"], payload["sleep_seconds"]
+    assignments = ", ".join(f"{quote(column)} = {expression}" for column, expression in payload["values"].items())
+    extra_where = f" AND ({payload['where']})" if payload.get("where") else ""
+
+    key_column = _key_column(conn, table, key)
+    select_keys = sa.select(key_column).order_by(key_column).limit(batch_size)
+    update_prefix = f"UPDATE {quote(table)} SET {assignments} WHERE {quote(key)} <= :upper"
+    last_key = _parse_key(key_column, last_key)
+
+    total = _estimate_rows(conn, table)
+    logger.info(f"[{name}] backfilling {table} in batches of {batch_size}, resuming after {last_key!r}")
+    start = time.perf_counter()
+    scanned = 0
+    while True:
+        query = select_keys if last_key is None else select_keys.where(key_column > last_key)
+        keys = conn.execute(query).scalars().all()
+        if not keys:
+            break
+        upper = keys[-1]
+        params = {"upper": upper}
+        bind_names = ["upper"]
+        lower = ""
+        if last_key is not None:
+            lower = f" AND {quote(key)} > :lower"
+            params["lower"] = last_key
+            bind_names.append("lower")
+        stmt = sa.text(update_prefix + lower + extra_where).bindparams(
+            *(sa.bindparam(bind_name, type_=key_column.type) for bind_name in bind_names)
+        )
+
+        for attempt in range(1, BACKFILL_LOCK_RETRIES + 1):
+            try:
+                updated = conn.execute(stmt, params).rowcount
+                break
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", getattr(e.orig, "pgcode", None)) != _LOCK_NOT_AVAILABLE or attempt == BACKFILL_LOCK_RETRIES:
+                    raise
+                logger.warning(f"[{name}] lock timeout on batch ending at {upper}, retry {attempt}")
+                time.sleep(sleep_seconds * 2 ** attempt)
+
+        # 批次已提交后再记录进度；进程在两者之间中断时会重跑最后一批，回填语句需保证幂等
+        last_key = upper
+        rows_done += max(updated, 0)
+        scanned += len(keys)
+        _update_task(conn, name, last_key=str(last_key), rows_done=rows_done)
+
+        elapsed = time.perf_counter() - start
+        progress = f" (~{min(scanned / total, 1.0):.0%} of {total})" if total else ""
+        logger.info(
+            f"[{name}] {rows_done} rows updated, scanned {scanned}{progress}, "
+            f"{scanned / elapsed if elapsed else 0:.0f} rows/s"
+        )
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    logger.info(f"[{name}] backfill finished: {rows_done} rows updated in {time.perf_counter() - start:.1f}s")
+
+
+def _schedule(name: str, kind: str, payload: dict[str, Any]) -> None:
+    """在迁移脚本中登记任务；非延迟模式下立即在自动提交块中执行。"""
+    from alembic import context, op
+
+    if context.is_offline_mode():
+        raise RuntimeError("在线迁移操作不支持离线 (--sql) 模式")
+    deferred = context.get_x_argument(as_dictionary=True).get("online") == "defer"
+    lock_timeout_ms = int(context.get_x_argument(as_dictionary=True).get("lock_timeout_ms", DEFAULT_LOCK_TIMEOUT_MS))
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        ensure_tasks_table(conn)
+        register_task(conn, name, kind, payload)
+        if deferred:
+            logger.info(f"[{name}] deferred, run `python -m app.cli online-migrate` to execute")
+        else:
+            run_task(conn, name, lock_timeout_ms)
+
+
+def create_index_concurrently(
+    name: str, table: str, columns: Sequence[str], unique: bool = False, **dialect_kw: Any
+) -> None:
+    """
+    在迁移脚本中创建索引。PostgreSQL 下使用 CREATE INDEX CONCURRENTLY，建索引期间不阻塞写入。
+    dialect_kw 透传给 sa.Index，例如 postgresql_using="gin"。
+    """
+    _schedule(name, "index", {"table": table, "columns": list(columns), "unique": unique, "dialect_kw": dialect_kw})
+
+
+def drop_index_concurrently(name: str) -> None:
+    """在迁移脚本中删除索引，PostgreSQL 下使用 DROP INDEX CONCURRENTLY。"""
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        quoted = conn.dialect.identifier_preparer.quote(name)
+        if _is_postgres(conn):
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {quoted}")
+        else:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {quoted}")
+        if sa.inspect(conn).has_table(TASKS_TABLE):
+            conn.execute(tasks_table.delete().where(tasks_table.c.name == name))
+
+
+def backfill(
+    name: str,
+    table: str,
+    values: dict[str, str],
+    where: Optional[str] = None,
+    key: str = "id",
+    batch_size: int = 1000,
+    sleep_seconds: float = 0.05,
+) -> None:
+    """
+    在迁移脚本中分批回填数据。
+
+    Args:
+        name: 任务名，全局唯一，用于记录进度和断点续跑
+        table: 表名
+        values: 列名 -> SQL 表达式，例如 {"display_name": "full_name"}
+        where: 额外的过滤条件（SQL），例如 "display_name IS NULL"，应使重复执行保持幂等
+        key: 用于分批的唯一且有序的列，通常是主键
+        batch_size: 每批更新的行数，每批单独提交，锁只在批次内持有
+        sleep_seconds: 批次之间的停顿，给在线流量和复制留出余量
+    """
+    _schedule(
+        name,
+        "backfill",
+        {
+            "table": table,
+            "values": values,
+            "where": where,
+            "key": key,
+            "batch_size": batch_size,
+            "sleep_seconds": sleep_seconds,
+        },
+    )
@@ -0,0 +1,140 @@
+"""
+令牌吊销过滤器
+为无状态（claims-only）令牌提供紧凑的进程内吊销检查，避免每个请求都查询数据库。
+"""
+
+import asyncio
+import datetime
+import hashlib
+import math
+from typing import Any, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import metrics_registry
+from app.models import User
+
+
+class BloomFilter:
+    """基于 bytearray 的简单布隆过滤器，只支持添加和查询。"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationFilter:
+    """
+    记录「令牌版本已递增或已停用」的用户。
+
+    布隆过滤器用于快速排除绝大多数未被吊销的用户，命中时再查精确表
+    (user_id -> (当前版本, 是否激活))。令牌中的 ver 小于当前版本、或用户已停用，即视为吊销。
+    数据定期从数据库增量同步；本进程内的变更通过 revoke() 立即生效。
+    """
+
+    def __init__(self, refresh_seconds: int = 30, error_rate: float = 0.01):
+        self.refresh_seconds = refresh_seconds
+        self.error_rate = error_rate
+        self._exact: dict[str, tuple[int, bool]] = {}
+        self._bloom = BloomFilter(1024, error_rate)
+        self._last_synced_at: Optional[datetime.datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.checks = 0
+        self.bloom_positives = 0
+
+    def _rebuild_bloom(self) -> None:
+        bloom = BloomFilter(max(len(self._exact) * 2, 1024), self.error_rate)
+        for user_id in self._exact:
+            bloom.add(user_id)
+        self._bloom = bloom
+
+    def is_revoked(self, user_id: str, version: int) -> bool:
+        self.checks += 1
+        if user_id not in self._bloom:
+            return False
+        self.bloom_positives += 1
+        entry = self._exact.get(user_id)
+        if entry is None:
+            return False
+        current_version, is_active = entry
+        return version < current_version or not is_active
+
+    def revoke(self, user_id: str, current_version: int, is_active: bool) -> None:
+        """在本进程内立即记录用户的最新版本。"""
+        self._exact[user_id] = (current_version, is_active)
+        self._bloom.add(user_id)
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """从数据库增量同步；首次调用时做全量加载。"""
+        query = select(User.id, User.token_version, User.is_active, User.updated_at).where(
+            or_(User.token_version > 0, User.is_active.is_(False))
+        )
+        if self._last_synced_at is not None:
+            # 留出时间余量，避免与并发提交的事务产生遗漏
+            query = query.where(User.updated_at >= self._last_synced_at - datetime.timedelta(seconds=self.refresh_seconds))
+
+        result = await session.execute(query)
+        latest = self._last_synced_at
+        for user_id, version, is_active, updated_at in result:
+            self._exact[str(user_id)] = (version, is_active)
+            if updated_at is not None and updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=datetime.timezone.utc)
+            if updated_at is not None and (latest is None or updated_at > latest):
+                latest = updated_at
+        self._last_synced_at = latest or datetime.datetime.now(datetime.timezone.utc)
+        self._rebuild_bloom()
+
+    async def _run(self, sessionmaker: async_sessionmaker) -> None:
+        while True:
+            try:
+                async with sessionmaker() as session:
+                    await self.refresh(session)
+            except Exception:
+                logger.exception("Failed to refresh token revocation filter")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self, sessionmaker: async_sessionmaker) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(sessionmaker))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "revoked_users": len(self._exact),
+            "bloom_bits": self._bloom.size,
+            "checks": self.checks,
+            "bloom_positives": self.bloom_positives,
+            "last_synced_at": self._last_synced_at.isoformat() if self._last_synced_at else None,
+        }
+
+
+# 全局令牌吊销过滤器实例，仅在启用无状态令牌时由 lifespan 启动同步任务
+revocation_filter = RevocationFilter(settings.TOKEN_REVOCATION_REFRESH_SECONDS)
+metrics_registry.register("token_revocation", revocation_filter.stats)
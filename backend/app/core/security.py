@@ -1,28 +1,56 @@
-import asyncio
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import jwt
-from passlib.context import CryptContext
 
+from app.core.cache import token_cache
 from app.core.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.hashing import hashing_engine, pwd_context  # noqa: F401
+from app.core.metrics import timed
+from app.schemas import TokenPayload
 
 
 # ALGORITHM = "HS256" # 移除硬编码
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+@timed("security_operation_duration_seconds", operation="create_access_token")
+def create_access_token(
+    subject: str | Any, expires_delta: timedelta, extra_claims: dict[str, Any] | None = None
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(extra_claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
 
+@timed("security_operation_duration_seconds", operation="decode_access_token")
+def decode_access_token(token: str) -> TokenPayload:
+    """
+    校验并解析访问令牌。
+    已验证过的令牌会缓存到其过期时间，重复请求时跳过签名校验和模型构建。
+    校验失败时抛出 jwt.InvalidTokenError 或 pydantic.ValidationError。
+    """
+    token_data = token_cache.get(token, settings.SECRET_KEY)
+    if token_data is not None:
+        return token_data
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    token_data = TokenPayload(**payload)
+    if "exp" in payload:
+        token_cache.set(token, settings.SECRET_KEY, token_data, float(payload["exp"]))
+    return token_data
+
+
+@timed("security_operation_duration_seconds", phase="hash", operation="verify_password")
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+    return await hashing_engine.verify(plain_password, hashed_password)
 
 
+@timed("security_operation_duration_seconds", phase="hash", operation="get_password_hash")
 async def get_password_hash(password: str) -> str:
-    return await asyncio.to_thread(pwd_context.hash, password)
\ No newline at end of file
+    return await hashing_engine.hash(password)
+
+
+@timed("security_operation_duration_seconds", phase="hash", operation="get_password_hashes")
+async def get_password_hashes(passwords: list[str]) -> list[str]:
+    return await hashing_engine.hash_many(passwords)
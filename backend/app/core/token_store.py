@@ -0,0 +1,223 @@
+"""
+刷新令牌存储
+刷新令牌是随机的不透明字符串，只保存其 SHA-256 摘要。每次刷新都会轮换为新令牌；
+已使用过的令牌再次出现时视为泄露，整个令牌族 (family) 会被吊销。
+"""
+
+import hashlib
+import heapq
+import json
+import secrets
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from app.core.cache import create_redis_client
+from app.core.config import Settings, settings
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BaseRefreshTokenStore(ABC):
+    """刷新令牌存储的抽象基类。"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    async def issue(self, user_id: str, family_id: Optional[str] = None) -> str:
+        """为用户签发新的刷新令牌，返回令牌明文。"""
+        pass
+
+    @abstractmethod
+    async def rotate(self, token: str) -> Optional[tuple[str, str]]:
+        """
+        使用刷新令牌换取新令牌，返回 (user_id, 新令牌)。
+        令牌不存在、已过期或被重复使用时返回 None。
+        """
+        pass
+
+    @abstractmethod
+    async def revoke_user(self, user_id: str) -> None:
+        """吊销用户的全部刷新令牌（停用、修改密码时调用）。"""
+        pass
+
+
+class InMemoryRefreshTokenStore(BaseRefreshTokenStore):
+    """
+    进程内刷新令牌存储，O(1) 查找，过期条目通过最小堆在写入时顺带清理。
+    仅适用于单进程部署或开发环境。
+    """
+
+    def __init__(self, ttl_seconds: int):
+        super().__init__(ttl_seconds)
+        # digest -> [user_id, family_id, expires_at, used]
+        self._records: dict[str, list[Any]] = {}
+        self._families: dict[str, set[str]] = {}
+        self._user_families: dict[str, set[str]] = {}
+        self._expiry_heap: list[tuple[float, str]] = []
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, digest = heapq.heappop(self._expiry_heap)
+            record = self._records.get(digest)
+            if record is not None and record[2] <= now:
+                self._discard(digest)
+
+    def _discard(self, digest: str) -> None:
+        record = self._records.pop(digest, None)
+        if record is None:
+            return
+        user_id, family_id = record[0], record[1]
+        family = self._families.get(family_id)
+        if family is not None:
+            family.discard(digest)
+            if not family:
+                del self._families[family_id]
+                user_families = self._user_families.get(user_id)
+                if user_families is not None:
+                    user_families.discard(family_id)
+                    if not user_families:
+                        del self._user_families[user_id]
+
+    def _revoke_family(self, family_id: str) -> None:
+        for digest in list(self._families.get(family_id, ())):
+            self._discard(digest)
+
+    async def issue(self, user_id: str, family_id: Optional[str] = None) -> str:
+        self._sweep()
+        token = secrets.token_urlsafe(32)
+        digest = _digest(token)
+        family_id = family_id or secrets.token_hex(16)
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        self._records[digest] = [user_id, family_id, expires_at, False]
+        self._families.setdefault(family_id, set()).add(digest)
+        self._user_families.setdefault(user_id, set()).add(family_id)
+        heapq.heappush(self._expiry_heap, (expires_at, digest))
+        return token
+
+    async def rotate(self, token: str) -> Optional[tuple[str, str]]:
+        digest = _digest(token)
+        record = self._records.get(digest)
+        if record is None or record[2] <= time.monotonic():
+            return None
+        user_id, family_id, _, used = record
+        if used:
+            self._revoke_family(family_id)
+            return None
+        # 保留已使用的记录直到过期，用于检测重放
+        record[3] = True
+        return user_id, await self.issue(user_id, family_id)
+
+    async def revoke_user(self, user_id: str) -> None:
+        for family_id in list(self._user_families.get(user_id, ())):
+            self._revoke_family(family_id)
+
+
+# 以下脚本在 Redis 中原子执行，避免 "读取令牌 -> 标记已使用 -> 签发新令牌" 之间与并发的轮换或吊销交错。
+# 键名由 ARGV[1] 的前缀拼出，要求所有键位于同一 Redis 实例（不支持 Cluster 分片）。
+_REVOKE_FAMILY = """
+local function revoke_family(prefix, family_id)
+    local family_key = prefix .. 'family:' .. family_id
+    for _, digest in ipairs(redis.call('SMEMBERS', family_key)) do
+        redis.call('DEL', prefix .. 'token:' .. digest, prefix .. 'used:' .. digest)
+    end
+    redis.call('DEL', family_key)
+end
+"""
+
+_STORE_TOKEN = """
+local function store_token(prefix, ttl, digest, user_id, family_id, record)
+    local family_key = prefix .. 'family:' .. family_id
+    local user_key = prefix .. 'user:' .. user_id
+    redis.call('SET', prefix .. 'token:' .. digest, record, 'EX', ttl)
+    redis.call('SADD', family_key, digest)
+    redis.call('EXPIRE', family_key, ttl)
+    redis.call('SADD', user_key, family_id)
+    redis.call('EXPIRE', user_key, ttl)
+end
+"""
+
+# ARGV: prefix, ttl, digest, user_id, family_id, record
+_ISSUE_SCRIPT = _STORE_TOKEN + """
+store_token(ARGV[1], ARGV[2], ARGV[3], ARGV[4], ARGV[5], ARGV[6])
+return 1
+"""
+
+# ARGV: prefix, ttl, 旧令牌摘要, 新令牌摘要；成功时返回 user_id，令牌无效或被重放时返回 nil
+_ROTATE_SCRIPT = _REVOKE_FAMILY + _STORE_TOKEN + """
+local prefix, ttl, digest, new_digest = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+local raw = redis.call('GET', prefix .. 'token:' .. digest)
+if not raw then
+    return nil
+end
+local record = cjson.decode(raw)
+if not redis.call('SET', prefix .. 'used:' .. digest, '1', 'EX', ttl, 'NX') then
+    revoke_family(prefix, record['family_id'])
+    return nil
+end
+store_token(prefix, ttl, new_digest, record['user_id'], record['family_id'], raw)
+return record['user_id']
+"""
+
+# ARGV: prefix, user_id
+_REVOKE_USER_SCRIPT = _REVOKE_FAMILY + """
+local user_key = ARGV[1] .. 'user:' .. ARGV[2]
+for _, family_id in ipairs(redis.call('SMEMBERS', user_key)) do
+    revoke_family(ARGV[1], family_id)
+end
+redis.call('DEL', user_key)
+return 1
+"""
+
+
+class RedisRefreshTokenStore(BaseRefreshTokenStore):
+    """
+    基于 Redis 的刷新令牌存储，过期由 Redis TTL 处理。
+    签发、轮换和吊销各是一个 Lua 脚本，在 Redis 中原子执行；同一令牌的并发轮换只有一个能成功。
+    client 只需实现 redis.asyncio 的 register_script 接口。
+    """
+
+    def __init__(self, client: Any, ttl_seconds: int, prefix: str = "auth:refresh:"):
+        super().__init__(ttl_seconds)
+        self.client = client
+        self.prefix = prefix
+        # register_script 使用 EVALSHA 执行，脚本只在首次使用时上传
+        self._issue = client.register_script(_ISSUE_SCRIPT)
+        self._rotate = client.register_script(_ROTATE_SCRIPT)
+        self._revoke_user = client.register_script(_REVOKE_USER_SCRIPT)
+
+    async def issue(self, user_id: str, family_id: Optional[str] = None) -> str:
+        token = secrets.token_urlsafe(32)
+        family_id = family_id or secrets.token_hex(16)
+        record = json.dumps({"user_id": user_id, "family_id": family_id})
+        await self._issue(args=[self.prefix, self.ttl_seconds, _digest(token), user_id, family_id, record])
+        return token
+
+    async def rotate(self, token: str) -> Optional[tuple[str, str]]:
+        new_token = secrets.token_urlsafe(32)
+        user_id = await self._rotate(args=[self.prefix, self.ttl_seconds, _digest(token), _digest(new_token)])
+        if user_id is None:
+            return None
+        return user_id, new_token
+
+    async def revoke_user(self, user_id: str) -> None:
+        await self._revoke_user(args=[self.prefix, user_id])
+
+
+def build_refresh_token_store(settings: Settings) -> BaseRefreshTokenStore:
+    ttl_seconds = settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+    backend = settings.REFRESH_TOKEN_STORE.lower()
+    if backend == "memory":
+        return InMemoryRefreshTokenStore(ttl_seconds)
+    if backend == "redis":
+        return RedisRefreshTokenStore(create_redis_client(settings), ttl_seconds)
+    raise ValueError(f"不支持的刷新令牌存储: {settings.REFRESH_TOKEN_STORE}. 可用选项: ['memory', 'redis']")
+
+
+# 全局刷新令牌存储实例
+refresh_token_store = build_refresh_token_store(settings)
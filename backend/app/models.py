@@ -8,6 +8,9 @@ from sqlalchemy import (
     DateTime,
     func,
     Boolean,
+    Index,
+    Integer,
+    false,
 )
 from sqlalchemy.orm import (
     DeclarativeBase,
@@ -17,26 +20,53 @@ from sqlalchemy.orm import (
 )
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
+from app.core.ids import uuid7
+
 
 class Base(DeclarativeBase):
     """基础模型，提供 UUID 主键和时间戳。"""
+    # 新行使用按时间排序的 UUIDv7，历史数据中的 UUIDv4 主键保持不变
     id: Mapped[uuid.UUID] = mapped_column(
-        PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        PG_UUID(as_uuid=True), primary_key=True, default=uuid7
     )
+    # 同时提供客户端默认值，保证各数据库（包括 SQLite）存储的时间精度一致，便于键集分页比较
     created_at: Mapped[datetime.datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True),
+        default=lambda: datetime.datetime.now(datetime.timezone.utc),
+        server_default=func.now(),
     )
     updated_at: Mapped[datetime.datetime] = mapped_column(
-        DateTime(timezone=True), onupdate=func.now(), server_default=func.now()
+        DateTime(timezone=True), onupdate=func.now(), server_default=func.now(), index=True
     )
 
 
 class User(Base):
     """系统的用户。"""
     __tablename__ = "users"
+    __table_args__ = (
+        # 用户列表按 (created_at, id) 做键集分页
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # 用户搜索的 ILIKE 前缀/子串匹配使用 pg_trgm GIN 索引（仅 PostgreSQL）
+        Index(
+            "ix_users_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_users_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
     
     full_name: Mapped[str] = mapped_column(String(255), index=True, nullable=False)
     email: Mapped[str] = mapped_column(String(100), unique=True, index=True, nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # 管理员可以查看、搜索和批量导入用户；只能通过命令行授予
+    is_superuser: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(), nullable=False)
+    # 令牌版本号，用户信息变更或停用时递增，使旧的无状态令牌失效
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
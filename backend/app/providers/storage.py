@@ -1,21 +1,181 @@
 import io
 import asyncio
+import base64
+import datetime
+import fcntl
+import hashlib
+import hmac
+import mimetypes
+import mmap
+import os
+import re
+import secrets
+import shutil
+import stat
+import tempfile
+import time
 from abc import ABC, abstractmethod
-from typing import Optional,Union,Dict,Type
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote, urlencode
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape as xml_escape
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional, Protocol,Union,Dict,Type
 
 import aioboto3
+import botocore.session
+import httpx
+import requests
 from botocore.client import Config
 from botocore.exceptions import ClientError
 from qcloud_cos import CosConfig,CosS3Client,CosServiceError
+from requests.adapters import HTTPAdapter
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 
 from app.core.config import Settings
 from app.core.logger import logger
+from app.core.metrics import current_request_phases, metrics_registry, timed
+
+# 流式下载默认的分块大小
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class InvalidRangeError(Exception):
+    """请求的字节范围超出对象大小时抛出，size 为对象的实际大小（未知时为 None）。"""
+
+    def __init__(self, size: Optional[int] = None):
+        super().__init__("Requested range not satisfiable")
+        self.size = size
+
+
+@dataclass
+class ObjectInfo:
+    """对象元数据。"""
+    key: str
+    size: int
+    etag: Optional[str] = None
+    content_type: Optional[str] = None
+    last_modified: Optional[datetime.datetime] = None
+
+
+@dataclass
+class ObjectStream:
+    """
+    流式读取的对象。
+    content_range 为 None 表示完整对象，否则为 "bytes start-end/size" 形式的响应范围。
+    chunks 每次产出不超过分块大小的数据，消费方读取下一块前不会继续从上游拉取（天然背压）；
+    提前停止迭代时需调用 chunks.aclose() 释放底层连接。
+    """
+    info: ObjectInfo
+    content_length: int
+    content_range: Optional[str]
+    chunks: AsyncIterator[bytes]
+
+
+@dataclass
+class BatchResult:
+    """批量操作中单个 key 的结果：成功时 value 为返回值，失败时 error 为错误描述。"""
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+
+
+# 对象存储批量删除接口单次最多接受的 key 数量
+DELETE_BATCH_SIZE = 1000
+
+
+async def _gather_bounded(func: Callable[[str], Awaitable[Any]], keys: list[str], max_concurrency: int) -> list[Any]:
+    """对每个 key 调用 func 并收集结果（顺序与 keys 一致），同时进行的调用不超过 max_concurrency 个。"""
+    limit = asyncio.Semaphore(max_concurrency)
+
+    async def run(key: str) -> Any:
+        async with limit:
+            return await func(key)
+
+    return await asyncio.gather(*(run(key) for key in keys))
+
+
+def _chunked(items: list[str], size: int) -> Iterable[list[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+# 流式上传的数据源：异步字节迭代器（例如 request.stream()）或带异步 read 的对象（例如 UploadFile）
+ByteSource = Union[AsyncIterable[bytes], AsyncReadable]
+
+
+async def _iter_parts(source: ByteSource, part_size: int) -> AsyncIterator[bytes]:
+    """把数据源切分为固定大小的分片（最后一片可能更小），只缓冲当前分片。"""
+    async def read_chunks() -> AsyncIterator[bytes]:
+        while chunk := await source.read(part_size):
+            yield chunk
+
+    chunks = read_chunks() if hasattr(source, "read") else source
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def _size_from_content_range(content_range: Optional[str], content_length: int) -> int:
+    # "bytes 0-99/1000" -> 1000
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    return content_length
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _timed_storage(provider: str, operation: str) -> timed:
+    """
+    存储操作计时，耗时记录到 storage_operation_duration_seconds 直方图并计入请求的 storage 阶段。
+    只用于直接访问存储的具体实现；由其他操作组合而成的批量操作和缓存包装层不计时，避免重复计数。
+    open_stream 只计打开流（含首个响应）的时间，不含后续分块传输。
+    """
+    return timed("storage_operation_duration_seconds", phase="storage", provider=provider, operation=operation)
+
+
+def _record_storage_time(provider: str, operation: str, duration_ns: int) -> None:
+    """记录一次已经测得的存储操作耗时，用于只能分段计时、无法用 _timed_storage 包住整个调用的操作。"""
+    metrics_registry.histogram("storage_operation_duration_seconds", label_names=("provider", "operation")).observe(
+        duration_ns / 1e9, provider=provider, operation=operation
+    )
+    phases = current_request_phases()
+    if phases is not None:
+        phases.add("storage", duration_ns)
+
 
 class BaseStorageService(ABC):
     """抽象存储服务基类，定义了所有存储服务必须实现的核心接口。"""
 
     def __init__(self,settings:Settings):
         self.settings = settings
+
+    async def start(self) -> None:
+        """应用启动时调用，用于提前建立长连接客户端。"""
+
+    async def close(self) -> None:
+        """应用关闭时调用，释放客户端和连接池。"""
         
     @abstractmethod
     async def generate_presigned_url_for_download(
@@ -31,6 +191,23 @@ class BaseStorageService(ABC):
 
     @abstractmethod
     async def download_stream(self, key: str) -> Optional[io.BytesIO]:
+        """读取整个对象到内存，只适合小对象；下载接口等大对象场景使用 open_stream 分块读取。"""
+        pass
+
+    @abstractmethod
+    async def head_object(self, key: str) -> Optional[ObjectInfo]:
+        """读取对象元数据，对象不存在时返回 None。"""
+        pass
+
+    @abstractmethod
+    async def open_stream(
+        self, key: str, byte_range: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ObjectStream]:
+        """
+        以分块流的方式读取对象，内存占用只与 chunk_size 有关。
+        byte_range 为 HTTP Range 头的取值（例如 "bytes=0-1023"），原样交给存储服务处理。
+        对象不存在时返回 None，范围无效时抛出 InvalidRangeError。
+        """
         pass
 
     @abstractmethod
@@ -43,9 +220,160 @@ class BaseStorageService(ABC):
     async def delete_file(self, key: str) -> bool:
         pass
 
+    # 分片上传的底层操作，由 upload_from_stream 调用
+    @abstractmethod
+    async def _create_multipart_upload(self, key: str, content_type: str) -> str:
+        """开始分片上传，返回 upload_id。"""
+        pass
+
+    @abstractmethod
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """上传一个分片（part_number 从 1 开始），返回该分片的 ETag。"""
+        pass
+
+    @abstractmethod
+    async def _complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        """按 (part_number, etag) 的顺序合并分片，完成后对象才可见。"""
+        pass
+
+    @abstractmethod
+    async def _abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """中止分片上传并清理已上传的分片。"""
+        pass
+
+    async def _upload_part_with_retry(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.settings.STORAGE_MULTIPART_RETRIES),
+            wait=wait_exponential(multiplier=0.5, max=10),
+            reraise=True,
+        ):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    logger.warning(f"Retrying part {part_number} of '{key}' (attempt {attempt.retry_state.attempt_number})")
+                etag = await self._upload_part(key, upload_id, part_number, data)
+        return etag
+
+    async def upload_from_stream(
+        self,
+        key: str,
+        source: ByteSource,
+        content_type: str,
+        part_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> bool:
+        """
+        从异步数据源流式上传，不把整个文件读入内存。
+        数据按 part_size 切片后并发上传，同时在途的分片不超过 max_concurrency 个，
+        峰值内存约为 (max_concurrency + 1) * part_size。失败的分片按配置重试；
+        全部成功后完成上传，否则中止分片上传，不会留下不完整的对象。
+        数据不足一个分片时退化为一次普通上传。
+        """
+        part_size = part_size or self.settings.STORAGE_MULTIPART_PART_SIZE
+        max_concurrency = max_concurrency or self.settings.STORAGE_MULTIPART_CONCURRENCY
+        parts_iter = _iter_parts(source, part_size)
+        first = await anext(parts_iter, b"")
+        second = await anext(parts_iter, None)
+        if second is None:
+            return await self.upload_stream(key, first, content_type)
+
+        upload_id = await self._create_multipart_upload(key, content_type)
+        etags: dict[int, str] = {}
+        window = asyncio.Semaphore(max_concurrency)
+
+        async def upload(part_number: int, data: bytes) -> None:
+            try:
+                etags[part_number] = await self._upload_part_with_retry(key, upload_id, part_number, data)
+            finally:
+                window.release()
+
+        async def all_parts() -> AsyncIterator[bytes]:
+            yield first
+            yield second
+            async for data in parts_iter:
+                yield data
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                part_number = 0
+                async for data in all_parts():
+                    # 在途分片达到上限时停止读取数据源，形成背压
+                    await window.acquire()
+                    part_number += 1
+                    task_group.create_task(upload(part_number, data))
+            await self._complete_multipart_upload(key, upload_id, sorted(etags.items()))
+        except BaseException as e:
+            try:
+                await self._abort_multipart_upload(key, upload_id)
+            except Exception:
+                logger.exception(f"Failed to abort multipart upload {upload_id} for '{key}'")
+            if not isinstance(e, Exception):
+                raise
+            logger.exception(f"Multipart upload failed for '{key}'")
+            return False
+
+        logger.info(f"Successfully uploaded '{key}' in {len(etags)} parts")
+        return True
+
+    async def _delete_objects(self, keys: list[str]) -> dict[str, str]:
+        """
+        删除一批 key（不超过 DELETE_BATCH_SIZE 个），返回删除失败的 key -> 错误信息。
+        默认逐个调用 delete_file（并发不超过 STORAGE_BATCH_CONCURRENCY），支持批量删除接口的存储服务应覆盖此方法。
+        """
+        results = await _gather_bounded(self.delete_file, keys, self.settings.STORAGE_BATCH_CONCURRENCY)
+        return {key: "Delete failed" for key, ok in zip(keys, results) if not ok}
+
+    async def delete_files(self, keys: Iterable[str]) -> dict[str, BatchResult]:
+        """
+        批量删除，按 DELETE_BATCH_SIZE 分批调用存储服务的批量删除接口，返回每个 key 的结果。
+        某一批整体失败时，该批所有 key 都记为失败，其余批次不受影响。
+        """
+        keys = list(dict.fromkeys(keys))
+        results: dict[str, BatchResult] = {}
+        for chunk in _chunked(keys, DELETE_BATCH_SIZE):
+            try:
+                errors = await self._delete_objects(chunk)
+            except Exception as e:
+                logger.exception(f"Bulk delete of {len(chunk)} keys failed")
+                errors = {key: str(e) for key in chunk}
+            for key in chunk:
+                error = errors.get(key)
+                results[key] = BatchResult(ok=error is None, error=error)
+        return results
+
+    async def generate_presigned_urls_for_download(
+        self, keys: Iterable[str], expiration: int = 3600
+    ) -> dict[str, BatchResult]:
+        """批量生成下载预签名 URL。预签名只做本地计算，不发起网络请求。"""
+        results: dict[str, BatchResult] = {}
+        for key in keys:
+            url = await self.generate_presigned_url_for_download(key, expiration)
+            results[key] = BatchResult(ok=True, value=url) if url else BatchResult(ok=False, error="Presign failed")
+        return results
+
+    async def head_objects(
+        self, keys: Iterable[str], max_concurrency: Optional[int] = None
+    ) -> dict[str, BatchResult]:
+        """
+        批量读取对象元数据，同时进行的请求不超过 max_concurrency 个。
+        成功时 value 为 ObjectInfo，对象不存在时记为失败，error 为 "NotFound"。
+        """
+        keys = list(dict.fromkeys(keys))
+
+        async def head(key: str) -> BatchResult:
+            try:
+                info = await self.head_object(key)
+            except Exception as e:
+                return BatchResult(ok=False, error=str(e))
+            return BatchResult(ok=True, value=info) if info else BatchResult(ok=False, error="NotFound")
+
+        results = await _gather_bounded(head, keys, max_concurrency or self.settings.STORAGE_BATCH_CONCURRENCY)
+        return dict(zip(keys, results))
+
 class S3StorageService(BaseStorageService):
     """
     一个使用 aioboto3 实现的、遵循最佳实践的异步S3存储服务。
+    S3 客户端在首次使用（或应用启动）时创建并一直复用，连接池和 keep-alive 连接在请求间共享；
+    预签名只涉及本地的签名计算，使用不发起网络请求的同步 botocore 客户端完成。
     """
     def __init__(self,settings : Settings):
         super().__init__(settings)
@@ -56,23 +384,60 @@ class S3StorageService(BaseStorageService):
             region_name=settings.S3_REGION_NAME,
         )
         self.endpoint_url = settings.S3_ENDPOINT_URL
-        self.s3_config = Config(s3={'addressing_style': 'virtual'})
+        self.s3_config = Config(
+            s3={'addressing_style': 'virtual'},
+            max_pool_connections=settings.STORAGE_MAX_POOL_CONNECTIONS,
+            tcp_keepalive=settings.STORAGE_TCP_KEEPALIVE,
+            connect_timeout=settings.STORAGE_CONNECT_TIMEOUT,
+            read_timeout=settings.STORAGE_READ_TIMEOUT,
+        )
+        self._signer = botocore.session.get_session().create_client(
+            "s3",
+            region_name=settings.S3_REGION_NAME,
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+            config=self.s3_config,
+        )
+        self._client = None
+        self._client_lock = asyncio.Lock()
+        self._exit_stack = AsyncExitStack()
+
+    async def _get_client(self):
+        """返回长连接的 S3 客户端，首次调用时创建。"""
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._client = await self._exit_stack.enter_async_context(
+                        self.session.client("s3", endpoint_url=self.endpoint_url, config=self.s3_config)
+                    )
+        return self._client
 
+    async def start(self) -> None:
+        await self._get_client()
+
+    async def close(self) -> None:
+        async with self._client_lock:
+            await self._exit_stack.aclose()
+            self._client = None
+            self._exit_stack = AsyncExitStack()
+
+    @_timed_storage("s3", "generate_presigned_url_for_download")
     async def generate_presigned_url_for_download(
         self, key: str, expiration: int = 3600
     ) -> Optional[str]:
-        async with self.session.client("s3", endpoint_url=self.endpoint_url,config=self.s3_config) as s3_client:
-            try:
-                url = await s3_client.generate_presigned_url(
-                    ClientMethod='get_object',
-                    Params={'Bucket': self.bucket_name, 'Key': key},
-                    ExpiresIn=expiration
-                )
-                return url
-            except ClientError:
-                logger.exception(f"Failed to generate download URL for key '{key}'")
-                return None
+        try:
+            url = self._signer.generate_presigned_url(
+                ClientMethod='get_object',
+                Params={'Bucket': self.bucket_name, 'Key': key},
+                ExpiresIn=expiration
+            )
+            return url
+        except ClientError:
+            logger.exception(f"Failed to generate download URL for key '{key}'")
+            return None
 
+    @_timed_storage("s3", "generate_presigned_url_for_upload")
     async def generate_presigned_url_for_upload(
         self, key: str, content_type: str, expiration: int = 3600
     ) -> Optional[dict]:
@@ -80,76 +445,197 @@ class S3StorageService(BaseStorageService):
         异步生成用于 PUT 上传文件的预签名URL。
         相比POST，PUT方法更简单，客户端直接向此URL发起PUT请求即可。
         """
-        async with self.session.client("s3", endpoint_url=self.endpoint_url,config=self.s3_config) as s3_client:
-            try:
-                # 使用 generate_presigned_url 和 'put_object' 方法生成用于 PUT 上传的 URL
-                url = await s3_client.generate_presigned_url(
-                    ClientMethod='put_object',
-                    Params={
-                        'Bucket': self.bucket_name,
-                        'Key': key,
-                        'ContentType': content_type  # 在签名中指定Content-Type以增强安全性
-                    },
-                    ExpiresIn=expiration
-                )
-                return {'url': url, 'fields': {}}
-            except ClientError:
-                logger.exception(f"Failed to generate PUT upload URL for key '{key}'")
-                return None
+        try:
+            # 使用 generate_presigned_url 和 'put_object' 方法生成用于 PUT 上传的 URL
+            url = self._signer.generate_presigned_url(
+                ClientMethod='put_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': key,
+                    'ContentType': content_type  # 在签名中指定Content-Type以增强安全性
+                },
+                ExpiresIn=expiration
+            )
+            return {'url': url, 'fields': {}}
+        except ClientError:
+            logger.exception(f"Failed to generate PUT upload URL for key '{key}'")
+            return None
 
+    @_timed_storage("s3", "download_stream")
     async def download_stream(self, key: str) -> Optional[io.BytesIO]:
-        async with self.session.client("s3", endpoint_url=self.endpoint_url, config=self.s3_config) as s3_client:
-            try:
-                response = await s3_client.get_object(Bucket=self.bucket_name, Key=key)
-                async with response['Body'] as stream:
-                    content = await stream.read()
-                    logger.info(f"Successfully downloaded {len(content)} bytes from s3://{self.bucket_name}/{key}")
-                    return io.BytesIO(content)
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'NoSuchKey':
-                    logger.warning(f"File not found at s3://{self.bucket_name}/{key}")
-                else:
-                    logger.exception(f"Failed to download file from s3://{self.bucket_name}/{key}")
+        s3_client = await self._get_client()
+        try:
+            response = await s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            async with response['Body'] as stream:
+                content = await stream.read()
+                logger.info(f"Successfully downloaded {len(content)} bytes from s3://{self.bucket_name}/{key}")
+                return io.BytesIO(content)
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchKey':
+                logger.warning(f"File not found at s3://{self.bucket_name}/{key}")
+            else:
+                logger.exception(f"Failed to download file from s3://{self.bucket_name}/{key}")
+            return None
+
+    @_timed_storage("s3", "head_object")
+    async def head_object(self, key: str) -> Optional[ObjectInfo]:
+        s3_client = await self._get_client()
+        try:
+            response = await s3_client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
                 return None
+            logger.exception(f"Failed to head s3://{self.bucket_name}/{key}")
+            raise
+        return ObjectInfo(
+            key=key,
+            size=response['ContentLength'],
+            etag=response.get('ETag'),
+            content_type=response.get('ContentType'),
+            last_modified=response.get('LastModified'),
+        )
 
-    async def upload_stream(self, key: str, data: Union[bytes, io.BytesIO], content_type: str) -> bool:
-        async with self.session.client("s3", endpoint_url=self.endpoint_url, config=self.s3_config) as s3_client:
+    @_timed_storage("s3", "open_stream")
+    async def open_stream(
+        self, key: str, byte_range: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ObjectStream]:
+        s3_client = await self._get_client()
+        params = {'Bucket': self.bucket_name, 'Key': key}
+        if byte_range:
+            params['Range'] = byte_range
+        try:
+            response = await s3_client.get_object(**params)
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code == 'NoSuchKey':
+                logger.warning(f"File not found at s3://{self.bucket_name}/{key}")
+                return None
+            if code == 'InvalidRange':
+                size = e.response['Error'].get('ActualObjectSize')
+                raise InvalidRangeError(int(size) if size else None)
+            logger.exception(f"Failed to open stream for s3://{self.bucket_name}/{key}")
+            raise
+
+        body = response['Body']
+
+        async def iter_chunks() -> AsyncIterator[bytes]:
             try:
-                if isinstance(data, bytes):
-                    file_obj = io.BytesIO(data)
-                elif isinstance(data, io.BytesIO):
-                    file_obj = data
-                    file_obj.seek(0) # Ensure stream is at the beginning
-                else:
-                    raise TypeError("data must be bytes or io.BytesIO")
+                while chunk := await body.read(chunk_size):
+                    yield chunk
+            finally:
+                body.close()
+
+        content_length = response['ContentLength']
+        content_range = response.get('ContentRange')
+        return ObjectStream(
+            info=ObjectInfo(
+                key=key,
+                size=_size_from_content_range(content_range, content_length),
+                etag=response.get('ETag'),
+                content_type=response.get('ContentType'),
+                last_modified=response.get('LastModified'),
+            ),
+            content_length=content_length,
+            content_range=content_range,
+            chunks=iter_chunks(),
+        )
+
+    @_timed_storage("s3", "upload_stream")
+    async def upload_stream(self, key: str, data: Union[bytes, io.BytesIO], content_type: str) -> bool:
+        s3_client = await self._get_client()
+        try:
+            if isinstance(data, bytes):
+                file_obj = io.BytesIO(data)
+            elif isinstance(data, io.BytesIO):
+                file_obj = data
+                file_obj.seek(0) # Ensure stream is at the beginning
+            else:
+                raise TypeError("data must be bytes or io.BytesIO")
+
+            await s3_client.upload_fileobj(
+                file_obj,
+                self.bucket_name,
+                key,
+                ExtraArgs={'ContentType': content_type}
+            )
+            logger.info(f"Successfully uploaded file to s3://{self.bucket_name}/{key}")
+            return True
+        except ClientError:
+            logger.exception(f"Failed to upload file to s3://{self.bucket_name}/{key}")
+            return False
+
+    @_timed_storage("s3", "create_multipart_upload")
+    async def _create_multipart_upload(self, key: str, content_type: str) -> str:
+        s3_client = await self._get_client()
+        response = await s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=key, ContentType=content_type)
+        return response['UploadId']
+
+    @_timed_storage("s3", "upload_part")
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        s3_client = await self._get_client()
+        response = await s3_client.upload_part(
+            Bucket=self.bucket_name, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        return response['ETag']
+
+    @_timed_storage("s3", "complete_multipart_upload")
+    async def _complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        s3_client = await self._get_client()
+        await s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': etag} for number, etag in parts]},
+        )
+
+    @_timed_storage("s3", "abort_multipart_upload")
+    async def _abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        s3_client = await self._get_client()
+        await s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+
+    @_timed_storage("s3", "delete_objects")
+    async def _delete_objects(self, keys: list[str]) -> dict[str, str]:
+        s3_client = await self._get_client()
+        response = await s3_client.delete_objects(
+            Bucket=self.bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+        )
+        return {error['Key']: f"{error.get('Code')}: {error.get('Message')}" for error in response.get('Errors', [])}
 
-                await s3_client.upload_fileobj(
-                    file_obj,
-                    self.bucket_name,
-                    key,
-                    ExtraArgs={'ContentType': content_type}
+    @_timed_storage("s3", "generate_presigned_urls_for_download")
+    async def generate_presigned_urls_for_download(
+        self, keys: Iterable[str], expiration: int = 3600
+    ) -> dict[str, BatchResult]:
+        results: dict[str, BatchResult] = {}
+        for key in keys:
+            try:
+                url = self._signer.generate_presigned_url(
+                    ClientMethod='get_object',
+                    Params={'Bucket': self.bucket_name, 'Key': key},
+                    ExpiresIn=expiration
                 )
-                logger.info(f"Successfully uploaded file to s3://{self.bucket_name}/{key}")
-                return True
-            except ClientError:
-                logger.exception(f"Failed to upload file to s3://{self.bucket_name}/{key}")
-                return False
+                results[key] = BatchResult(ok=True, value=url)
+            except ClientError as e:
+                results[key] = BatchResult(ok=False, error=str(e))
+        return results
 
+    @_timed_storage("s3", "delete_file")
     async def delete_file(self, key: str) -> bool:
-        async with self.session.client("s3", endpoint_url=self.endpoint_url,config=self.s3_config) as s3_client:
-            try:
-                await s3_client.delete_object(Bucket=self.bucket_name, Key=key)
-                logger.info(f"Successfully deleted s3://{self.bucket_name}/{key}")
-                return True
-            except ClientError:
-                logger.exception(f"Failed to delete file at s3://{self.bucket_name}/{key}")
-                return False
+        s3_client = await self._get_client()
+        try:
+            await s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+            logger.info(f"Successfully deleted s3://{self.bucket_name}/{key}")
+            return True
+        except ClientError:
+            logger.exception(f"Failed to delete file at s3://{self.bucket_name}/{key}")
+            return False
 
             
 class COSStorageService(BaseStorageService):
     """
     使用腾讯云对象存储(COS)的服务实现。
     本实现通过 asyncio.to_thread 将同步的SDK调用转换为真正的异步非阻塞操作。
+    客户端持有独立的 HTTP 连接池（keep-alive），在请求间复用，应用关闭时释放。
     """
 
     def __init__(self, settings: Settings):
@@ -160,16 +646,31 @@ class COSStorageService(BaseStorageService):
                 Region=self.settings.TENCENT_COS_REGION,
                 SecretId=self.settings.TENCENT_COS_SECRET_ID,
                 SecretKey=self.settings.TENCENT_COS_SECRET_KEY,
+                Timeout=self.settings.STORAGE_READ_TIMEOUT,
+                KeepAlive=self.settings.STORAGE_TCP_KEEPALIVE,
+                PoolConnections=self.settings.STORAGE_MAX_POOL_CONNECTIONS,
+                PoolMaxSize=self.settings.STORAGE_MAX_POOL_CONNECTIONS,
+            )
+            self.http_session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.settings.STORAGE_MAX_POOL_CONNECTIONS,
+                pool_maxsize=self.settings.STORAGE_MAX_POOL_CONNECTIONS,
             )
-            self.client: CosS3Client = CosS3Client(config)
+            self.http_session.mount("http://", adapter)
+            self.http_session.mount("https://", adapter)
+            self.client: CosS3Client = CosS3Client(config, session=self.http_session)
         except Exception as e:
             logger.error(f"Failed to initialize Tencent COS client: {e}")
             raise
 
+    async def close(self) -> None:
+        self.http_session.close()
+
     async def _run_in_thread(self, func, *args, **kwargs):
         """辅助函数，用于在线程池中运行阻塞函数"""
         return await asyncio.to_thread(func, *args, **kwargs)
 
+    @_timed_storage("cos", "generate_presigned_url_for_download")
     async def generate_presigned_url_for_download(
         self, key: str, expiration: int = 3600
     ) -> Optional[str]:
@@ -177,8 +678,8 @@ class COSStorageService(BaseStorageService):
         异步生成用于下载文件的预签名URL。
         """
         try:
-            url = await self._run_in_thread(
-                self.client.get_presigned_download_url,
+            # 预签名只做本地签名计算，直接调用比切换到线程池更快
+            url = self.client.get_presigned_download_url(
                 Bucket=self.bucket,
                 Key=key,
                 Expired=expiration
@@ -188,6 +689,7 @@ class COSStorageService(BaseStorageService):
             logger.error(f"Error generating download URL for {key}: {e.get_error_code()} - {e.get_error_msg()}")
             return None
 
+    @_timed_storage("cos", "generate_presigned_url_for_upload")
     async def generate_presigned_url_for_upload(
         self, key: str, content_type: str, expiration: int = 3600
     ) -> Optional[dict]:
@@ -196,9 +698,8 @@ class COSStorageService(BaseStorageService):
         客户端在使用此URL进行PUT上传时，必须将请求头中的 Content-Type 设置为这里指定的 content_type。
         """
         try:
-            # 将同步方法放入线程中执行，方法改为'PUT'
-            url = await self._run_in_thread(
-                self.client.get_presigned_url,
+            # 预签名只做本地签名计算，方法改为'PUT'
+            url = self.client.get_presigned_url(
                 Bucket=self.bucket,
                 Key=key,
                 Method='PUT',
@@ -209,6 +710,7 @@ class COSStorageService(BaseStorageService):
             logger.error(f"Error generating PUT upload URL for {key}: {e.get_error_code()} - {e.get_error_msg()}")
             return None
 
+    @_timed_storage("cos", "download_stream")
     async def download_stream(self, key: str) -> Optional[io.BytesIO]:
         """
         异步下载文件并返回一个内存中的字节流。
@@ -228,6 +730,78 @@ class COSStorageService(BaseStorageService):
                 logger.error(f"Error downloading {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
             return None
 
+    @_timed_storage("cos", "head_object")
+    async def head_object(self, key: str) -> Optional[ObjectInfo]:
+        """
+        异步读取对象元数据。
+        """
+        try:
+            response = await self._run_in_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+        except CosServiceError as e:
+            if e.get_status_code() == 404:
+                return None
+            logger.error(f"Error reading metadata of {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
+            raise
+        return ObjectInfo(
+            key=key,
+            size=int(response['Content-Length']),
+            etag=response.get('ETag'),
+            content_type=response.get('Content-Type'),
+            last_modified=_parse_http_date(response.get('Last-Modified')),
+        )
+
+    @_timed_storage("cos", "open_stream")
+    async def open_stream(
+        self, key: str, byte_range: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ObjectStream]:
+        """
+        异步分块读取对象，每次只在线程中读取一个分块。
+        """
+        params = {'Bucket': self.bucket, 'Key': key}
+        if byte_range:
+            params['Range'] = byte_range
+        try:
+            response = await self._run_in_thread(self.client.get_object, **params)
+        except CosServiceError as e:
+            if e.get_status_code() == 404:
+                logger.warning(f"File not found on COS: {key}")
+                return None
+            if e.get_error_code() == 'InvalidRange':
+                raise InvalidRangeError()
+            logger.error(f"Error opening stream for {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
+            raise
+
+        raw = response['Body'].get_raw_stream()
+
+        async def iter_chunks() -> AsyncIterator[bytes]:
+            completed = False
+            try:
+                while chunk := await self._run_in_thread(raw.read, chunk_size):
+                    yield chunk
+                completed = True
+            finally:
+                # 读完时把连接归还连接池；中途停止时连接上还有未读数据，只能关闭
+                if completed:
+                    raw.release_conn()
+                else:
+                    raw.close()
+
+        content_length = int(response['Content-Length'])
+        content_range = response.get('Content-Range')
+        return ObjectStream(
+            info=ObjectInfo(
+                key=key,
+                size=_size_from_content_range(content_range, content_length),
+                etag=response.get('ETag'),
+                content_type=response.get('Content-Type'),
+                last_modified=_parse_http_date(response.get('Last-Modified')),
+            ),
+            content_length=content_length,
+            content_range=content_range,
+            chunks=iter_chunks(),
+        )
+
+    @_timed_storage("cos", "upload_stream")
     async def upload_stream(
         self, key: str, data: Union[bytes, io.BytesIO], content_type: str
     ) -> bool:
@@ -247,6 +821,64 @@ class COSStorageService(BaseStorageService):
             logger.error(f"Error uploading {key} to COS: {e.get_error_code()} - {e.get_error_msg()}")
             return False
 
+    @_timed_storage("cos", "create_multipart_upload")
+    async def _create_multipart_upload(self, key: str, content_type: str) -> str:
+        response = await self._run_in_thread(
+            self.client.create_multipart_upload, Bucket=self.bucket, Key=key, ContentType=content_type
+        )
+        return response['UploadId']
+
+    @_timed_storage("cos", "upload_part")
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        response = await self._run_in_thread(
+            self.client.upload_part, Bucket=self.bucket, Key=key, Body=data, PartNumber=part_number, UploadId=upload_id
+        )
+        return response['ETag']
+
+    @_timed_storage("cos", "complete_multipart_upload")
+    async def _complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        await self._run_in_thread(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Part': [{'PartNumber': number, 'ETag': etag} for number, etag in parts]},
+        )
+
+    @_timed_storage("cos", "abort_multipart_upload")
+    async def _abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self._run_in_thread(self.client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    @_timed_storage("cos", "delete_objects")
+    async def _delete_objects(self, keys: list[str]) -> dict[str, str]:
+        response = await self._run_in_thread(
+            self.client.delete_objects,
+            Bucket=self.bucket,
+            Delete={'Object': [{'Key': key} for key in keys], 'Quiet': 'true'},
+        )
+        errors = response.get('Error', [])
+        # 只有一个错误时 SDK 返回的是 dict 而不是 list
+        if isinstance(errors, dict):
+            errors = [errors]
+        return {error['Key']: f"{error.get('Code')}: {error.get('Message')}" for error in errors}
+
+    @_timed_storage("cos", "generate_presigned_urls_for_download")
+    async def generate_presigned_urls_for_download(
+        self, keys: Iterable[str], expiration: int = 3600
+    ) -> dict[str, BatchResult]:
+        """
+        批量生成下载预签名 URL，在当前线程中一次算完。
+        """
+        results: dict[str, BatchResult] = {}
+        for key in keys:
+            try:
+                url = self.client.get_presigned_download_url(Bucket=self.bucket, Key=key, Expired=expiration)
+                results[key] = BatchResult(ok=True, value=url)
+            except CosServiceError as e:
+                results[key] = BatchResult(ok=False, error=f"{e.get_error_code()}: {e.get_error_msg()}")
+        return results
+
+    @_timed_storage("cos", "delete_file")
     async def delete_file(self, key: str) -> bool:
         """
         异步从COS删除指定的文件。
@@ -262,11 +894,1047 @@ class COSStorageService(BaseStorageService):
             logger.error(f"Error deleting {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
             return False
 
+def _cos_quote(value: str) -> str:
+    return quote(value, safe="-_.~")
+
+
+def cos_authorization(
+    secret_id: str,
+    secret_key: str,
+    method: str,
+    path: str,
+    params: Optional[Dict[str, str]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    expire: int = 3600,
+    now: Optional[int] = None,
+) -> str:
+    """
+    在进程内计算 COS XML API 的 V5 请求签名（HMAC-SHA1），结果用作 Authorization 头或预签名 URL 的查询参数。
+    path 为未编码的对象路径（以 / 开头），params/headers 为参与签名的查询参数和请求头。
+    """
+    start = int(time.time()) if now is None else now
+    sign_time = f"{start - 60};{start + expire}"
+    encoded_params = {_cos_quote(k).lower(): _cos_quote(v) for k, v in (params or {}).items()}
+    encoded_headers = {_cos_quote(k).lower(): _cos_quote(v) for k, v in (headers or {}).items()}
+    http_string = "{method}\n{path}\n{params}\n{headers}\n".format(
+        method=method.lower(),
+        path=path,
+        params="&".join(f"{k}={v}" for k, v in sorted(encoded_params.items())),
+        headers="&".join(f"{k}={v}" for k, v in sorted(encoded_headers.items())),
+    )
+    string_to_sign = f"sha1\n{sign_time}\n{hashlib.sha1(http_string.encode()).hexdigest()}\n"
+    sign_key = hmac.new(secret_key.encode(), sign_time.encode(), hashlib.sha1).hexdigest()
+    signature = hmac.new(sign_key.encode(), string_to_sign.encode(), hashlib.sha1).hexdigest()
+    return (
+        f"q-sign-algorithm=sha1&q-ak={secret_id}&q-sign-time={sign_time}&q-key-time={sign_time}"
+        f"&q-header-list={';'.join(sorted(encoded_headers))}&q-url-param-list={';'.join(sorted(encoded_params))}"
+        f"&q-signature={signature}"
+    )
+
+
+class AsyncCOSStorageService(BaseStorageService):
+    """
+    原生异步的腾讯云对象存储(COS)服务实现，可通过 StorageFactory 以 "cos_async" 替换 "cos"。
+    请求签名在进程内计算，I/O 通过带连接池和 keep-alive 的 httpx.AsyncClient 完成，
+    不占用默认线程池；响应体按块异步读取。错误同样以 CosServiceError 抛出，便于与同步实现互换。
+    """
+
+    def __init__(self, settings: Settings):
+        super().__init__(settings)
+        self.bucket = settings.TENCENT_COS_BUCKET
+        self.secret_id = settings.TENCENT_COS_SECRET_ID
+        self.secret_key = settings.TENCENT_COS_SECRET_KEY
+        self.host = f"{self.bucket}.cos.{settings.TENCENT_COS_REGION}.myqcloud.com"
+        self.base_url = f"https://{self.host}"
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.settings.STORAGE_MAX_POOL_CONNECTIONS,
+                    max_keepalive_connections=self.settings.STORAGE_MAX_POOL_CONNECTIONS if self.settings.STORAGE_TCP_KEEPALIVE else 0,
+                ),
+                timeout=httpx.Timeout(self.settings.STORAGE_READ_TIMEOUT, connect=self.settings.STORAGE_CONNECT_TIMEOUT),
+            )
+        return self._client
+
+    async def start(self) -> None:
+        self._get_client()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _url(self, key: str) -> str:
+        return f"{self.base_url}/{quote(key, safe='/-_.~')}"
+
+    def _build_request(
+        self,
+        method: str,
+        key: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Optional[bytes] = None,
+    ) -> httpx.Request:
+        params = params or {}
+        headers = dict(headers or {})
+        headers["Authorization"] = cos_authorization(
+            self.secret_id, self.secret_key, method, f"/{key}", params, {"host": self.host}
+        )
+        return self._get_client().build_request(method, self._url(key), params=params, headers=headers, content=content)
+
+    async def _send(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        response = await self._get_client().send(request, stream=stream)
+        if response.status_code >= 400:
+            body = await response.aread()
+            await response.aclose()
+            # HEAD 等请求的错误响应没有响应体，按状态码构造错误信息
+            message = body.decode("utf-8", errors="replace") if body else {
+                "code": str(response.status_code),
+                "message": response.reason_phrase,
+                "resource": request.url.path,
+                "requestid": response.headers.get("x-cos-request-id", ""),
+                "traceid": response.headers.get("x-cos-trace-id", ""),
+            }
+            raise CosServiceError(request.method, message, response.status_code)
+        return response
+
+    async def _request(self, method: str, key: str, **kwargs) -> httpx.Response:
+        return await self._send(self._build_request(method, key, **kwargs))
+
+    def _presign(self, method: str, key: str, expiration: int, now: Optional[int] = None) -> str:
+        sign = cos_authorization(self.secret_id, self.secret_key, method, f"/{key}", {}, {"host": self.host}, expiration, now)
+        return f"{self._url(key)}?{urlencode(dict(item.split('=', 1) for item in sign.split('&')))}"
+
+    @staticmethod
+    def _object_info(key: str, response: httpx.Response, size: Optional[int] = None) -> ObjectInfo:
+        return ObjectInfo(
+            key=key,
+            size=size if size is not None else int(response.headers.get("content-length", 0)),
+            etag=response.headers.get("etag"),
+            content_type=response.headers.get("content-type"),
+            last_modified=_parse_http_date(response.headers.get("last-modified")),
+        )
+
+    @_timed_storage("cos_async", "generate_presigned_url_for_download")
+    async def generate_presigned_url_for_download(
+        self, key: str, expiration: int = 3600
+    ) -> Optional[str]:
+        return self._presign("GET", key, expiration)
+
+    @_timed_storage("cos_async", "generate_presigned_url_for_upload")
+    async def generate_presigned_url_for_upload(
+        self, key: str, content_type: str, expiration: int = 3600
+    ) -> Optional[dict]:
+        return {'url': self._presign("PUT", key, expiration), 'fields': {}}
+
+    @_timed_storage("cos_async", "download_stream")
+    async def download_stream(self, key: str) -> Optional[io.BytesIO]:
+        try:
+            response = await self._request("GET", key)
+            return io.BytesIO(response.content)
+        except CosServiceError as e:
+            if e.get_status_code() == 404:
+                logger.warning(f"File not found on COS: {key}")
+            else:
+                logger.error(f"Error downloading {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
+            return None
+
+    @_timed_storage("cos_async", "head_object")
+    async def head_object(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            response = await self._request("HEAD", key)
+        except CosServiceError as e:
+            if e.get_status_code() == 404:
+                return None
+            logger.error(f"Error reading metadata of {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
+            raise
+        return self._object_info(key, response)
+
+    @_timed_storage("cos_async", "open_stream")
+    async def open_stream(
+        self, key: str, byte_range: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ObjectStream]:
+        request = self._build_request("GET", key, headers={"Range": byte_range} if byte_range else None)
+        try:
+            response = await self._send(request, stream=True)
+        except CosServiceError as e:
+            if e.get_status_code() == 404:
+                logger.warning(f"File not found on COS: {key}")
+                return None
+            if e.get_status_code() == 416:
+                raise InvalidRangeError()
+            logger.error(f"Error opening stream for {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
+            raise
+
+        async def iter_chunks() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+            finally:
+                await response.aclose()
+
+        content_length = int(response.headers.get("content-length", 0))
+        content_range = response.headers.get("content-range")
+        return ObjectStream(
+            info=self._object_info(key, response, _size_from_content_range(content_range, content_length)),
+            content_length=content_length,
+            content_range=content_range,
+            chunks=iter_chunks(),
+        )
+
+    @_timed_storage("cos_async", "upload_stream")
+    async def upload_stream(
+        self, key: str, data: Union[bytes, io.BytesIO], content_type: str
+    ) -> bool:
+        content = data.getvalue() if isinstance(data, io.BytesIO) else data
+        try:
+            response = await self._request("PUT", key, headers={"Content-Type": content_type}, content=content)
+            return "etag" in response.headers
+        except CosServiceError as e:
+            logger.error(f"Error uploading {key} to COS: {e.get_error_code()} - {e.get_error_msg()}")
+            return False
+
+    @_timed_storage("cos_async", "create_multipart_upload")
+    async def _create_multipart_upload(self, key: str, content_type: str) -> str:
+        response = await self._request("POST", key, params={"uploads": ""}, headers={"Content-Type": content_type})
+        return ElementTree.fromstring(response.content).findtext("UploadId")
+
+    @_timed_storage("cos_async", "upload_part")
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        response = await self._request(
+            "PUT", key, params={"partNumber": str(part_number), "uploadId": upload_id}, content=data
+        )
+        return response.headers["etag"]
+
+    @_timed_storage("cos_async", "complete_multipart_upload")
+    async def _complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        body = "<CompleteMultipartUpload>{}</CompleteMultipartUpload>".format(
+            "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{xml_escape(etag)}</ETag></Part>"
+                for number, etag in parts
+            )
+        )
+        response = await self._request(
+            "POST", key, params={"uploadId": upload_id}, headers={"Content-Type": "application/xml"}, content=body.encode()
+        )
+        # 合并失败时 COS 可能返回 200 且响应体为错误信息
+        if b"<Error>" in response.content:
+            raise CosServiceError("POST", response.text, response.status_code)
+
+    @_timed_storage("cos_async", "abort_multipart_upload")
+    async def _abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self._request("DELETE", key, params={"uploadId": upload_id})
+
+    @_timed_storage("cos_async", "delete_objects")
+    async def _delete_objects(self, keys: list[str]) -> dict[str, str]:
+        body = "<Delete><Quiet>true</Quiet>{}</Delete>".format(
+            "".join(f"<Object><Key>{xml_escape(key)}</Key></Object>" for key in keys)
+        ).encode()
+        response = await self._request(
+            "POST",
+            "",
+            params={"delete": ""},
+            headers={
+                "Content-Type": "application/xml",
+                "Content-MD5": base64.b64encode(hashlib.md5(body).digest()).decode(),
+            },
+            content=body,
+        )
+        return {
+            error.findtext("Key"): f"{error.findtext('Code')}: {error.findtext('Message')}"
+            for error in ElementTree.fromstring(response.content).iter("Error")
+        }
+
+    @_timed_storage("cos_async", "generate_presigned_urls_for_download")
+    async def generate_presigned_urls_for_download(
+        self, keys: Iterable[str], expiration: int = 3600
+    ) -> dict[str, BatchResult]:
+        # 同一批使用相同的签名起始时间
+        now = int(time.time())
+        return {key: BatchResult(ok=True, value=self._presign("GET", key, expiration, now)) for key in keys}
+
+    @_timed_storage("cos_async", "delete_file")
+    async def delete_file(self, key: str) -> bool:
+        try:
+            await self._request("DELETE", key)
+            return True
+        except CosServiceError as e:
+            logger.error(f"Error deleting {key} from COS: {e.get_error_code()} - {e.get_error_msg()}")
+            return False
+
+# 缓存文件所在的子目录，以及其中由缓存创建的文件名：对象文件为 key 的 SHA-256，下载中的临时文件带固定前缀
+_CACHE_SUBDIR = "objects"
+_CACHE_TMP_PREFIX = "fetch-"
+_CACHE_FILE_PATTERN = re.compile(rf"[0-9a-f]{{64}}|{_CACHE_TMP_PREFIX}.+\.tmp")
+# 每个进程在 objects 下使用独立的目录（进程号-随机后缀），目录中的锁文件在进程存活期间一直持有
+_CACHE_PROCESS_DIR_PATTERN = re.compile(r"\d+-[0-9a-f]{8}")
+_CACHE_LOCK_FILE = ".lock"
+
+
+@dataclass
+class _CacheEntry:
+    path: str
+    size: int
+    etag: Optional[str]
+    content_type: Optional[str]
+    last_modified: Optional[datetime.datetime]
+    validated_at: float
+
+    def info(self, key: str) -> ObjectInfo:
+        return ObjectInfo(
+            key=key, size=self.size, etag=self.etag, content_type=self.content_type, last_modified=self.last_modified
+        )
+
+
+def _resolve_range(byte_range: str, size: int) -> tuple[int, int]:
+    """把 "bytes=a-b" / "bytes=a-" / "bytes=-n" 解析为闭区间 (start, end)，无法满足时抛出 InvalidRangeError。"""
+    spec = byte_range.strip()
+    if not spec.startswith("bytes="):
+        raise InvalidRangeError(size)
+    start_text, _, end_text = spec[len("bytes="):].partition("-")
+    try:
+        if not start_text:
+            length = int(end_text)
+            start, end = max(size - length, 0), size - 1
+            if length == 0:
+                raise InvalidRangeError(size)
+        else:
+            start = int(start_text)
+            end = min(int(end_text), size - 1) if end_text else size - 1
+    except ValueError:
+        raise InvalidRangeError(size)
+    if start >= size or start > end:
+        raise InvalidRangeError(size)
+    return start, end
+
+
+class CachedStorageService(BaseStorageService):
+    """
+    读穿透的本地磁盘缓存，可包装任意 BaseStorageService（由 StorageFactory 根据 STORAGE_CACHE_ENABLED 包装）。
+
+    - 对象完整下载到本进程独立的缓存目录，按总字节数做 LRU 淘汰，超过单对象上限的对象不缓存。
+      容量上限按进程计算，多 worker 部署时磁盘占用最多为 worker 数 × STORAGE_CACHE_MAX_BYTES。
+    - 命中时通过 mmap 读取，流式下载直接产出 mmap 的 memoryview 切片，不额外复制。
+    - 距上次校验超过 STORAGE_CACHE_VALIDATE_SECONDS 时先用 HEAD 比较 ETag，不一致则重新下载；
+      HEAD 请求出错时记录警告并继续使用缓存副本。
+    - 同一 key 的并发未命中只会触发一次回源下载。
+    - 上传和删除会使对应缓存失效；其他操作（预签名、HEAD 等）直接转发给被包装的服务。
+    """
+
+    def __init__(self, inner: BaseStorageService, settings: Settings, cache_dir: Optional[str] = None):
+        super().__init__(settings)
+        self.inner = inner
+        # 缓存文件放在独立的子目录中，配置的目录里的其他文件不受影响；
+        # 多个 worker / 容器共享同一目录时，每个进程使用自己的目录，互不删除或覆盖对方的文件
+        self.base_dir = Path(cache_dir or settings.STORAGE_CACHE_DIR) / _CACHE_SUBDIR
+        self.cache_dir = self.base_dir / f"{os.getpid()}-{secrets.token_hex(4)}"
+        self.max_bytes = settings.STORAGE_CACHE_MAX_BYTES
+        self.max_object_bytes = settings.STORAGE_CACHE_MAX_OBJECT_BYTES
+        self.validate_seconds = settings.STORAGE_CACHE_VALIDATE_SECONDS
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._size = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        # 回源下载期间被失效的 key，下载结果不能写入缓存
+        self._dirty: set[str] = set()
+        # 超过单对象上限的 key，直接转发，避免每次都先回源一次
+        self._oversized: set[str] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.validations = 0
+        self.stale = 0
+        self.validation_errors = 0
+        self.evictions = 0
+        self.bypassed = 0
+        self.bytes_served = 0
+        self.bytes_fetched = 0
+
+        # 先在不参与清理的临时目录中建立并锁定锁文件，再改名为正式目录，其他进程不会看到未加锁的目录
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        init_dir = Path(tempfile.mkdtemp(dir=self.base_dir, prefix=".init-"))
+        self._lock_fd: Optional[int] = os.open(init_dir / _CACHE_LOCK_FILE, os.O_CREAT | os.O_RDWR, 0o600)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.rename(init_dir, self.cache_dir)
+        self._cleanup_stale_dirs()
+
+    def _cleanup_stale_dirs(self) -> None:
+        """
+        缓存元数据只保存在内存中，已退出的进程遗留的缓存目录无法校验，直接清理。
+        能拿到目录锁说明其所属进程已经退出；仍被持有的目录属于其他存活的进程，不做处理。
+        另外清理旧版本直接放在 objects 下的缓存文件。只删除缓存自己创建的文件和目录。
+        """
+        for path in self.base_dir.iterdir():
+            if _CACHE_FILE_PATTERN.fullmatch(path.name) and path.is_file():
+                path.unlink(missing_ok=True)
+                continue
+            if path == self.cache_dir or not _CACHE_PROCESS_DIR_PATTERN.fullmatch(path.name):
+                continue
+            try:
+                fd = os.open(path / _CACHE_LOCK_FILE, os.O_RDWR)
+            except OSError:
+                # 目录刚创建、锁文件尚未建立，留给下一次启动处理
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                os.close(fd)
+
+    async def start(self) -> None:
+        await self.inner.start()
+
+    async def close(self) -> None:
+        """关闭被包装的服务并删除本进程的缓存目录。"""
+        try:
+            await self.inner.close()
+        finally:
+            self._entries.clear()
+            self._size = 0
+            if self._lock_fd is not None:
+                shutil.rmtree(self.cache_dir, ignore_errors=True)
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / hashlib.sha256(key.encode()).hexdigest()
+
+    def _remove(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+        return entry
+
+    def invalidate(self, key: str) -> None:
+        """使 key 的缓存失效。已经打开的读取不受影响（文件删除后已有的 mmap 仍然有效）。"""
+        self._oversized.discard(key)
+        if key in self._inflight:
+            self._dirty.add(key)
+        entry = self._remove(key)
+        if entry is not None:
+            Path(entry.path).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            Path(entry.path).unlink(missing_ok=True)
+            self.evictions += 1
+
+    async def _fetch(self, key: str) -> Optional[_CacheEntry]:
+        """回源下载完整对象写入缓存，对象不存在或超过单对象上限时返回 None。"""
+        try:
+            return await self._fetch_object(key)
+        finally:
+            # 无论回源以何种方式结束都清除失效标记，避免残留到下一次回源
+            self._dirty.discard(key)
+
+    async def _fetch_object(self, key: str) -> Optional[_CacheEntry]:
+        stream = await self.inner.open_stream(key, chunk_size=self.settings.STORAGE_DOWNLOAD_CHUNK_SIZE)
+        if stream is None:
+            return None
+        if stream.info.size > self.max_object_bytes:
+            await stream.chunks.aclose()
+            self._oversized.add(key)
+            return None
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=_CACHE_TMP_PREFIX, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in stream.chunks:
+                    await asyncio.to_thread(f.write, chunk)
+            if key in self._dirty:
+                os.unlink(tmp_path)
+                return None
+            path = self._path(key)
+            self._remove(key)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        entry = _CacheEntry(
+            path=str(path),
+            size=stream.info.size,
+            etag=stream.info.etag,
+            content_type=stream.info.content_type,
+            last_modified=stream.info.last_modified,
+            validated_at=time.monotonic(),
+        )
+        self._entries[key] = entry
+        self._size += entry.size
+        self.bytes_fetched += entry.size
+        self._evict()
+        return entry
+
+    async def _get_entry(self, key: str) -> Optional[_CacheEntry]:
+        if key in self._oversized:
+            self.bypassed += 1
+            return None
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.validated_at >= self.validate_seconds:
+            self.validations += 1
+            try:
+                info = await self.inner.head_object(key)
+            except Exception:
+                # 存储服务暂时不可用时继续使用缓存副本，下一个校验周期再重试
+                self.validation_errors += 1
+                logger.warning(f"Cache revalidation failed for {key}, serving cached copy", exc_info=True)
+                entry.validated_at = time.monotonic()
+            else:
+                if info is None or info.etag != entry.etag:
+                    self.stale += 1
+                    self.invalidate(key)
+                else:
+                    entry.validated_at = time.monotonic()
+            entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # 回源任务独立于发起它的请求，某个请求被取消不会影响其他等待者
+        return await asyncio.shield(task)
+
+    async def download_stream(self, key: str) -> Optional[io.BytesIO]:
+        """
+        按接口约定返回内存中的完整副本：命中时在工作线程中把缓存文件一次读入 BytesIO，不阻塞事件循环。
+        需要零拷贝发送的调用方（例如下载接口）应使用 open_stream，直接产出 mmap 的 memoryview 切片。
+        """
+        entry = await self._get_entry(key)
+        if entry is not None:
+            try:
+                data = await asyncio.to_thread(Path(entry.path).read_bytes)
+            except FileNotFoundError:
+                # 读取前缓存文件已被淘汰
+                pass
+            else:
+                self.bytes_served += len(data)
+                return io.BytesIO(data)
+        return await self.inner.download_stream(key)
+
+    async def open_stream(
+        self, key: str, byte_range: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ObjectStream]:
+        entry = await self._get_entry(key)
+        if entry is None:
+            return await self.inner.open_stream(key, byte_range, chunk_size)
+
+        start, end = 0, entry.size - 1
+        content_range = None
+        if byte_range:
+            start, end = _resolve_range(byte_range, entry.size)
+            content_range = f"bytes {start}-{end}/{entry.size}"
+        try:
+            f = open(entry.path, "rb")
+        except FileNotFoundError:
+            return await self.inner.open_stream(key, byte_range, chunk_size)
+
+        async def iter_chunks() -> AsyncIterator[bytes]:
+            try:
+                if entry.size == 0:
+                    return
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                view = memoryview(mm)
+                try:
+                    for offset in range(start, end + 1, chunk_size):
+                        chunk = view[offset:min(offset + chunk_size, end + 1)]
+                        self.bytes_served += len(chunk)
+                        yield chunk
+                finally:
+                    del view
+                    try:
+                        mm.close()
+                    except BufferError:
+                        # 仍有切片被消费方引用，mmap 会在引用释放后自动关闭
+                        pass
+            finally:
+                f.close()
+
+        return ObjectStream(
+            info=entry.info(key),
+            content_length=end - start + 1 if entry.size else 0,
+            content_range=content_range,
+            chunks=iter_chunks(),
+        )
+
+    async def head_object(self, key: str) -> Optional[ObjectInfo]:
+        return await self.inner.head_object(key)
+
+    async def head_objects(
+        self, keys: Iterable[str], max_concurrency: Optional[int] = None
+    ) -> dict[str, BatchResult]:
+        return await self.inner.head_objects(keys, max_concurrency)
+
+    async def generate_presigned_url_for_download(
+        self, key: str, expiration: int = 3600
+    ) -> Optional[str]:
+        return await self.inner.generate_presigned_url_for_download(key, expiration)
+
+    async def generate_presigned_urls_for_download(
+        self, keys: Iterable[str], expiration: int = 3600
+    ) -> dict[str, BatchResult]:
+        return await self.inner.generate_presigned_urls_for_download(keys, expiration)
+
+    async def generate_presigned_url_for_upload(
+        self, key: str, content_type: str, expiration: int = 3600
+    ) -> Optional[dict]:
+        # 客户端直传后无法感知，预签名上传同样使缓存失效
+        self.invalidate(key)
+        return await self.inner.generate_presigned_url_for_upload(key, content_type, expiration)
+
+    async def upload_stream(
+        self, key: str, data: Union[bytes, io.BytesIO], content_type: str
+    ) -> bool:
+        # 上传前后都失效：上传期间开始的回源下载可能读到旧内容
+        self.invalidate(key)
+        try:
+            return await self.inner.upload_stream(key, data, content_type)
+        finally:
+            self.invalidate(key)
+
+    async def upload_from_stream(
+        self,
+        key: str,
+        source: ByteSource,
+        content_type: str,
+        part_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> bool:
+        self.invalidate(key)
+        try:
+            return await self.inner.upload_from_stream(key, source, content_type, part_size, max_concurrency)
+        finally:
+            self.invalidate(key)
+
+    async def _create_multipart_upload(self, key: str, content_type: str) -> str:
+        self.invalidate(key)
+        return await self.inner._create_multipart_upload(key, content_type)
+
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        return await self.inner._upload_part(key, upload_id, part_number, data)
+
+    async def _complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        try:
+            await self.inner._complete_multipart_upload(key, upload_id, parts)
+        finally:
+            self.invalidate(key)
+
+    async def _abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self.inner._abort_multipart_upload(key, upload_id)
+
+    async def delete_file(self, key: str) -> bool:
+        self.invalidate(key)
+        return await self.inner.delete_file(key)
+
+    async def delete_files(self, keys: Iterable[str]) -> dict[str, BatchResult]:
+        keys = list(keys)
+        for key in keys:
+            self.invalidate(key)
+        return await self.inner.delete_files(keys)
+
+    def stats(self) -> dict[str, Any]:
+        """返回命中率、缓存占用和经缓存发送的字节数等指标。"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "validations": self.validations,
+            "stale": self.stale,
+            "validation_errors": self.validation_errors,
+            "evictions": self.evictions,
+            "bypassed": self.bypassed,
+            "bytes_served": self.bytes_served,
+            "bytes_fetched": self.bytes_fetched,
+        }
+
+# 保存对象 Content-Type 的扩展属性名
+_CONTENT_TYPE_XATTR = "user.content_type"
+# 根目录下的暂存目录：写入中的临时文件和分片上传的暂存目录都放在这里，不属于任何 key
+_LOCAL_STAGING_DIR = ".staging"
+# 本地分片上传的暂存目录名（即 upload_id）
+_LOCAL_UPLOAD_PREFIX = ".multipart-"
+_LOCAL_UPLOAD_ID_PATTERN = re.compile(rf"{re.escape(_LOCAL_UPLOAD_PREFIX)}[A-Za-z0-9_]+")
+
+
+class LocalStorageService(BaseStorageService):
+    """
+    基于本地目录树的存储服务，适用于单机部署和离线测试。
+
+    - 写入先落到根目录下 .staging 中的临时文件，fsync 后 rename 到目标路径，读取方不会看到写了一半的文件；
+      .staging 不映射到任何 key，临时文件和分片无法通过文件接口访问。
+    - Content-Type 保存在文件的扩展属性中，文件系统不支持时按文件名推断。
+    - 预签名 URL 用 SECRET_KEY 做 HMAC 签名并带过期时间，由内置的 /files/_signed 路由校验后读写文件。
+    """
+
+    def __init__(self, settings: Settings):
+        super().__init__(settings)
+        self.root = Path(settings.LOCAL_STORAGE_DIR).resolve()
+        self.staging_root = self.root / _LOCAL_STAGING_DIR
+        self.staging_root.mkdir(parents=True, exist_ok=True)
+        self._secret = settings.SECRET_KEY.encode()
+
+    def _path(self, key: str) -> Optional[Path]:
+        """把 key 映射为根目录下的路径，越出根目录或不合法的 key 返回 None。"""
+        if not key or "\x00" in key or key.startswith("/"):
+            return None
+        path = (self.root / key).resolve()
+        if path == self.root or not path.is_relative_to(self.root):
+            return None
+        if path.relative_to(self.root).parts[0] == _LOCAL_STAGING_DIR:
+            return None
+        return path
+
+    def resolve_file(self, key: str) -> Optional[Path]:
+        """返回 key 对应的本地文件路径，文件不存在时返回 None。供路由直接用 FileResponse 发送文件。"""
+        path = self._path(key)
+        return path if path is not None and path.is_file() else None
+
+    # --- 签名 URL ---
+
+    def _signature(self, method: str, key: str, expires: int, content_type: str = "") -> str:
+        message = f"{method}\n{key}\n{expires}\n{content_type}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def _signed_url(self, method: str, key: str, expiration: int, content_type: str = "") -> str:
+        expires = int(time.time()) + expiration
+        query = urlencode({"expires": expires, "signature": self._signature(method, key, expires, content_type)})
+        return f"{self.settings.LOCAL_STORAGE_BASE_URL}{self.settings.API_V1_STR}/files/_signed/{quote(key)}?{query}"
+
+    def verify_signature(
+        self, method: str, key: str, expires: int, signature: str, content_type: str = ""
+    ) -> bool:
+        """校验预签名 URL 的签名和有效期。"""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(method, key, expires, content_type), signature)
+
+    @_timed_storage("local", "generate_presigned_url_for_download")
+    async def generate_presigned_url_for_download(
+        self, key: str, expiration: int = 3600
+    ) -> Optional[str]:
+        if self._path(key) is None:
+            return None
+        return self._signed_url("GET", key, expiration)
+
+    async def generate_presigned_urls_for_download(
+        self, keys: Iterable[str], expiration: int = 3600
+    ) -> dict[str, BatchResult]:
+        results: dict[str, BatchResult] = {}
+        for key in dict.fromkeys(keys):
+            url = await self.generate_presigned_url_for_download(key, expiration)
+            results[key] = BatchResult(ok=url is not None, value=url, error=None if url else "Invalid key")
+        return results
+
+    @_timed_storage("local", "generate_presigned_url_for_upload")
+    async def generate_presigned_url_for_upload(
+        self, key: str, content_type: str, expiration: int = 3600
+    ) -> Optional[dict]:
+        """生成 PUT 上传的签名 URL，上传时请求头的 Content-Type 必须与这里指定的一致。"""
+        if self._path(key) is None:
+            return None
+        return {"url": self._signed_url("PUT", key, expiration, content_type), "fields": {}}
+
+    # --- 读取 ---
+
+    def _stat(self, key: str, path: Path) -> Optional[ObjectInfo]:
+        try:
+            st = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        content_type = None
+        if hasattr(os, "getxattr"):
+            try:
+                content_type = os.getxattr(path, _CONTENT_TYPE_XATTR).decode()
+            except OSError:
+                pass
+        return ObjectInfo(
+            key=key,
+            size=st.st_size,
+            # 与 nginx 类似，用修改时间和大小生成 ETag，文件被替换后必然变化
+            etag=f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+            content_type=content_type or mimetypes.guess_type(key)[0],
+            last_modified=datetime.datetime.fromtimestamp(st.st_mtime, tz=datetime.timezone.utc),
+        )
+
+    @_timed_storage("local", "head_object")
+    async def head_object(self, key: str) -> Optional[ObjectInfo]:
+        path = self._path(key)
+        if path is None:
+            return None
+        return await asyncio.to_thread(self._stat, key, path)
+
+    @_timed_storage("local", "download_stream")
+    async def download_stream(self, key: str) -> Optional[io.BytesIO]:
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            return io.BytesIO(await asyncio.to_thread(path.read_bytes))
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+
+    @_timed_storage("local", "open_stream")
+    async def open_stream(
+        self, key: str, byte_range: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ObjectStream]:
+        path = self._path(key)
+        if path is None:
+            return None
+        info = await asyncio.to_thread(self._stat, key, path)
+        if info is None:
+            return None
+
+        start, end = 0, info.size - 1
+        content_range = None
+        if byte_range:
+            start, end = _resolve_range(byte_range, info.size)
+            content_range = f"bytes {start}-{end}/{info.size}"
+        try:
+            f = await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            return None
+
+        async def iter_chunks() -> AsyncIterator[bytes]:
+            try:
+                position = start
+                while position <= end:
+                    chunk = await asyncio.to_thread(os.pread, f.fileno(), min(chunk_size, end - position + 1), position)
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    yield chunk
+            finally:
+                f.close()
+
+        return ObjectStream(
+            info=info,
+            content_length=end - start + 1 if info.size else 0,
+            content_range=content_range,
+            chunks=iter_chunks(),
+        )
+
+    # --- 写入 ---
+
+    def _open_temp(self, path: Path) -> tuple[io.BufferedWriter, str]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 暂存目录与根目录在同一文件系统上，rename 仍然是原子的
+        fd, tmp_path = tempfile.mkstemp(dir=self.staging_root, prefix=f"{path.name}.", suffix=".tmp")
+        return os.fdopen(fd, "wb"), tmp_path
+
+    @staticmethod
+    def _commit(f: io.BufferedWriter, tmp_path: str, path: Path, content_type: str) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+        if hasattr(os, "setxattr"):
+            try:
+                os.setxattr(f.fileno(), _CONTENT_TYPE_XATTR, content_type.encode())
+            except OSError:
+                pass
+        f.close()
+        os.replace(tmp_path, path)
+        # rename 本身也要落盘，否则掉电后可能看到旧文件
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    async def _write(
+        self, key: str, chunks: AsyncIterable[bytes], content_type: str, operation: Optional[str] = None
+    ) -> bool:
+        """
+        把 chunks 写入 key。指定 operation 时只把实际的磁盘写入计入存储耗时，
+        不含等待 chunks 产出数据（例如客户端上传请求体）的时间。
+        """
+        path = self._path(key)
+        if path is None:
+            logger.warning(f"Rejected invalid local storage key '{key}'")
+            return False
+        write_ns = 0
+
+        async def run(func: Callable[..., Any], *args: Any) -> Any:
+            nonlocal write_ns
+            start = time.perf_counter_ns()
+            try:
+                return await asyncio.to_thread(func, *args)
+            finally:
+                write_ns += time.perf_counter_ns() - start
+
+        committed = False
+        try:
+            try:
+                f, tmp_path = await run(self._open_temp, path)
+            except OSError:
+                logger.exception(f"Failed to create local file for '{key}'")
+                return False
+            try:
+                async for chunk in chunks:
+                    await run(f.write, chunk)
+                await run(self._commit, f, tmp_path, path, content_type)
+                committed = True
+                return True
+            except OSError:
+                logger.exception(f"Failed to write local file for '{key}'")
+                return False
+            finally:
+                if not committed:
+                    f.close()
+                    Path(tmp_path).unlink(missing_ok=True)
+        finally:
+            if operation is not None:
+                _record_storage_time("local", operation, write_ns)
+
+    @_timed_storage("local", "upload_stream")
+    async def upload_stream(
+        self, key: str, data: Union[bytes, io.BytesIO], content_type: str
+    ) -> bool:
+        if isinstance(data, io.BytesIO):
+            data = data.getvalue()
+        elif not isinstance(data, bytes):
+            raise TypeError("data must be bytes or io.BytesIO")
+
+        async def single() -> AsyncIterator[bytes]:
+            yield data
+
+        return await self._write(key, single(), content_type)
+
+    async def upload_from_stream(
+        self,
+        key: str,
+        source: ByteSource,
+        content_type: str,
+        part_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> bool:
+        """边接收边写入临时文件，完成后原子替换；本地写入没有分片，part_size 和 max_concurrency 被忽略。"""
+        async def read_chunks() -> AsyncIterator[bytes]:
+            while chunk := await source.read(DEFAULT_CHUNK_SIZE):
+                yield chunk
+
+        chunks = read_chunks() if hasattr(source, "read") else source
+        return await self._write(key, chunks, content_type, operation="upload_from_stream")
+
+    # --- 分片上传 ---
+    # upload_from_stream 直接顺序写入，以下操作只在调用方自行管理分片时使用：
+    # 分片先写入 .staging 下的暂存目录（upload_id 即目录名），完成时按顺序合并后原子替换。
+
+    def _staging_dir(self, key: str, upload_id: str) -> Path:
+        path = self._path(key)
+        if path is None or not _LOCAL_UPLOAD_ID_PATTERN.fullmatch(upload_id):
+            raise ValueError(f"Invalid multipart upload '{upload_id}' for '{key}'")
+        return self.staging_root / upload_id
+
+    @_timed_storage("local", "create_multipart_upload")
+    async def _create_multipart_upload(self, key: str, content_type: str) -> str:
+        path = self._path(key)
+        if path is None:
+            raise ValueError(f"Invalid local storage key '{key}'")
+
+        def create() -> str:
+            staging = Path(tempfile.mkdtemp(dir=self.staging_root, prefix=_LOCAL_UPLOAD_PREFIX))
+            (staging / "content_type").write_text(content_type)
+            return staging.name
+
+        return await asyncio.to_thread(create)
+
+    @_timed_storage("local", "upload_part")
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        part_path = self._staging_dir(key, upload_id) / f"{part_number:05d}.part"
+        await asyncio.to_thread(part_path.write_bytes, data)
+        return hashlib.md5(data, usedforsecurity=False).hexdigest()
+
+    @_timed_storage("local", "complete_multipart_upload")
+    async def _complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        staging = self._staging_dir(key, upload_id)
+        path = self._path(key)
+
+        def complete() -> None:
+            content_type = (staging / "content_type").read_text()
+            f, tmp_path = self._open_temp(path)
+            try:
+                for part_number, _ in sorted(parts):
+                    with open(staging / f"{part_number:05d}.part", "rb") as part:
+                        shutil.copyfileobj(part, f, DEFAULT_CHUNK_SIZE)
+                self._commit(f, tmp_path, path, content_type)
+            except BaseException:
+                f.close()
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+            shutil.rmtree(staging, ignore_errors=True)
+
+        await asyncio.to_thread(complete)
+
+    @_timed_storage("local", "abort_multipart_upload")
+    async def _abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await asyncio.to_thread(shutil.rmtree, self._staging_dir(key, upload_id), True)
+
+    @_timed_storage("local", "delete_file")
+    async def delete_file(self, key: str) -> bool:
+        path = self._path(key)
+        if path is None:
+            return False
+        try:
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+            return True
+        except OSError:
+            logger.exception(f"Failed to delete local file for '{key}'")
+            return False
+
+
 class StorageFactory:
     _services: Dict[str, Type[BaseStorageService]] = {
         "s3": S3StorageService,
         "cos":COSStorageService,
+        "cos_async": AsyncCOSStorageService,
+        "local": LocalStorageService,
     }
+    # 进程内共享的服务实例，由应用的 lifespan 负责启动和关闭
+    _instances: Dict[str, BaseStorageService] = {}
+
+    @classmethod
+    def get_shared_service(cls, provider: str, settings: Settings) -> BaseStorageService:
+        """返回进程内共享的服务实例，首次调用时创建，之后在所有请求间复用。"""
+        provider = provider.lower()
+        service = cls._instances.get(provider)
+        if service is None:
+            service = cls.get_service(provider, settings)
+            cls._instances[provider] = service
+            if isinstance(service, CachedStorageService):
+                metrics_registry.register(f"storage_cache_{provider}", service.stats)
+        return service
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """关闭所有共享实例，释放连接池。"""
+        instances = list(cls._instances.values())
+        cls._instances.clear()
+        for service in instances:
+            try:
+                await service.close()
+            except Exception:
+                logger.exception(f"Failed to close storage service {service.__class__.__name__}")
 
     @staticmethod
     def get_service(provider: str, settings: Settings) -> BaseStorageService:
@@ -276,4 +1944,11 @@ class StorageFactory:
                 f"不支持的供应商: {provider}. "
                 f"可用选项: {list(StorageFactory._services.keys())}"
             )
-        return service_class(settings)
\ No newline at end of file
+        service = service_class(settings)
+        # local 存储本身就在本地磁盘上，不再包装缓存
+        if settings.STORAGE_CACHE_ENABLED and service_class is not LocalStorageService:
+            # 每个供应商使用独立的缓存子目录
+            service = CachedStorageService(
+                service, settings, cache_dir=os.path.join(settings.STORAGE_CACHE_DIR, provider.lower())
+            )
+        return service
\ No newline at end of file
@@ -15,9 +15,17 @@ class BaseSchema(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+class TokenRefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenPayload(BaseModel):
     sub: Optional[str] = None
+    # 以下声明仅在无状态令牌模式下存在
+    act: Optional[bool] = None
+    ver: Optional[int] = None
+    su: Optional[bool] = None
 
 # 用户
 class UserBase(BaseModel):
@@ -38,4 +46,36 @@ class UserUpdate(UserBase):
 class UserPublic(UserBase, BaseSchema):
     """公开的用户信息，不包含密码"""
     id: uuid.UUID
-    is_active: bool
\ No newline at end of file
+    is_active: bool
+
+class UserPage(BaseModel):
+    """用户列表的一页，next_cursor 为空表示没有更多数据"""
+    items: list[UserPublic]
+    next_cursor: Optional[str] = None
+
+class UserPrincipal(UserPublic):
+    """认证主体缓存中保存的用户快照"""
+    token_version: int = 0
+    is_superuser: bool = False
+
+class UserImportRowResult(BaseModel):
+    """批量导入中单行的处理结果"""
+    row: int = Field(..., description="源文件中的行号（从 1 开始）。")
+    email: Optional[str] = None
+    status: str = Field(..., description="created / duplicate / invalid / failed")
+    error: Optional[str] = None
+
+class UserImportReport(BaseModel):
+    """批量导入结果报告"""
+    total: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    failed: int = Field(0, description="因密码哈希繁忙未写入的行，可以重新导入。")
+    retry_from_row: Optional[int] = Field(
+        None, description="出现繁忙时所在批次的第一行，从这一行起的有效行均未写入；之前的批次已提交。"
+    )
+    rows: list[UserImportRowResult] = Field(
+        default_factory=list, description="未成功（重复、无效或失败）的行，数量有上限。"
+    )
+    rows_truncated: bool = Field(False, description="未成功的行超过上限，rows 中只包含一部分。")
@@ -0,0 +1,158 @@
+import csv
+import json
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+
+from app.core.hashing import HashingBusyError
+from app.core.logger import log_execution_time
+from app.providers.storage import AsyncReadable
+from app.schemas import UserCreate, UserImportReport, UserImportRowResult
+from app.services.user_service import UserService
+
+
+async def iter_lines(
+    source: AsyncReadable, chunk_size: int = 64 * 1024, max_line_bytes: int = 64 * 1024
+) -> AsyncIterator[Optional[bytes]]:
+    """
+    按块读取上传内容并逐行产出，不会把整个文件读入内存，每个字节只扫描一次。
+    超过 max_line_bytes 的行产出 None，其余内容直接丢弃到下一个换行为止。
+    """
+    buffer = bytearray()
+    # 当前行已超长并产出过 None，丢弃到下一个换行为止
+    skipping = False
+    while chunk := await source.read(chunk_size):
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            if skipping:
+                skipping = False
+            else:
+                buffer += chunk[start:end]
+                yield bytes(buffer) if len(buffer) <= max_line_bytes else None
+            buffer.clear()
+            start = end + 1
+        if not skipping:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                yield None
+                buffer.clear()
+                skipping = True
+    if buffer:
+        yield bytes(buffer)
+
+
+async def iter_import_rows(
+    source: AsyncReadable, fmt: str, max_line_bytes: int = 64 * 1024
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    解析 NDJSON 或 CSV，产出 (行号, 字段字典) ；无法解析或超长的行产出 (行号, 错误信息)。
+    CSV 按行解析，不支持字段内换行。
+    """
+    header: list[str] | None = None
+    line_number = 0
+    async for raw_line in iter_lines(source, max_line_bytes=max_line_bytes):
+        line_number += 1
+        if raw_line is None:
+            yield line_number, f"Line exceeds {max_line_bytes} bytes"
+            continue
+        line = raw_line.decode("utf-8-sig" if line_number == 1 else "utf-8", errors="replace").strip("\r\n")
+        if not line.strip():
+            continue
+
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            yield line_number, dict(zip(header, values))
+        else:
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(data, dict):
+                yield line_number, "Each line must be a JSON object"
+                continue
+            yield line_number, data
+
+
+@log_execution_time
+async def import_users(
+    user_service: UserService,
+    source: AsyncReadable,
+    fmt: str,
+    batch_size: int,
+    max_line_bytes: int = 64 * 1024,
+    max_report_rows: int = 1000,
+) -> UserImportReport:
+    """
+    流式导入用户：逐行校验，按批调用 UserService.bulk_create_users，汇总各状态的行数。
+    报告只保留最多 max_report_rows 条未成功行的明细，内存占用不随文件大小增长。
+    每批单独提交；某一批遇到密码哈希繁忙时停止写入，该批及之后的有效行标记为 failed，
+    并在 retry_from_row 中给出可以重新导入的起始行，已提交的批次计入 created。
+    """
+    report = UserImportReport()
+    batch: list[tuple[int, UserCreate]] = []
+
+    def add_results(results: list[UserImportRowResult]) -> None:
+        for result in results:
+            report.total += 1
+            if result.status == "created":
+                report.created += 1
+            elif result.status == "duplicate":
+                report.duplicates += 1
+            elif result.status == "failed":
+                report.failed += 1
+            else:
+                report.invalid += 1
+            if result.status == "created":
+                continue
+            if len(report.rows) < max_report_rows:
+                report.rows.append(result)
+            else:
+                report.rows_truncated = True
+
+    def add_failed(rows: list[tuple[int, UserCreate]], error: str) -> None:
+        add_results([
+            UserImportRowResult(row=row_number, email=user_create.email, status="failed", error=error)
+            for row_number, user_create in rows
+        ])
+
+    async def flush(rows: list[tuple[int, UserCreate]]) -> None:
+        if report.retry_from_row is not None:
+            add_failed(rows, "Not imported, retry this row")
+            return
+        try:
+            add_results(await user_service.bulk_create_users(rows))
+        except HashingBusyError as e:
+            report.retry_from_row = rows[0][0]
+            add_failed(rows, str(e))
+
+    async for line_number, data in iter_import_rows(source, fmt, max_line_bytes):
+        if isinstance(data, str):
+            add_results([UserImportRowResult(row=line_number, status="invalid", error=data)])
+            continue
+        try:
+            user_create = UserCreate.model_validate(data)
+        except ValidationError as e:
+            add_results([
+                UserImportRowResult(
+                    row=line_number,
+                    email=data.get("email") if isinstance(data.get("email"), str) else None,
+                    status="invalid",
+                    error="; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()),
+                )
+            ])
+            continue
+
+        batch.append((line_number, user_create))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+
+    if batch:
+        await flush(batch)
+
+    report.rows.sort(key=lambda result: result.row)
+    return report
@@ -1,23 +1,114 @@
+import asyncio
+import base64
+import datetime
+import json
 import uuid
+from typing import AsyncIterator, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Row, Select, case, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import principal_cache
+from app.core.db import primary_bind, release_connection, use_primary
+from app.core.ids import uuid7
+from app.core.logger import logger
+from app.core.metrics import timed
+from app.core.revocation import revocation_filter
+from app.core.security import get_password_hash, get_password_hashes, verify_password
+from app.core.token_store import refresh_token_store
 from app.models import User
-from app.schemas import UserCreate, UserUpdate
+from app.schemas import UserCreate, UserImportRowResult, UserPrincipal, UserUpdate
+
+# 支持 ON CONFLICT DO NOTHING 的方言对应的 INSERT 构造函数
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+# 用户列表只投影 UserPublic 需要的列（外加分页用的 created_at），不加载密码哈希
+_PUBLIC_COLUMNS = (User.id, User.full_name, User.email, User.is_active, User.created_at)
+
+# PostgreSQL 语句超时 (statement_timeout) 对应的错误码
+_QUERY_CANCELED = "57014"
+
+
+class UserSearchTimeout(Exception):
+    """用户搜索超出延迟预算时抛出。"""
+
+
+def _escape_like(value: str) -> str:
+    """转义 LIKE 通配符，使搜索词按字面匹配。"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(created_at: datetime.datetime, user_id: uuid.UUID) -> str:
+    """将分页位置编码为不透明游标。"""
+    raw = json.dumps([created_at.isoformat(), str(user_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, uuid.UUID]:
+    """解析游标，格式错误时抛出 ValueError。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, user_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(created_at), uuid.UUID(user_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
 
 
 class UserService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    @timed("user_service_duration_seconds", operation="get_user_by_id")
     async def get_user_by_id(self, user_id: uuid.UUID) -> User | None:
         """
         根据用户ID获取用户。
         """
         return await self.session.get(User, user_id)
 
+    @timed("user_service_duration_seconds", operation="get_principal")
+    async def get_principal(self, user_id: uuid.UUID | str) -> User | None:
+        """
+        获取已认证用户，优先读取认证主体缓存，未命中时回源数据库。
+        缓存命中时返回的是不关联会话的 User 快照（不含密码哈希）。
+        未命中时从主库回源，查询后立即归还数据库连接。
+        """
+        key = str(user_id)
+        cached = await principal_cache.get(key)
+        if cached is not None:
+            return User(**UserPrincipal.model_validate(cached).model_dump())
+
+        try:
+            user_id = uuid.UUID(key)
+        except ValueError:
+            return None
+        # 结果会写入缓存，必须从主库读取：否则吊销（停用、令牌版本递增）后，
+        # 延迟的副本上的旧状态会被重新写回缓存并持续整个 TTL
+        query = select(User).where(User.id == user_id).execution_options(populate_existing=True)
+        user = (await self.session.execute(query, bind_arguments=primary_bind())).scalar_one_or_none()
+        await release_connection(self.session)
+        if user:
+            await principal_cache.set(key, UserPrincipal.model_validate(user).model_dump(mode="json"))
+        return user
+
+    @staticmethod
+    def token_claims(user: User) -> dict:
+        """
+        无状态令牌模式下写入访问令牌的用户声明。
+        只包含认证和授权需要的字段：修改姓名不递增令牌版本，资料字段放入令牌会在令牌有效期内一直是旧值。
+        """
+        return {
+            "act": user.is_active,
+            "ver": user.token_version,
+            "su": user.is_superuser,
+        }
+
+    @timed("user_service_duration_seconds", operation="get_user_by_email")
     async def get_user_by_email(self, email: str) -> User | None:
         """
         根据邮箱获取用户。
@@ -26,55 +117,296 @@ class UserService:
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    @staticmethod
+    def _keyset_query(cursor: Optional[str]) -> Select:
+        query = select(*_PUBLIC_COLUMNS).order_by(User.created_at, User.id)
+        if cursor:
+            created_at, user_id = decode_cursor(cursor)
+            query = query.where(tuple_(User.created_at, User.id) > tuple_(created_at, user_id))
+        return query
+
+    @timed("user_service_duration_seconds", operation="list_users")
+    async def list_users(self, limit: int, cursor: Optional[str] = None) -> tuple[list[Row], Optional[str]]:
+        """
+        按 (created_at, id) 键集分页列出用户，返回 (当前页, 下一页游标)。
+        """
+        rows = (await self.session.execute(self._keyset_query(cursor).limit(limit + 1))).all()
+        await release_connection(self.session)
+        if len(rows) <= limit:
+            return list(rows), None
+        rows = rows[:limit]
+        return list(rows), encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    async def stream_users(self, cursor: Optional[str] = None, batch_size: int = 1000) -> AsyncIterator[Row]:
+        """
+        使用服务端游标流式遍历用户，内存占用与总行数无关。
+        """
+        query = self._keyset_query(cursor).execution_options(yield_per=batch_size)
+        result = await self.session.stream(query)
+        async for row in result:
+            yield row
+
+    def _dialect(self):
+        # 读取会话绑定引擎的方言；不能调用 get_bind()，无语句的 get_bind() 会把会话固定到主库
+        return self.session.bind.dialect
+
+    @timed("user_service_duration_seconds", operation="search_users")
+    async def search_users(self, query: str, mode: str = "substring", limit: int = 20, timeout_ms: int = 200) -> list[Row]:
+        """
+        按姓名或邮箱搜索用户，mode 为 "prefix"（前缀）或 "substring"（子串），大小写不敏感。
+        结果按 完全匹配 > 前缀匹配 > 子串匹配 排序；PostgreSQL 下同级再按 pg_trgm 相似度排序，
+        ILIKE 由 gin_trgm_ops 索引支撑。其他数据库退化为普通 LIKE 扫描。
+        超过 timeout_ms 毫秒时中止查询并抛出 UserSearchTimeout。
+        """
+        term = query.strip()
+        escaped = _escape_like(term)
+        prefix_pattern = f"{escaped}%"
+        pattern = prefix_pattern if mode == "prefix" else f"%{escaped}%"
+
+        def ilike(pattern_: str):
+            return or_(User.full_name.ilike(pattern_, escape="\\"), User.email.ilike(pattern_, escape="\\"))
+
+        exact = or_(func.lower(User.full_name) == term.lower(), func.lower(User.email) == term.lower())
+        order_by = [case((exact, 0), (ilike(prefix_pattern), 1), else_=2)]
+
+        is_postgres = self._dialect().name == "postgresql"
+        if is_postgres:
+            order_by.append(func.greatest(func.similarity(User.full_name, term), func.similarity(User.email, term)).desc())
+        order_by += [User.full_name, User.id]
+        stmt = select(*_PUBLIC_COLUMNS).where(ilike(pattern)).order_by(*order_by).limit(limit)
+
+        try:
+            async with asyncio.timeout(timeout_ms / 1000):
+                if is_postgres:
+                    # 在数据库端同样设置超时（仅对当前事务生效），避免客户端放弃后查询仍在执行
+                    await self.session.execute(select(func.set_config("statement_timeout", str(timeout_ms), True)))
+                rows = (await self.session.execute(stmt)).all()
+        except TimeoutError:
+            await self.session.rollback()
+            raise UserSearchTimeout("User search exceeded its latency budget")
+        except DBAPIError as e:
+            await self.session.rollback()
+            if getattr(e.orig, "sqlstate", None) == _QUERY_CANCELED:
+                raise UserSearchTimeout("User search exceeded its latency budget")
+            raise
+
+        await release_connection(self.session)
+        return list(rows)
+
+    @timed("user_service_duration_seconds", operation="create_user")
     async def create_user(self, user_create: UserCreate) -> User:
         """
         创建新用户。
+        PostgreSQL/SQLite 下使用 INSERT ... ON CONFLICT (email) DO NOTHING RETURNING，
+        一次往返完成查重、插入和回读；其他数据库回退到先查询再插入。
         """
+        use_primary(self.session)
+        # 先在连接之外完成哈希，避免哈希期间占用数据库连接
+        hashed_password = await get_password_hash(user_create.password)
+        values = {
+            "full_name": user_create.full_name,
+            "email": user_create.email,
+            "hashed_password": hashed_password,
+            "is_active": True,
+        }
+
+        dialect = self._dialect()
+        insert_factory = _UPSERT_INSERTS.get(dialect.name)
+        if insert_factory is not None and dialect.insert_returning:
+            stmt = (
+                insert_factory(User)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User)
+            )
+            new_user = (await self.session.scalars(stmt)).one_or_none()
+            if new_user is None:
+                await self.session.rollback()
+                raise Exception("Email already registered")
+            await self.session.commit()
+            return new_user
+
         if await self.get_user_by_email(user_create.email):
             raise Exception("Email already registered")
-        
-        hashed_password = await get_password_hash(user_create.password)
-        new_user = User(
-            full_name=user_create.full_name,
-            email=user_create.email,
-            hashed_password=hashed_password,
-            is_active=True
-        )
+        new_user = User(**values)
         self.session.add(new_user)
-        await self.session.commit()
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise Exception("Email already registered")
         await self.session.refresh(new_user)
         return new_user
 
+    @timed("user_service_duration_seconds", operation="update_user")
     async def update_user(self, user_id: uuid.UUID, user_update: UserUpdate) -> User:
         """
         更新用户信息。
+        支持 RETURNING 的数据库使用单条 UPDATE ... RETURNING 完成更新和回读，
+        邮箱冲突由唯一约束检测。
         """
-        user = await self.get_user_by_id(user_id)
-        if not user:
-            raise Exception("User not found")
-        
+        use_primary(self.session)
         update_data = user_update.model_dump(exclude_unset=True)
 
-        if "email" in update_data and update_data["email"] != user.email:
-            existing_user = await self.get_user_by_email(update_data["email"])
-            if existing_user and existing_user.id != user.id:
-                raise Exception("This email is already registered to another user.")
-        
+        password_changed = update_data.get("password") is not None
+        values = {}
         for key, value in update_data.items():
             if key == "password":
-                setattr(user, "hashed_password", await get_password_hash(value))
+                if password_changed:
+                    values["hashed_password"] = await get_password_hash(value)
+            elif key == "is_active" and value is None:
+                # 显式传入 null 视为不修改
+                continue
             else:
+                values[key] = value
+
+        # 密码、邮箱或激活状态变更时递增令牌版本，使已签发的无状态令牌失效；只修改姓名等资料时不吊销令牌。
+        # 邮箱和激活状态是否变化在 UPDATE 中与旧值比较（SET 右侧引用的是更新前的行）
+        if password_changed:
+            values["token_version"] = User.token_version + 1
+        else:
+            changes = [getattr(User, key) != values[key] for key in ("email", "is_active") if key in values]
+            if changes:
+                values["token_version"] = case((or_(*changes), User.token_version + 1), else_=User.token_version)
+
+        if self._dialect().update_returning:
+            stmt = (
+                update(User)
+                .where(User.id == user_id)
+                .values(**values)
+                .returning(User)
+                .execution_options(populate_existing=True)
+            )
+            try:
+                user = (await self.session.scalars(stmt)).one_or_none()
+            except IntegrityError:
+                await self.session.rollback()
+                raise Exception("This email is already registered to another user.")
+            if user is None:
+                await self.session.rollback()
+                raise Exception("User not found")
+            await self.session.commit()
+        else:
+            user = await self.get_user_by_id(user_id)
+            if not user:
+                raise Exception("User not found")
+            for key, value in values.items():
                 setattr(user, key, value)
-        
-        await self.session.commit()
-        await self.session.refresh(user)
+            try:
+                await self.session.commit()
+            except IntegrityError:
+                await self.session.rollback()
+                raise Exception("This email is already registered to another user.")
+            await self.session.refresh(user)
+
+        await principal_cache.invalidate(str(user.id))
+        if "token_version" in values:
+            revocation_filter.revoke(str(user.id), user.token_version, user.is_active)
+        if password_changed or not user.is_active:
+            await refresh_token_store.revoke_user(str(user.id))
         return user
 
+    @timed("user_service_duration_seconds", operation="bulk_create_users")
+    async def bulk_create_users(self, rows: list[tuple[int, UserCreate]]) -> list[UserImportRowResult]:
+        """
+        批量创建用户（一批）。rows 为 (行号, UserCreate) 列表。
+        批内及与数据库中已有的邮箱按批查重，密码并行哈希；
+        PostgreSQL (asyncpg) 使用 COPY 写入，失败或其他数据库回退到批量 executemany。
+        """
+        use_primary(self.session)
+        results: dict[int, UserImportRowResult] = {}
+
+        unique_rows: dict[str, tuple[int, UserCreate]] = {}
+        for row_number, user_create in rows:
+            if user_create.email in unique_rows:
+                results[row_number] = UserImportRowResult(
+                    row=row_number, email=user_create.email, status="duplicate", error="Duplicate email in import"
+                )
+            else:
+                unique_rows[user_create.email] = (row_number, user_create)
+
+        if unique_rows:
+            existing = set(
+                await self.session.scalars(select(User.email).where(User.email.in_(list(unique_rows))))
+            )
+            # 结束查重事务，哈希期间不占用连接
+            await self.session.commit()
+            for email in existing:
+                row_number, _ = unique_rows.pop(email)
+                results[row_number] = UserImportRowResult(
+                    row=row_number, email=email, status="duplicate", error="Email already registered"
+                )
+
+        if unique_rows:
+            pending = list(unique_rows.values())
+            hashed_passwords = await get_password_hashes([user_create.password for _, user_create in pending])
+            records = [
+                {
+                    "id": uuid7(),
+                    "full_name": user_create.full_name,
+                    "email": user_create.email,
+                    "hashed_password": hashed_password,
+                    "is_active": True,
+                    "is_superuser": False,
+                    "token_version": 0,
+                }
+                for (_, user_create), hashed_password in zip(pending, hashed_passwords)
+            ]
+            inserted = await self._insert_user_records(records)
+            await self.session.commit()
+            for row_number, user_create in pending:
+                if user_create.email in inserted:
+                    results[row_number] = UserImportRowResult(row=row_number, email=user_create.email, status="created")
+                else:
+                    # 查重之后被并发写入占用
+                    results[row_number] = UserImportRowResult(
+                        row=row_number, email=user_create.email, status="duplicate", error="Email already registered"
+                    )
+
+        return [results[row_number] for row_number, _ in rows]
+
+    async def _insert_user_records(self, records: list[dict]) -> set[str]:
+        """写入用户记录，返回实际插入的邮箱集合。"""
+        dialect = self._dialect()
+        if dialect.name == "postgresql" and dialect.driver == "asyncpg":
+            try:
+                # COPY 不支持冲突跳过，放在保存点中执行，失败时回退到逐批插入
+                async with self.session.begin_nested():
+                    connection = await self.session.connection()
+                    raw_connection = await connection.get_raw_connection()
+                    columns = list(records[0])
+                    await raw_connection.driver_connection.copy_records_to_table(
+                        User.__tablename__,
+                        records=[tuple(record[column] for column in columns) for record in records],
+                        columns=columns,
+                    )
+                return {record["email"] for record in records}
+            except Exception:
+                logger.warning("COPY into users failed, falling back to batched INSERT", exc_info=True)
+
+        insert_factory = _UPSERT_INSERTS.get(dialect.name)
+        if insert_factory is not None and dialect.insert_executemany_returning:
+            stmt = insert_factory(User).on_conflict_do_nothing(index_elements=[User.email]).returning(User.email)
+            result = await self.session.execute(stmt, records)
+            return set(result.scalars())
+
+        # 其他数据库：先查已存在的邮箱再批量插入
+        existing = set(
+            await self.session.scalars(select(User.email).where(User.email.in_([r["email"] for r in records])))
+        )
+        records = [record for record in records if record["email"] not in existing]
+        if records:
+            await self.session.execute(insert(User), records)
+        return {record["email"] for record in records}
+
+    @timed("user_service_duration_seconds", operation="authenticate_user")
     async def authenticate_user(self, email: str, password: str) -> User:
         """
         认证用户。
         """
         db_user = await self.get_user_by_email(email)
+        # bcrypt 校验耗时较长，先归还连接，避免校验期间占用连接池
+        await release_connection(self.session)
         
         if not db_user:
             raise Exception("Incorrect username or password")
@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.cache import principal_cache, token_cache
+from app.core.config import settings
+from app.core.security import create_access_token
+from tests.utils import auth_headers, login
+
+
+def _deactivate(client: TestClient, user: dict) -> None:
+    response = client.put(
+        f"/api/v1/users/{user['id']}",
+        json={"full_name": user["full_name"], "email": user["email"], "is_active": False},
+        headers=user["headers"],
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["is_active"] is False
+
+
+def test_cached_principal_of_deactivated_user_is_rejected(client: TestClient, create_user):
+    user = create_user()
+    assert client.get("/api/v1/users/me", headers=user["headers"]).status_code == 200
+    assert client.portal.call(principal_cache.get, user["id"]) is not None
+
+    _deactivate(client, user)
+
+    response = client.get("/api/v1/users/me", headers=user["headers"])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_stateless_token_of_deactivated_user_is_rejected(
+    client: TestClient, create_user, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(settings, "AUTH_STATELESS_TOKENS", True)
+    user = create_user()
+    # 令牌声明中带有激活状态和版本号，认证时不查询数据库
+    user["headers"] = auth_headers(login(client, user["email"])["access_token"])
+    assert client.get("/api/v1/users/me", headers=user["headers"]).status_code == 200
+
+    _deactivate(client, user)
+
+    response = client.get("/api/v1/users/me", headers=user["headers"])
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+
+def test_invalid_token_is_rejected(client: TestClient):
+    response = client.get("/api/v1/users/me", headers=auth_headers("not-a-token"))
+    assert response.status_code == 403
+
+
+def test_cached_token_is_rejected_after_expiry(client: TestClient, create_user):
+    user = create_user()
+    headers = auth_headers(create_access_token(user["id"], timedelta(seconds=1)))
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    hits = token_cache.stats()["hits"]
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    assert token_cache.stats()["hits"] == hits + 1
+
+    time.sleep(1.1)
+
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 403
+
+
+def test_cached_token_is_rejected_after_secret_change(
+    client: TestClient, create_user, monkeypatch: pytest.MonkeyPatch
+):
+    user = create_user()
+    assert client.get("/api/v1/users/me", headers=user["headers"]).status_code == 200
+
+    # 缓存键包含签名密钥，更换密钥后旧令牌必须重新校验签名
+    monkeypatch.setattr(settings, "SECRET_KEY", "another-secret-key-" + "1" * 32)
+
+    assert client.get("/api/v1/users/me", headers=user["headers"]).status_code == 403
+    user["headers"] = auth_headers(login(client, user["email"])["access_token"])
+    assert client.get("/api/v1/users/me", headers=user["headers"]).status_code == 200
+
+
+def test_stateless_profile_is_read_from_the_database(
+    client: TestClient, create_user, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(settings, "AUTH_STATELESS_TOKENS", True)
+    user = create_user()
+    token = login(client, user["email"])["access_token"]
+    headers = auth_headers(token)
+    # 令牌只携带认证和授权需要的声明
+    claims = jwt.decode(token, options={"verify_signature": False})
+    assert not {"name", "email"} & set(claims)
+
+    response = client.put(
+        f"/api/v1/users/{user['id']}", json={"full_name": "Renamed", "email": user["email"]}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+
+    # 只改姓名不吊销令牌，/me 返回修改后的资料
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+    assert (response.json()["full_name"], response.json()["email"]) == ("Renamed", user["email"])
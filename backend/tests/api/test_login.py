@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from tests.utils import auth_headers, login
+
+
+@pytest.fixture
+def refresh_tokens_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "REFRESH_TOKENS_ENABLED", True)
+
+
+def _refresh(client: TestClient, refresh_token: str):
+    return client.post("/api/v1/login/refresh-token", json={"refresh_token": refresh_token})
+
+
+def test_refresh_tokens_disabled_by_default(client: TestClient, create_user):
+    user = create_user()
+    tokens = login(client, user["email"])
+
+    assert tokens["refresh_token"] is None
+    assert _refresh(client, "anything").status_code == 404
+
+
+def test_refresh_token_rotation(client: TestClient, create_user, refresh_tokens_enabled):
+    user = create_user()
+    tokens = login(client, user["email"])
+
+    response = _refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200, response.text
+    rotated = response.json()
+    assert rotated["refresh_token"] not in (None, tokens["refresh_token"])
+    assert client.get("/api/v1/users/me", headers=auth_headers(rotated["access_token"])).status_code == 200
+
+
+def test_refresh_token_replay_revokes_the_family(client: TestClient, create_user, refresh_tokens_enabled):
+    user = create_user()
+    first = login(client, user["email"])["refresh_token"]
+    second = _refresh(client, first).json()["refresh_token"]
+
+    # 已使用的刷新令牌被重放：拒绝，并吊销同一登录会话中后续签发的令牌
+    assert _refresh(client, first).status_code == 401
+    assert _refresh(client, second).status_code == 401
+
+
+def test_refresh_token_replay_keeps_other_sessions(client: TestClient, create_user, refresh_tokens_enabled):
+    user = create_user()
+    stolen = login(client, user["email"])["refresh_token"]
+    other_session = login(client, user["email"])["refresh_token"]
+    _refresh(client, stolen)
+
+    assert _refresh(client, stolen).status_code == 401
+    assert _refresh(client, other_session).status_code == 200
+
+
+def test_unknown_refresh_token_is_rejected(client: TestClient, refresh_tokens_enabled):
+    assert _refresh(client, "not-a-refresh-token").status_code == 401
+
+
+def test_refresh_token_of_deactivated_user_is_rejected(client: TestClient, create_user, refresh_tokens_enabled):
+    user = create_user()
+    refresh_token = login(client, user["email"])["refresh_token"]
+    response = client.put(
+        f"/api/v1/users/{user['id']}",
+        json={"full_name": user["full_name"], "email": user["email"], "is_active": False},
+        headers=user["headers"],
+    )
+    assert response.status_code == 200, response.text
+
+    assert _refresh(client, refresh_token).status_code == 401
@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.main import app
+from app.api.v1.endpoints import internal
+from app.core.config import settings
+from tests.utils import auth_headers
+
+
+@pytest.fixture
+def metrics_routes(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    """挂载 METRICS_ENABLED 开启时才注册的指标路由，结束后移除。"""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+    routes = list(app.router.routes)
+    app.include_router(internal.router, prefix=f"{settings.API_V1_STR}/internal", tags=["内部"])
+    app.include_router(internal.prometheus_router, tags=["内部"])
+    yield
+    app.router.routes[:] = routes
+
+
+def test_internal_metrics_require_superuser(client: TestClient, create_user, metrics_routes):
+    url = f"{settings.API_V1_STR}/internal/metrics"
+
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers=create_user()["headers"]).status_code == 403
+    response = client.get(url, headers=create_user(is_superuser=True)["headers"])
+    assert response.status_code == 200
+    assert "token_cache" in response.json()
+
+
+def test_prometheus_metrics_require_token(client: TestClient, create_user, metrics_routes, monkeypatch):
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers=auth_headers("wrong-token")).status_code == 403
+    # 用户的访问令牌不能代替抓取令牌
+    assert client.get("/metrics", headers=create_user(is_superuser=True)["headers"]).status_code == 403
+
+    response = client.get("/metrics", headers=auth_headers("scrape-token"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE" in response.text
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert client.get("/metrics", headers=auth_headers("scrape-token")).status_code == 403
@@ -0,0 +1,117 @@
+import logging
+import queue
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import middleware
+from app.api.middleware import _server_timing_header
+from app.core.config import settings
+from app.core.logger import BoundedQueueHandler, logger
+from tests.utils import TEST_PASSWORD
+
+
+class RecordingHandler(logging.Handler):
+    """在调用方线程中记录日志，不经过后台队列。"""
+
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture
+def records():
+    handler = RecordingHandler()
+    logger.addHandler(handler)
+    yield handler.records
+    logger.removeHandler(handler)
+
+
+def _server_timing(response) -> dict[str, float]:
+    entries = [entry.split(";dur=") for entry in response.headers["server-timing"].split(", ")]
+    return {name: float(duration) for name, duration in entries}
+
+
+def test_server_timing_header_order():
+    totals = {"custom": 4_000_000, "serialize": 1_000_000, "db": 2_500_000, "hash": 3_000_000}
+
+    assert _server_timing_header(totals, 12_345_678) == (
+        "db;dur=2.500, hash;dur=3.000, serialize;dur=1.000, custom;dur=4.000, total;dur=12.346"
+    )
+
+
+def test_server_timing_reports_request_phases(client: TestClient, create_user, monkeypatch: pytest.MonkeyPatch):
+    user = create_user()
+    assert "server-timing" not in client.get("/api/v1/users/me", headers=user["headers"]).headers
+
+    monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+    response = client.post(
+        "/api/v1/login/access-token", data={"username": user["email"], "password": TEST_PASSWORD}
+    )
+
+    assert response.status_code == 200
+    timing = _server_timing(response)
+    assert {"db", "hash", "serialize", "total"} <= set(timing)
+    assert list(timing)[-1] == "total"
+    # 各阶段耗时不超过总耗时
+    assert timing["hash"] > 0
+    assert max(duration for name, duration in timing.items() if name != "total") <= timing["total"]
+
+
+def test_slow_request_is_logged_with_phases(
+    client: TestClient, create_user, records, monkeypatch: pytest.MonkeyPatch
+):
+    user = create_user()
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+
+    client.post("/api/v1/login/access-token", data={"username": user["email"], "password": TEST_PASSWORD})
+
+    slow = [record for record in records if record.getMessage().startswith("Slow request")]
+    assert len(slow) == 1
+    assert slow[0].levelno == logging.WARNING
+    assert slow[0].getMessage().startswith("Slow request POST /api/v1/login/access-token took ")
+    assert {"db", "hash", "serialize"} <= set(slow[0].phases_ms)
+    assert slow[0].total_ms >= slow[0].phases_ms["hash"]
+
+
+def test_slow_request_log_is_sampled(client: TestClient, records, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_LOG_SAMPLE_RATE", 0.5)
+    monkeypatch.setattr(middleware.random, "random", lambda: 0.7)
+
+    client.get("/api/v1/users/me")
+
+    assert not [record for record in records if record.getMessage().startswith("Slow request")]
+
+
+def test_access_log_carries_request_context(client: TestClient, create_user):
+    user = create_user()
+    # 与生产环境相同，经 BoundedQueueHandler 入队时复制请求上下文
+    handler = BoundedQueueHandler(queue.Queue())
+    logger.addHandler(handler)
+    try:
+        response = client.put(
+            f"/api/v1/users/{user['id']}",
+            json={"full_name": "Logged", "email": user["email"]},
+            headers={**user["headers"], "X-Request-ID": "req-123"},
+        )
+    finally:
+        logger.removeHandler(handler)
+
+    assert response.headers["x-request-id"] == "req-123"
+    access = [record for record in handler.queue.queue if record.getMessage().startswith("PUT /api/v1/users/")]
+    assert len(access) == 1
+    context = access[0].context
+    # 数据库连接占用由 get_db 在会话关闭后写入
+    assert context.pop("db_checkouts") >= 1 and context.pop("db_hold_ms") >= 0
+    assert context == {
+        "request_id": "req-123",
+        "method": "PUT",
+        "path": f"/api/v1/users/{user['id']}",
+        "user_id": user["id"],
+        "route": "/api/v1/users/{user_id}",
+    }
+    assert access[0].status == 200
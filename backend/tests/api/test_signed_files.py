@@ -0,0 +1,81 @@
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_storage_service
+from app.providers.storage import LocalStorageService
+
+CONTENT = b"signed content"
+
+
+@pytest.fixture
+def storage(client: TestClient) -> LocalStorageService:
+    service = get_storage_service()
+    assert isinstance(service, LocalStorageService)
+    return service
+
+
+@pytest.fixture
+def key(storage: LocalStorageService, client: TestClient) -> str:
+    key = f"signed/{uuid.uuid4().hex}.txt"
+    assert client.portal.call(storage.upload_stream, key, CONTENT, "text/plain")
+    return key
+
+
+def _split(url: str) -> tuple[str, dict[str, str]]:
+    parts = urlsplit(url)
+    return parts.path, {name: values[0] for name, values in parse_qs(parts.query).items()}
+
+
+def test_signed_download(client: TestClient, storage: LocalStorageService, key: str):
+    url = client.portal.call(storage.generate_presigned_url_for_download, key)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_tampered_signature_is_rejected(client: TestClient, storage: LocalStorageService, key: str):
+    path, params = _split(client.portal.call(storage.generate_presigned_url_for_download, key))
+    params["signature"] = ("0" if params["signature"][0] != "0" else "1") + params["signature"][1:]
+
+    response = client.get(path, params=params)
+    assert response.status_code == 403
+
+
+def test_signature_is_bound_to_key_and_expiry(client: TestClient, storage: LocalStorageService, key: str):
+    path, params = _split(client.portal.call(storage.generate_presigned_url_for_download, key))
+
+    assert client.get(path + ".other", params=params).status_code == 403
+    assert client.get(path, params={**params, "expires": int(params["expires"]) + 3600}).status_code == 403
+
+
+def test_expired_signature_is_rejected(client: TestClient, storage: LocalStorageService, key: str):
+    expires = int(time.time()) - 1
+    path, _ = _split(client.portal.call(storage.generate_presigned_url_for_download, key))
+    params = {"expires": expires, "signature": storage._signature("GET", key, expires)}
+
+    response = client.get(path, params=params)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Invalid or expired signature"
+
+
+def test_download_signature_cannot_be_used_for_upload(client: TestClient, storage: LocalStorageService, key: str):
+    url = client.portal.call(storage.generate_presigned_url_for_download, key)
+
+    assert client.put(url, content=b"overwritten").status_code == 403
+    assert client.get(url).content == CONTENT
+
+
+def test_signed_upload_requires_signed_content_type(client: TestClient, storage: LocalStorageService):
+    key = f"signed/{uuid.uuid4().hex}.json"
+    url = client.portal.call(storage.generate_presigned_url_for_upload, key, "application/json")["url"]
+
+    assert client.put(url, content=b"{}", headers={"Content-Type": "text/plain"}).status_code == 403
+    response = client.put(url, content=b"{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 200
+    assert response.json() == {"key": key}
+    assert storage.resolve_file(key).read_bytes() == b"{}"
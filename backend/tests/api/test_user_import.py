@@ -0,0 +1,179 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.hashing import HashingBusyError
+from app.services import user_service as user_service_module
+from app.services.user_service import UserService
+from tests.utils import TEST_PASSWORD
+
+
+def _email() -> str:
+    return f"import-{uuid.uuid4().hex[:12]}@example.com"
+
+
+def _ndjson(*rows) -> bytes:
+    return "".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows).encode()
+
+
+def _import(client: TestClient, headers: dict, content: bytes, filename: str = "users.ndjson", **params):
+    response = client.post(
+        "/api/v1/users/import", files={"file": (filename, content)}, params=params, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def admin(create_user) -> dict:
+    return create_user(is_superuser=True)
+
+
+def test_import_requires_superuser(client: TestClient, create_user):
+    user = create_user()
+
+    response = client.post(
+        "/api/v1/users/import", files={"file": ("users.ndjson", b"")}, headers=user["headers"]
+    )
+    assert response.status_code == 403
+
+
+def test_import_ndjson(client: TestClient, admin: dict):
+    emails = [_email() for _ in range(3)]
+
+    report = _import(
+        client, admin["headers"], _ndjson(*({"full_name": "N", "email": e, "password": TEST_PASSWORD} for e in emails))
+    )
+
+    assert (report["total"], report["created"], report["duplicates"], report["invalid"]) == (3, 3, 0, 0)
+    assert report["rows"] == []
+    # 导入的用户可以直接登录
+    response = client.post("/api/v1/login/access-token", data={"username": emails[0], "password": TEST_PASSWORD})
+    assert response.status_code == 200
+
+
+def test_import_csv(client: TestClient, admin: dict):
+    emails = [_email(), _email()]
+    content = "﻿full_name,email,password\r\n" + "".join(f"CSV User,{e},{TEST_PASSWORD}\r\n" for e in emails)
+
+    report = _import(client, admin["headers"], content.encode(), filename="users.csv")
+
+    assert (report["total"], report["created"]) == (2, 2)
+
+
+def test_import_format_parameter_overrides_filename(client: TestClient, admin: dict):
+    content = f"full_name,email,password\nCSV User,{_email()},{TEST_PASSWORD}\n".encode()
+
+    report = _import(client, admin["headers"], content, filename="users.txt", format="csv")
+
+    assert report["created"] == 1
+
+
+def test_import_dedupes_emails_within_the_file(client: TestClient, admin: dict):
+    email = _email()
+    row = {"full_name": "Dup", "email": email, "password": TEST_PASSWORD}
+
+    report = _import(client, admin["headers"], _ndjson(row, row))
+
+    assert (report["created"], report["duplicates"]) == (1, 1)
+    assert report["rows"] == [{"row": 2, "email": email, "status": "duplicate", "error": "Duplicate email in import"}]
+
+
+def test_import_skips_existing_emails(client: TestClient, admin: dict):
+    report = _import(
+        client, admin["headers"], _ndjson({"full_name": "Existing", "email": admin["email"], "password": TEST_PASSWORD})
+    )
+
+    assert (report["created"], report["duplicates"]) == (0, 1)
+    assert report["rows"][0]["error"] == "Email already registered"
+
+
+def test_import_reports_invalid_rows(client: TestClient, admin: dict, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "USER_IMPORT_MAX_LINE_BYTES", 200)
+    content = _ndjson(
+        "{not json",
+        "[1, 2]",
+        {"full_name": "Short", "email": _email(), "password": "short"},
+        {"full_name": "No email", "password": TEST_PASSWORD},
+        {"full_name": "x" * 300, "email": _email(), "password": TEST_PASSWORD},
+        "",
+        {"full_name": "Valid", "email": _email(), "password": TEST_PASSWORD},
+    )
+
+    report = _import(client, admin["headers"], content)
+
+    assert (report["total"], report["created"], report["invalid"]) == (6, 1, 5)
+    rows = {row["row"]: row for row in report["rows"]}
+    assert sorted(rows) == [1, 2, 3, 4, 5]
+    assert rows[1]["error"].startswith("Invalid JSON")
+    assert rows[2]["error"] == "Each line must be a JSON object"
+    assert rows[3]["error"].startswith("password:")
+    assert rows[4]["error"].startswith("email:")
+    assert rows[5]["error"] == "Line exceeds 200 bytes"
+
+
+def test_import_report_is_truncated(client: TestClient, admin: dict, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "USER_IMPORT_MAX_REPORT_ROWS", 2)
+
+    report = _import(client, admin["headers"], _ndjson(*["{bad"] * 5))
+
+    assert report["invalid"] == 5
+    assert [row["row"] for row in report["rows"]] == [1, 2]
+    assert report["rows_truncated"] is True
+
+
+def test_hashing_busy_keeps_committed_batches(client: TestClient, admin: dict, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "USER_IMPORT_BATCH_SIZE", 2)
+    get_password_hashes = user_service_module.get_password_hashes
+    calls = 0
+
+    async def busy_after_first_batch(passwords: list[str]) -> list[str]:
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            raise HashingBusyError("Password hashing backlog is full, please retry later")
+        return await get_password_hashes(passwords)
+
+    monkeypatch.setattr(user_service_module, "get_password_hashes", busy_after_first_batch)
+    emails = [_email() for _ in range(5)]
+    rows = [{"full_name": "Busy", "email": e, "password": TEST_PASSWORD} for e in emails]
+
+    report = _import(client, admin["headers"], _ndjson(rows[0], rows[1], "{bad", *rows[2:]))
+
+    assert (report["total"], report["created"], report["failed"], report["invalid"]) == (6, 2, 3, 1)
+    assert report["retry_from_row"] == 4
+    assert [(row["row"], row["status"]) for row in report["rows"]] == [
+        (3, "invalid"), (4, "failed"), (5, "failed"), (6, "failed"),
+    ]
+    # 重新导入时，已提交的行报告为重复，其余行正常写入
+    monkeypatch.setattr(user_service_module, "get_password_hashes", get_password_hashes)
+    retry = _import(client, admin["headers"], _ndjson(*rows))
+    assert (retry["created"], retry["duplicates"]) == (3, 2)
+
+
+def test_copy_failure_falls_back_to_batched_insert(run, monkeypatch: pytest.MonkeyPatch):
+    from app.core.db import db_sessionmaker
+    from app.schemas import UserCreate
+
+    # 按 PostgreSQL + asyncpg 处理：先尝试 COPY（SQLite 连接没有 copy_records_to_table，必然失败），再回退
+    dialect = SimpleNamespace(name="postgresql", driver="asyncpg", insert_executemany_returning=False)
+    monkeypatch.setattr(UserService, "_dialect", lambda self: dialect)
+    existing = _email()
+    rows = [
+        (1, UserCreate(full_name="Copy", email=_email(), password=TEST_PASSWORD)),
+        (2, UserCreate(full_name="Copy", email=existing, password=TEST_PASSWORD)),
+    ]
+
+    async def scenario():
+        async with db_sessionmaker() as session:
+            await UserService(session).bulk_create_users([rows[1]])
+        async with db_sessionmaker() as session:
+            return await UserService(session).bulk_create_users(rows)
+
+    results = run(scenario)
+
+    assert [(result.row, result.status) for result in results] == [(1, "created"), (2, "duplicate")]
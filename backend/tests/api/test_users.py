@@ -0,0 +1,131 @@
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from tests.utils import TEST_PASSWORD
+
+
+def _list_all(client: TestClient, headers: dict, limit: int) -> list[dict]:
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/v1/users/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["items"]) <= limit
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_list_users_requires_superuser(client: TestClient, create_user):
+    user = create_user()
+
+    response = client.get("/api/v1/users/", headers=user["headers"])
+    assert response.status_code == 403
+    assert client.get("/api/v1/users/search", params={"q": "user"}, headers=user["headers"]).status_code == 403
+
+
+def test_cursor_pagination_visits_every_user_once(client: TestClient, create_user):
+    admin = create_user(is_superuser=True)
+    created = {create_user()["id"] for _ in range(5)}
+
+    items = _list_all(client, admin["headers"], limit=2)
+    ids = [item["id"] for item in items]
+
+    assert len(ids) == len(set(ids))
+    assert created | {admin["id"]} <= set(ids)
+    assert ids == [item["id"] for item in _list_all(client, admin["headers"], limit=1000)]
+
+
+def test_ndjson_export_continues_from_cursor(client: TestClient, create_user):
+    admin = create_user(is_superuser=True)
+    for _ in range(3):
+        create_user()
+    first_page = client.get("/api/v1/users/", params={"limit": 2}, headers=admin["headers"]).json()
+
+    response = client.get(
+        "/api/v1/users/",
+        params={"format": "ndjson", "cursor": first_page["next_cursor"]},
+        headers=admin["headers"],
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    exported = [json.loads(line)["id"] for line in response.text.splitlines()]
+
+    all_ids = [item["id"] for item in _list_all(client, admin["headers"], limit=1000)]
+    assert [item["id"] for item in first_page["items"]] + exported == all_ids
+
+
+def test_invalid_cursor_is_rejected(client: TestClient, create_user):
+    admin = create_user(is_superuser=True)
+
+    response = client.get("/api/v1/users/", params={"cursor": "not-a-cursor"}, headers=admin["headers"])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_create_user_with_registered_email_is_rejected(client: TestClient, create_user):
+    user = create_user()
+
+    response = client.post(
+        "/api/v1/users/", json={"full_name": "Again", "email": user["email"], "password": "password-123"}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_update_user(client: TestClient, create_user):
+    user, other = create_user(), create_user()
+    url = f"/api/v1/users/{user['id']}"
+
+    response = client.put(url, json={"full_name": "Renamed", "email": user["email"]}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    assert response.json()["full_name"] == "Renamed"
+    assert client.get("/api/v1/users/me", headers=user["headers"]).json()["full_name"] == "Renamed"
+
+    # 邮箱已被占用
+    response = client.put(url, json={"full_name": "Renamed", "email": other["email"]}, headers=user["headers"])
+    assert response.status_code == 400
+    # 只能修改自己的信息
+    response = client.put(
+        f"/api/v1/users/{other['id']}", json={"full_name": "x", "email": other["email"]}, headers=user["headers"]
+    )
+    assert response.status_code == 403
+
+
+def _search(client: TestClient, headers: dict, q: str, **params) -> list[str]:
+    response = client.get("/api/v1/users/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [item["full_name"] for item in response.json()]
+
+
+def test_search_treats_like_wildcards_literally(client: TestClient, create_user):
+    admin = create_user(is_superuser=True)
+    tag = uuid.uuid4().hex[:8]
+    for name in (f"{tag} 50% off", f"{tag} 500 off", f"{tag} a_b", f"{tag} axb"):
+        response = client.post(
+            "/api/v1/users/", json={"full_name": name, "email": f"{uuid.uuid4().hex}@example.com", "password": TEST_PASSWORD}
+        )
+        assert response.status_code == 200, response.text
+
+    assert _search(client, admin["headers"], f"{tag} 50%") == [f"{tag} 50% off"]
+    assert _search(client, admin["headers"], "a_b") == [f"{tag} a_b"]
+    assert _search(client, admin["headers"], f"{tag} a_b", mode="prefix") == [f"{tag} a_b"]
+    assert _search(client, admin["headers"], tag) == sorted([f"{tag} 50% off", f"{tag} 500 off", f"{tag} a_b", f"{tag} axb"])
+
+
+def test_search_over_latency_budget_returns_503(client: TestClient, create_user, monkeypatch: pytest.MonkeyPatch):
+    admin = create_user(is_superuser=True)
+    monkeypatch.setattr(settings, "USER_SEARCH_TIMEOUT_MS", 0)
+
+    response = client.get("/api/v1/users/search", params={"q": "user"}, headers=admin["headers"])
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["detail"] == "User search exceeded its latency budget"
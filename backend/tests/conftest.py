@@ -0,0 +1,81 @@
+"""
+测试公共夹具
+导入应用前设置环境变量：使用临时目录中的 SQLite 数据库和 local 存储，外部服务的凭证填入占位值。
+"""
+
+import asyncio
+import os
+import tempfile
+import uuid
+from typing import Callable
+
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite+aiosqlite:///{_TEST_DIR}/test.db"
+os.environ["SECRET_KEY"] = "test-secret-key-" + "0" * 32
+os.environ["STORAGE_PROVIDER"] = "local"
+os.environ["LOCAL_STORAGE_DIR"] = os.path.join(_TEST_DIR, "storage")
+os.environ["STORAGE_CACHE_ENABLED"] = "false"
+os.environ["LOG_FILE"] = os.path.join(_TEST_DIR, "run.log")
+for name in (
+    "S3_ACCESS_KEY", "S3_SECRET_KEY", "S3_BUCKET_NAME",
+    "TENCENT_COS_REGION", "TENCENT_COS_SECRET_ID", "TENCENT_COS_SECRET_KEY", "TENCENT_COS_BUCKET",
+):
+    os.environ.setdefault(name, "test")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+
+from app.api.main import app  # noqa: E402
+from app.core.cache import principal_cache  # noqa: E402
+from app.core.db import db_engine, db_sessionmaker  # noqa: E402
+from app.models import Base, User  # noqa: E402
+from tests.utils import TEST_PASSWORD, auth_headers, login  # noqa: E402
+
+
+async def _create_tables() -> None:
+    async with db_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # 连接绑定在当前事件循环上，TestClient 使用自己的事件循环
+    await db_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    asyncio.run(_create_tables())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def create_user(client: TestClient) -> Callable[..., dict]:
+    """创建一个邮箱唯一的用户，返回用户信息，附带可直接使用的认证请求头 headers。"""
+
+    def _create_user(is_superuser: bool = False) -> dict:
+        email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+        response = client.post(
+            "/api/v1/users/", json={"full_name": "Test User", "email": email, "password": TEST_PASSWORD}
+        )
+        assert response.status_code == 200, response.text
+        user = response.json()
+        if is_superuser:
+            client.portal.call(_grant_superuser, user["id"])
+        user["headers"] = auth_headers(login(client, email)["access_token"])
+        return user
+
+    return _create_user
+
+
+async def _grant_superuser(user_id: str) -> None:
+    async with db_sessionmaker() as session:
+        await session.execute(update(User).where(User.id == uuid.UUID(user_id)).values(is_superuser=True))
+        await session.commit()
+    await principal_cache.invalidate(user_id)
+
+
+@pytest.fixture
+def run(client: TestClient) -> Callable:
+    """在应用的事件循环中执行协程函数，数据库连接池中的连接绑定在该事件循环上。"""
+    return client.portal.call
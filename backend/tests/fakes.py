@@ -0,0 +1,130 @@
+"""测试用的内存存储服务"""
+
+import asyncio
+import hashlib
+import io
+from collections import Counter
+from typing import AsyncIterator, Optional, Union
+
+from app.core.config import Settings, settings as app_settings
+from app.providers.storage import (
+    DEFAULT_CHUNK_SIZE,
+    BaseStorageService,
+    ObjectInfo,
+    ObjectStream,
+    _resolve_range,
+)
+
+
+class MemoryStorageService(BaseStorageService):
+    """
+    对象保存在内存中的存储服务，用于测试缓存包装层和基类中的组合操作（分片上传、批量操作）。
+    calls 记录每个操作的调用次数，max_active 记录每个操作的最大并发数；
+    failures 中的操作抛出对应的异常，gate 不为 None 时 open_stream 等待它被设置后才返回。
+    """
+
+    def __init__(self, settings: Optional[Settings] = None, delay: float = 0.0):
+        super().__init__(settings or app_settings)
+        self.objects: dict[str, tuple[bytes, str]] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.aborted: list[str] = []
+        self.calls: Counter[str] = Counter()
+        self.max_active: Counter[str] = Counter()
+        self.failures: dict[str, Exception] = {}
+        self.gate: Optional[asyncio.Event] = None
+        self.delay = delay
+        self._active: Counter[str] = Counter()
+
+    def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        self.objects[key] = (data, content_type)
+
+    async def _call(self, operation: str) -> None:
+        self.calls[operation] += 1
+        self._active[operation] += 1
+        self.max_active[operation] = max(self.max_active[operation], self._active[operation])
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if operation in self.failures:
+                raise self.failures[operation]
+        finally:
+            self._active[operation] -= 1
+
+    def _info(self, key: str) -> Optional[ObjectInfo]:
+        if key not in self.objects:
+            return None
+        data, content_type = self.objects[key]
+        return ObjectInfo(key=key, size=len(data), etag=f'"{hashlib.md5(data).hexdigest()}"', content_type=content_type)
+
+    async def generate_presigned_url_for_download(self, key: str, expiration: int = 3600) -> Optional[str]:
+        await self._call("presign")
+        return None if key.startswith("invalid/") else f"https://storage.test/{key}?expires={expiration}"
+
+    async def generate_presigned_url_for_upload(
+        self, key: str, content_type: str, expiration: int = 3600
+    ) -> Optional[dict]:
+        await self._call("presign_upload")
+        return {"url": f"https://storage.test/{key}", "fields": {}}
+
+    async def download_stream(self, key: str) -> Optional[io.BytesIO]:
+        await self._call("download_stream")
+        return io.BytesIO(self.objects[key][0]) if key in self.objects else None
+
+    async def head_object(self, key: str) -> Optional[ObjectInfo]:
+        await self._call("head_object")
+        return self._info(key)
+
+    async def open_stream(
+        self, key: str, byte_range: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ObjectStream]:
+        await self._call("open_stream")
+        if self.gate is not None:
+            await self.gate.wait()
+        info = self._info(key)
+        if info is None:
+            return None
+        data = self.objects[key][0]
+        start, end, content_range = 0, info.size - 1, None
+        if byte_range:
+            start, end = _resolve_range(byte_range, info.size)
+            content_range = f"bytes {start}-{end}/{info.size}"
+        body = data[start:end + 1]
+
+        async def chunks() -> AsyncIterator[bytes]:
+            for offset in range(0, len(body), chunk_size):
+                yield body[offset:offset + chunk_size]
+
+        return ObjectStream(info=info, content_length=len(body), content_range=content_range, chunks=chunks())
+
+    async def upload_stream(self, key: str, data: Union[bytes, io.BytesIO], content_type: str) -> bool:
+        await self._call("upload_stream")
+        self.put(key, data.getvalue() if isinstance(data, io.BytesIO) else data, content_type)
+        return True
+
+    async def delete_file(self, key: str) -> bool:
+        try:
+            await self._call("delete_file")
+        except Exception:
+            return False
+        return self.objects.pop(key, None) is not None
+
+    async def _create_multipart_upload(self, key: str, content_type: str) -> str:
+        await self._call("create_multipart_upload")
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        return upload_id
+
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        await self._call("upload_part")
+        self.uploads[upload_id][part_number] = data
+        return f'"part-{part_number}"'
+
+    async def _complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        await self._call("complete_multipart_upload")
+        uploaded = self.uploads.pop(upload_id)
+        self.put(key, b"".join(uploaded[part_number] for part_number, _ in parts))
+
+    async def _abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self._call("abort_multipart_upload")
+        self.uploads.pop(upload_id, None)
+        self.aborted.append(upload_id)
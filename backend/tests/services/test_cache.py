@@ -0,0 +1,238 @@
+import datetime
+import fnmatch
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import InMemoryPrincipalCache, RedisPrincipalCache, VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """替换缓存模块使用的 time.monotonic / time.time，测试中手动推进时间。"""
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", fake)
+    monkeypatch.setattr(cache_module.time, "time", fake)
+    return fake
+
+
+class FakeRedis:
+    """内存中的 redis.asyncio 客户端替身，只实现 RedisPrincipalCache 用到的 get / set(ex=) / delete / scan_iter。"""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.data: dict[str, tuple[str, Optional[float]]] = {}
+
+    def _alive(self, key: str) -> bool:
+        entry = self.data.get(key)
+        if entry is None:
+            return False
+        if entry[1] is not None and entry[1] <= self.clock():
+            del self.data[key]
+            return False
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.data[key][0] if self._alive(key) else None
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        assert isinstance(value, str)
+        self.data[key] = (value, self.clock() + ex if ex is not None else None)
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def scan_iter(self, match: str = "*") -> AsyncIterator[str]:
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match) and self._alive(key):
+                yield key
+
+
+# --- InMemoryPrincipalCache ---
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_hit_and_miss():
+    cache = InMemoryPrincipalCache(ttl_seconds=60, max_size=10)
+
+    assert await cache.get("a") is None
+    await cache.set("a", {"id": "a"})
+    assert await cache.get("a") == {"id": "a"}
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_entries_expire_after_ttl(clock: FakeClock):
+    cache = InMemoryPrincipalCache(ttl_seconds=60, max_size=10)
+    await cache.set("a", {"id": "a"})
+
+    clock.now += 59
+    assert await cache.get("a") == {"id": "a"}
+    clock.now += 1
+    assert await cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = InMemoryPrincipalCache(ttl_seconds=60, max_size=2)
+    await cache.set("a", {"id": "a"})
+    await cache.set("b", {"id": "b"})
+    # 访问 a 之后，b 成为最久未使用的条目
+    assert await cache.get("a") is not None
+    await cache.set("c", {"id": "c"})
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"id": "a"}
+    assert await cache.get("c") == {"id": "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_invalidate_and_clear():
+    cache = InMemoryPrincipalCache(ttl_seconds=60, max_size=10)
+    await cache.set("a", {"id": "a"})
+    await cache.set("b", {"id": "b"})
+
+    await cache.invalidate("a")
+    await cache.invalidate("missing")
+    assert await cache.get("a") is None
+    assert await cache.get("b") == {"id": "b"}
+
+    await cache.clear()
+    assert await cache.get("b") is None
+
+
+# --- RedisPrincipalCache ---
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_serializes_values_as_json(clock: FakeClock):
+    client = FakeRedis(clock)
+    cache = RedisPrincipalCache(client, ttl_seconds=60)
+    user_id = uuid.uuid4()
+    created_at = datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+
+    await cache.set(str(user_id), {"id": user_id, "is_active": True, "created_at": created_at})
+
+    raw, expires_at = client.data[f"auth:principal:{user_id}"]
+    assert expires_at == clock.now + 60
+    # 非 JSON 原生类型按字符串保存，读取时得到字符串
+    assert await cache.get(str(user_id)) == {
+        "id": str(user_id),
+        "is_active": True,
+        "created_at": str(created_at),
+    }
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_entries_expire_after_ttl(clock: FakeClock):
+    cache = RedisPrincipalCache(FakeRedis(clock), ttl_seconds=60)
+    await cache.set("a", {"id": "a"})
+
+    clock.now += 60
+    assert await cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_clear_only_removes_own_prefix(clock: FakeClock):
+    client = FakeRedis(clock)
+    cache = RedisPrincipalCache(client, ttl_seconds=60)
+    await client.set("other:key", "value")
+    await cache.set("a", {"id": "a"})
+    await cache.set("b", {"id": "b"})
+
+    await cache.invalidate("a")
+    assert await cache.get("a") is None
+    assert await cache.get("b") == {"id": "b"}
+
+    await cache.clear()
+    assert await cache.get("b") is None
+    assert await client.get("other:key") == "value"
+
+
+# --- VerifiedTokenCache ---
+
+
+def test_token_cache_hit_and_miss(clock: FakeClock):
+    cache = VerifiedTokenCache(max_size=10)
+
+    assert cache.get("token", "secret") is None
+    cache.set("token", "secret", {"sub": "a"}, expires_at=clock.now + 60)
+    assert cache.get("token", "secret") == {"sub": "a"}
+    assert cache.get("other-token", "secret") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_token_cache_does_not_store_raw_tokens(clock: FakeClock):
+    cache = VerifiedTokenCache(max_size=10)
+    cache.set("raw-token", "secret", {"sub": "a"}, expires_at=clock.now + 60)
+
+    (digest,) = cache._entries
+    assert len(digest) == 32
+    assert b"raw-token" not in digest
+
+
+def test_token_cache_entries_expire_at_token_exp(clock: FakeClock):
+    cache = VerifiedTokenCache(max_size=10)
+    cache.set("token", "secret", {"sub": "a"}, expires_at=clock.now + 60)
+
+    clock.now += 59
+    assert cache.get("token", "secret") is not None
+    clock.now += 1
+    assert cache.get("token", "secret") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_token_cache_is_keyed_by_secret(clock: FakeClock):
+    cache = VerifiedTokenCache(max_size=10)
+    cache.set("token", "old-secret", {"sub": "a"}, expires_at=clock.now + 60)
+
+    # 签名密钥轮换后，同一令牌不再命中旧条目
+    assert cache.get("token", "new-secret") is None
+    assert cache.get("token", "old-secret") == {"sub": "a"}
+
+
+def test_token_cache_clear_invalidates_all_entries(clock: FakeClock):
+    cache = VerifiedTokenCache(max_size=10)
+    cache.set("a", "secret", {"sub": "a"}, expires_at=clock.now + 60)
+    cache.set("b", "secret", {"sub": "b"}, expires_at=clock.now + 60)
+
+    cache.clear()
+    assert cache.get("a", "secret") is None
+    assert cache.get("b", "secret") is None
+
+
+def test_token_cache_evicts_least_recently_used(clock: FakeClock):
+    cache = VerifiedTokenCache(max_size=2)
+    cache.set("a", "secret", {"sub": "a"}, expires_at=clock.now + 60)
+    cache.set("b", "secret", {"sub": "b"}, expires_at=clock.now + 60)
+    assert cache.get("a", "secret") is not None
+    cache.set("c", "secret", {"sub": "c"}, expires_at=clock.now + 60)
+
+    assert cache.get("b", "secret") is None
+    assert cache.get("a", "secret") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_token_cache_disabled_with_zero_size():
+    cache = VerifiedTokenCache(max_size=0)
+    cache.set("token", "secret", {"sub": "a"}, expires_at=time.time() + 60)
+
+    assert cache.get("token", "secret") is None
@@ -0,0 +1,225 @@
+import time
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import pytest
+import pytest_asyncio
+from qcloud_cos import CosConfig, CosServiceError
+from qcloud_cos import cos_auth
+from qcloud_cos.cos_auth import CosS3Auth
+
+from app.core.config import settings
+from app.providers.storage import AsyncCOSStorageService, InvalidRangeError, cos_authorization
+
+NOW = 1_700_000_000
+SECRET_ID = "AKIDtest"
+SECRET_KEY = "secret-key"
+HOST = "bucket-1250000000.cos.ap-guangzhou.myqcloud.com"
+
+
+@pytest.mark.parametrize(
+    "method, key, params, headers",
+    [
+        ("GET", "users/1/photo.png", {}, {"Host": HOST}),
+        ("PUT", "中文/a b+c.txt", {"partNumber": "1", "uploadId": "abc/def"}, {"Host": HOST, "Content-Type": "text/plain"}),
+        ("POST", "big.bin", {"uploads": ""}, {"Host": HOST, "x-cos-meta-owner": "Tom & Jerry", "Accept": "*/*"}),
+    ],
+)
+def test_cos_authorization_matches_sdk(monkeypatch: pytest.MonkeyPatch, method, key, params, headers):
+    monkeypatch.setattr(cos_auth, "time", SimpleNamespace(time=lambda: NOW))
+    config = CosConfig(Region="ap-guangzhou", SecretId=SECRET_ID, SecretKey=SECRET_KEY)
+    request = SimpleNamespace(method=method, url=f"https://{HOST}/{key}", headers=dict(headers))
+    expected = CosS3Auth(config, key, params=params, expire=600)(request).headers["Authorization"]
+
+    # SDK 只签名 filter_headers 保留的请求头
+    signed_headers = cos_auth.filter_headers(headers)
+    assert cos_authorization(SECRET_ID, SECRET_KEY, method, f"/{key}", params, signed_headers, 600, NOW) == expected
+
+
+class CosStub:
+    """httpx.MockTransport 的处理函数，记录收到的请求并按 responder 返回响应。"""
+
+    def __init__(self, responder: Callable[[httpx.Request], httpx.Response]):
+        self.responder = responder
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responder(request)
+
+    @property
+    def calls(self) -> list[tuple[str, str, dict[str, str]]]:
+        return [(r.method, r.url.path, dict(parse_qsl(r.url.query.decode(), keep_blank_values=True))) for r in self.requests]
+
+
+def _service(stub: CosStub) -> AsyncCOSStorageService:
+    cos_settings = settings.model_copy(
+        update={
+            "TENCENT_COS_BUCKET": "bucket-1250000000",
+            "TENCENT_COS_REGION": "ap-guangzhou",
+            "TENCENT_COS_SECRET_ID": SECRET_ID,
+            "TENCENT_COS_SECRET_KEY": SECRET_KEY,
+            "STORAGE_MULTIPART_RETRIES": 1,
+        }
+    )
+    service = AsyncCOSStorageService(cos_settings)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(stub))
+    return service
+
+
+@pytest_asyncio.fixture
+async def cos():
+    """返回 (stub, service)，测试中通过 stub.responder 设定响应。"""
+    stub = CosStub(lambda request: httpx.Response(200))
+    service = _service(stub)
+    yield stub, service
+    await service.close()
+
+
+async def _source(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_requests_are_signed(cos):
+    stub, service = cos
+    stub.responder = lambda request: httpx.Response(200, headers={"ETag": '"abc"'})
+
+    assert await service.upload_stream("dir/a b.txt", b"data", "text/plain")
+
+    request = stub.requests[0]
+    assert request.url == f"https://{HOST}/dir/a%20b.txt"
+    assert request.headers["content-type"] == "text/plain"
+    assert request.content == b"data"
+    authorization = dict(item.split("=", 1) for item in request.headers["authorization"].split("&"))
+    start = int(authorization["q-sign-time"].split(";")[0]) + 60
+    assert request.headers["authorization"] == cos_authorization(
+        SECRET_ID, SECRET_KEY, "PUT", "/dir/a b.txt", {}, {"host": HOST}, now=start
+    )
+    assert abs(start - time.time()) < 60
+
+
+@pytest.mark.asyncio
+async def test_get_head_delete(cos):
+    stub, service = cos
+    stub.responder = lambda request: httpx.Response(
+        204 if request.method == "DELETE" else 200,
+        headers={"ETag": '"abc"', "Content-Type": "image/png", "Last-Modified": "Tue, 14 Nov 2023 22:13:20 GMT"},
+        content=b"" if request.method in ("HEAD", "DELETE") else b"hello",
+    )
+
+    assert (await service.download_stream("a.png")).getvalue() == b"hello"
+    info = await service.head_object("a.png")
+    assert await service.delete_file("a.png")
+
+    assert [(method, path) for method, path, _ in stub.calls] == [
+        ("GET", "/a.png"), ("HEAD", "/a.png"), ("DELETE", "/a.png"),
+    ]
+    assert (info.etag, info.content_type, info.last_modified.timestamp()) == ('"abc"', "image/png", NOW)
+
+
+@pytest.mark.asyncio
+async def test_open_stream_passes_range(cos):
+    stub, service = cos
+    stub.responder = lambda request: httpx.Response(
+        206, headers={"Content-Range": "bytes 2-5/10", "Content-Length": "4"}, content=b"2345"
+    )
+
+    stream = await service.open_stream("a.bin", "bytes=2-5", chunk_size=2)
+
+    assert stub.requests[0].headers["range"] == "bytes=2-5"
+    assert (stream.content_length, stream.content_range, stream.info.size) == (4, "bytes 2-5/10", 10)
+    assert b"".join([chunk async for chunk in stream.chunks]) == b"2345"
+
+
+@pytest.mark.asyncio
+async def test_error_mapping(cos):
+    stub, service = cos
+    status = {"missing": 404, "range": 416, "broken": 500, "denied": 403}
+    stub.responder = lambda request: httpx.Response(
+        status[request.url.path.strip("/")],
+        content=b"" if request.method == "HEAD" else b"<Error><Code>Failed</Code></Error>",
+    )
+
+    assert await service.head_object("missing") is None
+    assert await service.open_stream("missing") is None
+    assert await service.download_stream("missing") is None
+    with pytest.raises(InvalidRangeError):
+        await service.open_stream("range", "bytes=100-")
+    with pytest.raises(CosServiceError) as exc_info:
+        await service.head_object("broken")
+    assert exc_info.value.get_status_code() == 500
+    assert await service.upload_stream("denied", b"x", "text/plain") is False
+    assert await service.delete_file("denied") is False
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload_sequence(cos):
+    stub, service = cos
+
+    def responder(request: httpx.Request) -> httpx.Response:
+        params = dict(parse_qsl(request.url.query.decode(), keep_blank_values=True))
+        if "uploads" in params:
+            return httpx.Response(200, content=b"<InitiateMultipartUploadResult><UploadId>u-1</UploadId></InitiateMultipartUploadResult>")
+        if "partNumber" in params:
+            return httpx.Response(200, headers={"ETag": f'"etag-{params["partNumber"]}"'})
+        return httpx.Response(200, content=b"<CompleteMultipartUploadResult/>")
+
+    stub.responder = responder
+
+    assert await service.upload_from_stream("big.bin", _source(b"0123456789"), "application/zip", part_size=4, max_concurrency=1)
+
+    assert stub.calls == [
+        ("POST", "/big.bin", {"uploads": ""}),
+        ("PUT", "/big.bin", {"partNumber": "1", "uploadId": "u-1"}),
+        ("PUT", "/big.bin", {"partNumber": "2", "uploadId": "u-1"}),
+        ("PUT", "/big.bin", {"partNumber": "3", "uploadId": "u-1"}),
+        ("POST", "/big.bin", {"uploadId": "u-1"}),
+    ]
+    assert stub.requests[0].headers["content-type"] == "application/zip"
+    assert [r.content for r in stub.requests[1:4]] == [b"0123", b"4567", b"89"]
+    body = stub.requests[-1].content.decode()
+    assert body.index("etag-1") < body.index("etag-2") < body.index("etag-3")
+    assert '<Part><PartNumber>1</PartNumber><ETag>"etag-1"</ETag></Part>' in body
+
+
+@pytest.mark.asyncio
+async def test_multipart_failure_aborts(cos):
+    stub, service = cos
+
+    def responder(request: httpx.Request) -> httpx.Response:
+        params = dict(parse_qsl(request.url.query.decode(), keep_blank_values=True))
+        if "uploads" in params:
+            return httpx.Response(200, content=b"<InitiateMultipartUploadResult><UploadId>u-1</UploadId></InitiateMultipartUploadResult>")
+        if "partNumber" in params:
+            return httpx.Response(200, headers={"ETag": '"etag"'})
+        if request.method == "POST":
+            # 合并失败时 COS 可能返回 200，错误信息在响应体中
+            return httpx.Response(200, content=b"<Error><Code>InvalidPart</Code></Error>")
+        return httpx.Response(204)
+
+    stub.responder = responder
+
+    assert await service.upload_from_stream("big.bin", _source(b"01234567"), "application/zip", part_size=4) is False
+    assert stub.calls[-1] == ("DELETE", "/big.bin", {"uploadId": "u-1"})
+
+
+@pytest.mark.asyncio
+async def test_presigned_url_is_signed_locally(cos):
+    stub, service = cos
+
+    url = await service.generate_presigned_url_for_download("dir/a.png", expiration=600)
+
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    start = int(query["q-sign-time"].split(";")[0]) + 60
+    expected = dict(
+        item.split("=", 1)
+        for item in cos_authorization(SECRET_ID, SECRET_KEY, "GET", "/dir/a.png", {}, {"host": HOST}, 600, start).split("&")
+    )
+    assert (parts.netloc, parts.path) == (HOST, "/dir/a.png")
+    assert query == expected
+    assert stub.requests == []
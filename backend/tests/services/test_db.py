@@ -0,0 +1,190 @@
+import uuid
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import db as db_module
+from app.core.cache import principal_cache
+from app.core.db import (
+    REPLICA_KEY,
+    ReplicaSelector,
+    connection_hold_histogram,
+    db_engine,
+    db_pool_stats,
+    get_db,
+    db_sessionmaker,
+    primary_bind,
+    release_connection,
+    use_primary,
+)
+from app.core.logger import new_log_context
+from app.models import Base, User
+from app.services.user_service import UserService
+
+
+@pytest.fixture
+def replicas(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    """两个 SQLite 文件充当只读副本，替换全局的副本选择器。"""
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica{index}.db") for index in range(2)]
+    monkeypatch.setattr(db_module, "replica_selector", ReplicaSelector(engines, retry_seconds=30))
+    return engines
+
+
+def _bind(session, clause=None):
+    return session.sync_session.get_bind(clause=clause)
+
+
+def test_select_goes_to_replica_and_sticks(replicas):
+    session = db_sessionmaker()
+
+    assert _bind(session, select(User)) is replicas[0].sync_engine
+    assert _bind(session, select(User.email)) is replicas[0].sync_engine
+    assert session.info[REPLICA_KEY] is replicas[0]
+    # 下一个会话轮询到另一个副本
+    assert _bind(db_sessionmaker(), select(User)) is replicas[1].sync_engine
+
+
+def test_writes_pin_the_session_to_primary(replicas):
+    session = db_sessionmaker()
+
+    assert _bind(session, insert(User)) is db_engine.sync_engine
+    # 写入之后的读取留在主库，保证读到自己的写入
+    assert _bind(session, select(User)) is db_engine.sync_engine
+
+
+@pytest.mark.parametrize(
+    "clause", [select(User).with_for_update(), update(User).values(full_name="x"), None]
+)
+def test_non_plain_selects_go_to_primary(replicas, clause):
+    assert _bind(db_sessionmaker(), clause) is db_engine.sync_engine
+
+
+def test_use_primary_pins_the_session(replicas):
+    session = db_sessionmaker()
+    use_primary(session)
+
+    assert _bind(session, select(User)) is db_engine.sync_engine
+
+
+def test_primary_bind_does_not_pin_the_session(replicas):
+    session = db_sessionmaker()
+
+    assert session.sync_session.get_bind(clause=select(User), **primary_bind()) is db_engine.sync_engine
+    assert _bind(session, select(User)) is replicas[0].sync_engine
+
+
+def test_unhealthy_replicas_fall_back_to_primary(replicas):
+    for index in range(len(replicas)):
+        db_module.replica_selector.mark_unhealthy(index)
+
+    assert _bind(db_sessionmaker(), select(User)) is db_engine.sync_engine
+
+
+def test_release_connection_ends_read_only_transaction(run):
+    async def scenario():
+        async with db_sessionmaker() as session:
+            await session.execute(select(User.id).limit(1))
+            assert session.in_transaction()
+            await release_connection(session)
+            return session.in_transaction()
+
+    assert run(scenario) is False
+
+
+def test_release_connection_keeps_pinned_or_dirty_sessions(run):
+    async def scenario():
+        async with db_sessionmaker() as pinned:
+            use_primary(pinned)
+            await pinned.execute(select(User.id).limit(1))
+            await release_connection(pinned)
+            pinned_open = pinned.in_transaction()
+
+        async with db_sessionmaker() as dirty:
+            await dirty.execute(select(User.id).limit(1))
+            dirty.add(User(full_name="Pending", email=f"{uuid.uuid4().hex}@example.com", hashed_password="x"))
+            await release_connection(dirty)
+            dirty_open = dirty.in_transaction()
+            await dirty.rollback()
+        return pinned_open, dirty_open
+
+    assert run(scenario) == (True, True)
+
+
+def test_principal_lookup_ignores_lagging_replica(run, create_user, monkeypatch: pytest.MonkeyPatch, tmp_path):
+    user = create_user()
+    user_id = uuid.UUID(user["id"])
+
+    async def scenario():
+        # 副本仍停留在停用之前的状态
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/lagging.db")
+        async with replica.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(User).values(
+                    id=user_id, full_name="Stale", email=user["email"], hashed_password="x", is_active=True
+                )
+            )
+        monkeypatch.setattr(db_module, "replica_selector", ReplicaSelector([replica], retry_seconds=30))
+        try:
+            async with db_sessionmaker() as session:
+                await session.execute(update(User).where(User.id == user_id).values(is_active=False))
+                await session.commit()
+            await principal_cache.invalidate(str(user_id))
+
+            async with db_sessionmaker() as session:
+                principal = await UserService(session).get_principal(user_id)
+                released = not session.in_transaction()
+            return principal.is_active, (await principal_cache.get(str(user_id)))["is_active"], released
+        finally:
+            await replica.dispose()
+
+    assert run(scenario) == (False, False, True)
+
+
+def _usage_totals() -> tuple[int, int]:
+    return db_pool_stats.checkouts, connection_hold_histogram.labels().snapshot()[2]
+
+
+def test_cached_principal_request_does_not_check_out_a_connection(client, create_user):
+    user = create_user()
+    # 第一次请求把认证主体写入缓存
+    assert client.get("/api/v1/users/me", headers=user["headers"]).status_code == 200
+    before = _usage_totals()
+
+    assert client.get("/api/v1/users/me", headers=user["headers"]).status_code == 200
+
+    assert _usage_totals() == before
+
+
+def test_database_request_reports_connection_usage(client, create_user):
+    admin = create_user(is_superuser=True)
+    assert client.get("/api/v1/users/me", headers=admin["headers"]).status_code == 200
+    checkouts, observations = _usage_totals()
+
+    assert client.get("/api/v1/users/", headers=admin["headers"]).status_code == 200
+
+    new_checkouts, new_observations = _usage_totals()
+    assert new_checkouts > checkouts
+    assert new_observations == observations + 1
+
+
+def test_get_db_binds_usage_to_log_context(run):
+    async def scenario():
+        contexts = []
+        for query in (False, True):
+            context = new_log_context(request_id="r")
+            dependency = get_db()
+            session = await anext(dependency)
+            if query:
+                await session.execute(select(User.id).limit(1))
+            await dependency.aclose()
+            contexts.append(context)
+        return contexts
+
+    idle, used = run(scenario)
+
+    # 未执行语句的会话不签出连接，也不写入日志字段
+    assert "db_checkouts" not in idle
+    assert used["db_checkouts"] == 1
+    assert used["db_hold_ms"] >= 0
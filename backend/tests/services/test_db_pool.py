@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.db import InstrumentedAsyncQueuePool, _engine_options, instrument_engine, pool_status
+
+
+def test_engine_options_for_postgres():
+    pool_settings = settings.model_copy(
+        update={"DB_POOL_SIZE": 7, "DB_MAX_OVERFLOW": 3, "DB_POOL_TIMEOUT": 2.5, "DB_POOL_RECYCLE": 1800, "DB_POOL_PRE_PING": True}
+    )
+
+    options = _engine_options("postgresql+asyncpg://u:p@db/app", pool_settings)
+
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_timeout"], options["pool_recycle"]) == (7, 3, 2.5, 1800)
+    assert options["pool_pre_ping"] is True
+
+
+def test_engine_options_for_pgbouncer():
+    options = _engine_options("postgresql+asyncpg://u:p@db/app", settings.model_copy(update={"DB_PGBOUNCER_MODE": True}))
+
+    # 由 PgBouncer 负责连接池，且不能使用服务端预编译语句缓存
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_name_func"]() != options["connect_args"]["prepared_statement_name_func"]()
+
+
+def test_engine_options_for_sqlite():
+    assert "poolclass" not in _engine_options("sqlite+aiosqlite:///app.db", settings)
+
+
+@pytest.mark.asyncio
+async def test_pool_telemetry(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    stats = instrument_engine(engine)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            status = pool_status(engine, stats)
+            assert (status["size"], status["checked_out"], status["checked_in"]) == (1, 1, 0)
+            # 唯一的连接被占用，再次签出在 pool_timeout 后超时
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+            await asyncio.sleep(0.01)
+
+        status = pool_status(engine, stats)
+        assert status["pool_class"] == "InstrumentedAsyncQueuePool"
+        assert (status["checkouts"], status["checkins"], status["connects"]) == (1, 1, 1)
+        assert status["checkout_timeouts"] == 1
+        assert status["max_checkout_wait_seconds"] >= 0.05
+        assert status["max_hold_seconds"] >= 0.05
+        assert (status["checked_out"], status["checked_in"]) == (0, 1)
+    finally:
+        await engine.dispose()
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import hashing
+from app.core.hashing import HashingBusyError, PasswordHashingEngine, hashing_engine
+
+
+class Workload:
+    """替换在工作线程中执行的哈希函数：记录同时运行的任务数，release 被设置前一直阻塞。"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, password: str, *args) -> tuple[str, float]:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            self.release.wait(5)
+            return f"hashed:{password}", 0.0
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def workload(monkeypatch: pytest.MonkeyPatch) -> Workload:
+    workload = Workload()
+    monkeypatch.setattr(hashing, "_hash_password", workload)
+    monkeypatch.setattr(hashing, "_verify_password", workload)
+    yield workload
+    workload.release.set()
+
+
+async def _wait_for(condition) -> None:
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_backlog_full_fails_fast(workload: Workload):
+    engine = PasswordHashingEngine(max_workers=1, max_queue=1)
+    try:
+        running = [asyncio.create_task(engine.hash(f"p{i}")) for i in range(2)]
+        await _wait_for(lambda: engine.pending == 2)
+
+        start = time.perf_counter()
+        with pytest.raises(HashingBusyError):
+            await engine.verify("p", "hash")
+        assert time.perf_counter() - start < 0.1
+
+        workload.release.set()
+        assert await asyncio.gather(*running) == ["hashed:p0", "hashed:p1"]
+        stats = engine.stats()
+        assert (stats["completed"], stats["rejected"], stats["queue_depth"]) == (2, 1, 0)
+    finally:
+        engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_batch_hashing_leaves_reserved_workers(workload: Workload):
+    engine = PasswordHashingEngine(max_workers=3, max_queue=64, reserved_workers=1)
+    try:
+        batch = asyncio.create_task(engine.hash_many([f"p{i}" for i in range(6)]))
+        await _wait_for(lambda: workload.running == 2)
+        await asyncio.sleep(0.02)
+        # 批量任务最多占用 workers - reserved_workers 个工作者，其余任务在信号量上等待而不是进入执行器队列
+        assert (workload.running, engine.pending) == (2, 2)
+
+        interactive = asyncio.create_task(engine.verify("p", "hash"))
+        await _wait_for(lambda: workload.running == 3)
+
+        workload.release.set()
+        assert await interactive == "hashed:p"
+        assert await batch == [f"hashed:p{i}" for i in range(6)]
+        assert workload.max_running == 3
+    finally:
+        engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_batch_hashing_stops_when_backlog_is_full(workload: Workload):
+    engine = PasswordHashingEngine(max_workers=2, max_queue=0, reserved_workers=0)
+    try:
+        blocker = asyncio.create_task(engine.hash("interactive"))
+        await _wait_for(lambda: engine.pending == 1)
+
+        with pytest.raises(HashingBusyError):
+            await engine.hash_many(["a", "b", "c"])
+
+        workload.release.set()
+        assert await blocker == "hashed:interactive"
+    finally:
+        engine.shutdown()
+
+
+def test_busy_hashing_returns_503(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(hashing_engine, "pending", hashing_engine.max_workers + hashing_engine.max_queue)
+
+    response = client.post(
+        "/api/v1/users/", json={"full_name": "Busy", "email": "busy@example.com", "password": "password-123"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,56 @@
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import ids
+
+
+@pytest.fixture
+def frozen_ms(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """固定 ids 模块看到的时钟（毫秒），并重置生成器状态。"""
+    clock = SimpleNamespace(ms=1_700_000_000_123)
+    monkeypatch.setattr(ids, "time", SimpleNamespace(time_ns=lambda: clock.ms * 1_000_000))
+    monkeypatch.setattr(ids, "_last_ms", 0)
+    monkeypatch.setattr(ids, "_counter", 0)
+    return clock
+
+
+def _timestamp_ms(value: uuid.UUID) -> int:
+    return value.int >> 80
+
+
+def test_version_and_variant():
+    value = ids.uuid7()
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs(_timestamp_ms(value) - time.time_ns() // 1_000_000) < 1000
+
+
+def test_embedded_timestamp(frozen_ms):
+    assert _timestamp_ms(ids.uuid7()) == frozen_ms.ms
+    frozen_ms.ms += 5
+    assert _timestamp_ms(ids.uuid7()) == frozen_ms.ms
+
+
+def test_strictly_increasing_within_one_millisecond(frozen_ms):
+    # 超过 12 位计数器的容量，计数器用尽后借用下一毫秒
+    values = [ids.uuid7() for _ in range(5000)]
+
+    assert all(a < b for a, b in zip(values, values[1:]))
+    assert len(set(values)) == len(values)
+    assert _timestamp_ms(values[0]) == frozen_ms.ms
+    assert _timestamp_ms(values[-1]) == frozen_ms.ms + 1
+    assert all(value.version == 7 and value.variant == uuid.RFC_4122 for value in values)
+
+
+def test_clock_going_backwards_keeps_order(frozen_ms):
+    first = ids.uuid7()
+    frozen_ms.ms -= 1000
+
+    second = ids.uuid7()
+
+    assert second > first
+    assert _timestamp_ms(second) == _timestamp_ms(first)
@@ -0,0 +1,57 @@
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+from app.providers.storage import LocalStorageService
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> LocalStorageService:
+    return LocalStorageService(settings.model_copy(update={"LOCAL_STORAGE_DIR": str(tmp_path)}))
+
+
+def _upload_timing() -> tuple[float, int]:
+    series = metrics_registry.histogram(
+        "storage_operation_duration_seconds", label_names=("provider", "operation")
+    ).labels(provider="local", operation="upload_from_stream")
+    _, total, count = series.snapshot()
+    return total, count
+
+
+@pytest.mark.asyncio
+async def test_upload_timing_excludes_waiting_for_the_source(storage: LocalStorageService):
+    async def slow_client() -> AsyncIterator[bytes]:
+        for chunk in (b"abc", b"def"):
+            await asyncio.sleep(0.2)
+            yield chunk
+
+    total_before, count_before = _upload_timing()
+    assert await storage.upload_from_stream("a/b.txt", slow_client(), "text/plain")
+    total_after, count_after = _upload_timing()
+
+    assert (storage.root / "a/b.txt").read_bytes() == b"abcdef"
+    assert count_after == count_before + 1
+    # 只计磁盘写入，不含两次等待数据源的 0.4 秒
+    assert total_after - total_before < 0.2
+
+
+@pytest.mark.asyncio
+async def test_writes_leave_no_files_beside_the_target(storage: LocalStorageService):
+    key = "docs/a.bin"
+    upload_id = await storage._create_multipart_upload(key, "application/zip")
+    await storage._upload_part(key, upload_id, 1, b"part-1")
+    await storage._upload_part(key, upload_id, 2, b"part-2")
+
+    # 分片在 .staging 中，目标目录里只有最终文件
+    assert not (storage.root / "docs").exists() or list((storage.root / "docs").iterdir()) == []
+    await storage._complete_multipart_upload(key, upload_id, [(1, "x"), (2, "y")])
+
+    assert [p.name for p in (storage.root / "docs").iterdir()] == ["a.bin"]
+    assert (storage.root / key).read_bytes() == b"part-1part-2"
+    assert list(storage.staging_root.iterdir()) == []
+    assert await storage.head_object(".staging") is None
+    assert await storage.open_stream(f".staging/{upload_id}/00001.part") is None
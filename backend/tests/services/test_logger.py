@@ -0,0 +1,138 @@
+import json
+import logging
+import queue
+import random
+import sys
+
+import pytest
+
+from app.core import logger as logger_module
+from app.core.logger import (
+    BoundedQueueHandler,
+    InfoSampler,
+    JsonFormatter,
+    Lazy,
+    bind_log_context,
+    new_log_context,
+)
+
+
+def _record(level: int = logging.INFO, msg: str = "hello %s", args=("world",), **extra) -> logging.LogRecord:
+    return logging.makeLogRecord(
+        {"name": "app.test", "levelno": level, "levelname": logging.getLevelName(level), "msg": msg, "args": args, **extra}
+    )
+
+
+@pytest.fixture(autouse=True)
+def log_context():
+    """每个测试结束后清除日志上下文。"""
+    token = logger_module._log_context.set(None)
+    yield
+    logger_module._log_context.reset(token)
+
+
+def test_bounded_queue_drops_info_when_full():
+    handler = BoundedQueueHandler(queue.Queue(2))
+
+    for index in range(4):
+        handler.handle(_record(msg=f"info {index}", args=None))
+
+    assert [record.msg for record in list(handler.queue.queue)] == ["info 0", "info 1"]
+    assert handler.dropped == 2
+
+
+def test_bounded_queue_keeps_warnings_by_evicting_oldest():
+    handler = BoundedQueueHandler(queue.Queue(2))
+    for index in range(2):
+        handler.handle(_record(msg=f"info {index}", args=None))
+
+    handler.handle(_record(logging.ERROR, msg="failed", args=None))
+
+    assert [record.msg for record in list(handler.queue.queue)] == ["info 1", "failed"]
+    assert handler.dropped == 1
+
+
+def test_prepare_merges_args_and_copies_context():
+    context = new_log_context(request_id="r-1", sampled=True)
+    handler = BoundedQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = _record(logging.ERROR)
+        record.exc_info = sys.exc_info()
+
+    handler.handle(record)
+    context["user_id"] = "later"
+
+    queued = handler.queue.get_nowait()
+    assert (queued.msg, queued.args) == ("hello world", None)
+    # 上下文在入队时复制，之后的修改不影响已入队的记录，sampled 标记不输出
+    assert queued.context == {"request_id": "r-1"}
+    assert queued.exc_info is None and "ValueError: boom" in queued.exc_text
+
+
+def test_info_sampler(monkeypatch: pytest.MonkeyPatch):
+    sampler = InfoSampler(0.25)
+    monkeypatch.setattr(random, "random", lambda: 0.5)
+
+    assert not sampler.filter(_record())
+    assert sampler.filter(_record(logging.WARNING))
+    assert InfoSampler(1).filter(_record())
+
+    monkeypatch.setattr(random, "random", lambda: 0.1)
+    assert sampler.filter(_record())
+
+
+def test_info_sampler_follows_request_decision(monkeypatch: pytest.MonkeyPatch):
+    sampler = InfoSampler(0.5)
+    monkeypatch.setattr(random, "random", lambda: 0.0)
+
+    new_log_context(request_id="r-1", sampled=False)
+
+    # 请求已决定丢弃时，同一请求的 INFO 日志全部丢弃，WARNING 仍保留
+    assert not sampler.filter(_record())
+    assert sampler.filter(_record(logging.WARNING))
+
+
+def test_json_formatter_fields():
+    new_log_context(request_id="r-1", method="GET")
+    bind_log_context(user_id="u-1")
+    handler = BoundedQueueHandler(queue.Queue())
+    calls = []
+    handler.handle(_record(status=200, payload=Lazy(lambda: calls.append(1) or {"a": 1}), _private="hidden"))
+    # Lazy 字段在格式化时才求值
+    assert calls == []
+
+    data = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+
+    assert calls == [1]
+    assert data.pop("ts").endswith("+00:00")
+    assert data == {
+        "level": "INFO",
+        "logger": "app.test",
+        "message": "hello world",
+        "request_id": "r-1",
+        "method": "GET",
+        "user_id": "u-1",
+        "status": 200,
+        "payload": {"a": 1},
+    }
+
+
+def test_json_formatter_errors_include_location_and_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = _record(logging.ERROR, pathname="/app/x.py", lineno=7, exc_info=sys.exc_info())
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["location"] == "/app/x.py:7"
+    assert "ValueError: boom" in data["exc_info"]
+    assert "context" not in data
+
+
+def test_bind_log_context_outside_request_is_ignored():
+    bind_log_context(user_id="u-1")
+
+    assert logger_module._log_context.get() is None
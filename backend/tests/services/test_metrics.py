@@ -0,0 +1,122 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.core import metrics
+from app.core.metrics import Histogram, MetricsRegistry, metrics_registry, start_request_phases, timed
+
+
+def test_histogram_buckets_are_upper_bounds():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(1.0, 0.1))
+    for value in (0.05, 0.1, 0.5, 1.0, 3.0):
+        histogram.observe(value)
+
+    counts, total, count = histogram.labels().snapshot()
+
+    # 边界值计入上界等于它的桶，超过最大上界的值计入 +Inf 桶
+    assert counts == [2, 2, 1]
+    assert (total, count) == (pytest.approx(4.65), 5)
+
+
+def test_histogram_collect_groups_by_labels():
+    histogram = Histogram("op_seconds", "Operations", ("operation",))
+    histogram.observe(0.2, operation="read")
+    histogram.observe(0.4, operation="read")
+
+    assert histogram.collect() == {"operation=read": {"count": 2, "sum": pytest.approx(0.6), "avg": pytest.approx(0.3)}}
+    assert Histogram("idle_seconds", "Idle").collect() == {}
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("op_seconds", "Operation latency", ("operation",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, operation='say "hi"\n')
+    histogram.observe(0.5, operation='say "hi"\n')
+    registry.register("token cache", lambda: {"hits": 3, "nested": {"ok": True}, "name": "ignored"})
+
+    lines = registry.render_prometheus().splitlines()
+
+    label = 'operation="say \\"hi\\"\\n"'
+    assert lines == [
+        "# HELP op_seconds Operation latency",
+        "# TYPE op_seconds histogram",
+        f'op_seconds_bucket{{{label},le="0.1"}} 1',
+        f'op_seconds_bucket{{{label},le="1.0"}} 2',
+        f'op_seconds_bucket{{{label},le="+Inf"}} 2',
+        f"op_seconds_sum{{{label}}} 0.55",
+        f"op_seconds_count{{{label}}} 2",
+        # 采集函数中的数值指标展开为 gauge，名称中的非法字符替换为下划线，非数值字段忽略
+        "# TYPE app_token_cache_hits gauge",
+        "app_token_cache_hits 3.0",
+        "# TYPE app_token_cache_nested_ok gauge",
+        "app_token_cache_nested_ok 1.0",
+    ]
+
+
+def test_registry_returns_the_same_histogram():
+    registry = MetricsRegistry()
+
+    assert registry.histogram("a_seconds") is registry.histogram("a_seconds")
+    assert "a_seconds" in registry.collect()
+
+
+def _series(name: str, **labels):
+    return metrics_registry.histogram(name, label_names=tuple(labels)).labels(**labels)
+
+
+def test_timed_decorates_sync_and_async_functions():
+    name = f"test_{uuid.uuid4().hex}_seconds"
+
+    @timed(name, operation="sync")
+    def sync_call():
+        return "sync"
+
+    @timed(name, operation="async")
+    async def async_call():
+        await asyncio.sleep(0.01)
+        return "async"
+
+    assert sync_call() == "sync"
+    assert asyncio.run(async_call()) == "async"
+
+    assert _series(name, operation="sync").snapshot()[2] == 1
+    _, total, count = _series(name, operation="async").snapshot()
+    assert count == 1 and total >= 0.01
+
+
+def test_timed_context_manager_records_request_phase():
+    name = f"test_{uuid.uuid4().hex}_seconds"
+
+    async def scenario():
+        phases = start_request_phases()
+        async with timed(name, phase="storage"):
+            # 同一阶段嵌套时只按最外层计时
+            with timed(name, phase="storage"):
+                await asyncio.sleep(0.01)
+        return phases
+
+    phases = asyncio.run(scenario())
+
+    assert list(phases.totals) == ["storage"]
+    assert phases.totals["storage"] >= 10_000_000
+    assert _series(name).snapshot()[2] == 2
+
+
+def test_timed_sampling_still_records_phase(monkeypatch: pytest.MonkeyPatch):
+    name = f"test_{uuid.uuid4().hex}_seconds"
+    samples = iter([0.9, 0.1])
+    monkeypatch.setattr(metrics.random, "random", lambda: next(samples))
+
+    async def scenario():
+        phases = start_request_phases()
+        for _ in range(2):
+            with timed(name, sample_rate=0.5, phase="hash"):
+                pass
+        return phases
+
+    phases = asyncio.run(scenario())
+
+    # 第一次调用被采样丢弃，阶段耗时不受采样影响
+    assert _series(name).snapshot()[2] == 1
+    assert "hash" in phases.totals
@@ -0,0 +1,106 @@
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+
+from app.core.config import settings
+from tests.fakes import MemoryStorageService
+
+pytestmark = pytest.mark.asyncio
+
+DATA = bytes(range(256)) * 4
+
+
+class FlakyStorage(MemoryStorageService):
+    """前 failures_left 次上传分片失败，分片最多尝试两次。"""
+
+    def __init__(self, failures_left: int, **kwargs):
+        super().__init__(settings.model_copy(update={"STORAGE_MULTIPART_RETRIES": 2}), **kwargs)
+        self.failures_left = failures_left
+
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        if self.failures_left:
+            self.failures_left -= 1
+            await self._call("upload_part")
+            raise ConnectionError("connection reset")
+        return await super()._upload_part(key, upload_id, part_number, data)
+
+
+async def _source(data: bytes, chunk_size: int = 10) -> AsyncIterator[bytes]:
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+
+async def test_parts_are_uploaded_within_the_window():
+    storage = MemoryStorageService(delay=0.01)
+    buffered = []
+
+    async def source() -> AsyncIterator[bytes]:
+        read = 0
+        async for chunk in _source(DATA):
+            uploaded = sum(len(part) for parts in storage.uploads.values() for part in parts.values())
+            buffered.append(read - uploaded)
+            read += len(chunk)
+            yield chunk
+
+    assert await storage.upload_from_stream("big.bin", source(), "application/zip", part_size=100, max_concurrency=2)
+
+    assert storage.objects["big.bin"][0] == DATA
+    assert (storage.calls["upload_part"], storage.calls["upload_stream"]) == (11, 0)
+    assert storage.max_active["upload_part"] == 2
+    # 在途分片达到上限时停止读取数据源：已读取未上传的数据不超过 (max_concurrency + 1) 个分片
+    assert max(buffered) <= 3 * 100
+
+
+async def test_failed_part_aborts_the_upload():
+    storage = FlakyStorage(failures_left=2)
+
+    assert not await storage.upload_from_stream("big.bin", _source(DATA), "application/zip", part_size=100, max_concurrency=1)
+
+    assert storage.aborted == ["upload-1"]
+    assert storage.calls["complete_multipart_upload"] == 0
+    assert "big.bin" not in storage.objects and storage.uploads == {}
+
+
+async def test_failed_part_is_retried():
+    storage = FlakyStorage(failures_left=1)
+
+    assert await storage.upload_from_stream("big.bin", _source(DATA), "application/zip", part_size=400)
+
+    assert storage.objects["big.bin"][0] == DATA
+    assert storage.calls["upload_part"] == 4
+    assert storage.aborted == []
+
+
+async def test_failed_complete_aborts_and_survives_abort_errors():
+    storage = MemoryStorageService()
+    storage.failures["complete_multipart_upload"] = RuntimeError("invalid part order")
+    storage.failures["abort_multipart_upload"] = RuntimeError("abort failed")
+
+    assert not await storage.upload_from_stream("big.bin", _source(DATA), "application/zip", part_size=400)
+
+    assert storage.calls["abort_multipart_upload"] == 1
+    assert "big.bin" not in storage.objects
+
+
+async def test_cancelled_upload_is_aborted():
+    storage = MemoryStorageService(delay=0.05)
+
+    task = asyncio.create_task(storage.upload_from_stream("big.bin", _source(DATA), "application/zip", part_size=100))
+    while not storage.calls["upload_part"]:
+        await asyncio.sleep(0.005)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert storage.aborted == ["upload-1"]
+
+
+@pytest.mark.parametrize("data", [b"", b"small", DATA])
+async def test_single_part_falls_back_to_plain_upload(data):
+    storage = MemoryStorageService()
+
+    assert await storage.upload_from_stream("small.bin", _source(data), "text/plain", part_size=len(DATA))
+
+    assert storage.objects["small.bin"] == (data, "text/plain")
+    assert (storage.calls["upload_stream"], storage.calls["create_multipart_upload"]) == (1, 0)
@@ -0,0 +1,147 @@
+import uuid
+
+import alembic
+import pytest
+import sqlalchemy as sa
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+
+from app.core import online_migrations
+from app.core.online_migrations import backfill, ensure_tasks_table, register_task, run_task, tasks_table
+
+PAYLOAD = {"table": "items", "values": {"label": "'done'"}, "where": None, "key": "id", "batch_size": 2, "sleep_seconds": 0}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/migrations.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def conn(engine):
+    """自动提交模式下的连接，已创建任务表。"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        ensure_tasks_table(connection)
+        yield connection
+
+
+def _create_items(conn, key_type: sa.types.TypeEngine, keys: list) -> sa.Table:
+    items = sa.Table(
+        "items", sa.MetaData(), sa.Column("id", key_type, primary_key=True), sa.Column("label", sa.String(16))
+    )
+    items.create(conn)
+    conn.execute(items.insert(), [{"id": key, "label": None} for key in keys])
+    return items
+
+
+def _task(conn, name: str) -> sa.Row:
+    return conn.execute(sa.select(tasks_table).where(tasks_table.c.name == name)).one()
+
+
+def _labels(conn, items: sa.Table) -> list:
+    return [label for label, in conn.execute(sa.select(items.c.label).order_by(items.c.id))]
+
+
+def test_run_task_status_transitions(conn, monkeypatch: pytest.MonkeyPatch):
+    items = _create_items(conn, sa.Integer(), list(range(1, 6)))
+    register_task(conn, "fill", "backfill", PAYLOAD)
+    assert (_task(conn, "fill").status, _task(conn, "fill").rows_done) == ("pending", 0)
+
+    statuses = []
+    run_backfill = online_migrations._run_backfill
+
+    def observe(conn, name, *args):
+        statuses.append(_task(conn, name).status)
+        run_backfill(conn, name, *args)
+
+    monkeypatch.setattr(online_migrations, "_run_backfill", observe)
+    run_task(conn, "fill")
+
+    task = _task(conn, "fill")
+    assert statuses == ["running"]
+    assert (task.status, task.rows_done, task.last_key) == ("done", 5, "5")
+    assert _labels(conn, items) == ["done"] * 5
+
+    # 已完成的任务不再执行
+    run_task(conn, "fill")
+    assert statuses == ["running"]
+
+
+def test_failed_task_stays_running_and_keeps_progress(conn, monkeypatch: pytest.MonkeyPatch):
+    _create_items(conn, sa.Integer(), list(range(1, 6)))
+    register_task(conn, "fill", "backfill", PAYLOAD)
+    updates = 0
+    update_task = online_migrations._update_task
+
+    def fail_after_first_batch(conn, name, **values):
+        nonlocal updates
+        if "last_key" in values:
+            updates += 1
+            if updates == 2:
+                raise RuntimeError("interrupted")
+        update_task(conn, name, **values)
+
+    monkeypatch.setattr(online_migrations, "_update_task", fail_after_first_batch)
+    with pytest.raises(RuntimeError):
+        run_task(conn, "fill")
+
+    task = _task(conn, "fill")
+    assert (task.status, task.last_key, task.rows_done) == ("running", "2", 2)
+
+
+def test_backfill_resumes_after_saved_key(conn):
+    items = _create_items(conn, sa.Integer(), list(range(1, 8)))
+    register_task(conn, "fill", "backfill", PAYLOAD)
+    conn.execute(tasks_table.update().values(last_key="3", rows_done=3))
+
+    run_task(conn, "fill")
+
+    assert _labels(conn, items) == [None] * 3 + ["done"] * 4
+    assert (_task(conn, "fill").rows_done, _task(conn, "fill").last_key) == (7, "7")
+
+
+def test_resume_key_is_bound_with_the_column_type(conn, monkeypatch: pytest.MonkeyPatch):
+    keys = sorted(uuid.uuid4() for _ in range(5))
+    items = _create_items(conn, sa.Uuid(), keys)
+    # 模拟 PostgreSQL 下反射得到的 uuid 类型；SQLite 中 Uuid 以 32 位十六进制存储，字符串形式的 last_key 无法直接比较
+    monkeypatch.setattr(online_migrations, "_key_column", lambda conn, table, key: items.c[key])
+    register_task(conn, "fill", "backfill", PAYLOAD)
+    conn.execute(tasks_table.update().values(last_key=str(keys[1])))
+
+    run_task(conn, "fill")
+
+    assert _labels(conn, items) == [None, None, "done", "done", "done"]
+    assert _task(conn, "fill").last_key == str(keys[-1])
+
+
+@pytest.fixture
+def migration(engine, monkeypatch: pytest.MonkeyPatch):
+    """在 alembic 迁移的事务中执行（与 alembic/env.py 相同），x_args 模拟命令行的 -x 参数。"""
+    x_args: dict[str, str] = {}
+    monkeypatch.setattr(alembic.context, "is_offline_mode", lambda: False, raising=False)
+    monkeypatch.setattr(alembic.context, "get_x_argument", lambda as_dictionary=False: x_args, raising=False)
+    with engine.connect() as connection:
+        migration_context = MigrationContext.configure(connection)
+        with Operations.context(migration_context), migration_context.begin_transaction():
+            yield x_args
+
+
+def test_defer_mode_only_registers_the_task(conn, migration):
+    items = _create_items(conn, sa.Integer(), [1, 2])
+    migration["online"] = "defer"
+
+    backfill("fill", "items", {"label": "'done'"})
+
+    assert _task(conn, "fill").status == "pending"
+    assert _labels(conn, items) == [None, None]
+
+
+def test_schedule_runs_immediately_by_default(conn, migration):
+    items = _create_items(conn, sa.Integer(), [1, 2])
+
+    backfill("fill", "items", {"label": "'done'"}, where="label IS NULL", sleep_seconds=0)
+
+    assert _task(conn, "fill").status == "done"
+    assert _labels(conn, items) == ["done", "done"]
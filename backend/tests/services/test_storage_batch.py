@@ -0,0 +1,108 @@
+import pytest
+
+from app.core.config import settings
+from app.providers import storage as storage_module
+from tests.fakes import MemoryStorageService
+
+pytestmark = pytest.mark.asyncio
+
+
+class BatchStorage(MemoryStorageService):
+    """记录每次批量删除的 key，failing 中的 key 删除或读取元数据时失败。"""
+
+    def __init__(self, **kwargs):
+        super().__init__(settings.model_copy(update={"STORAGE_BATCH_CONCURRENCY": 3}), **kwargs)
+        self.batches: list[list[str]] = []
+        self.failing: set[str] = set()
+
+    async def _delete_objects(self, keys: list[str]) -> dict[str, str]:
+        self.batches.append(keys)
+        return await super()._delete_objects(keys)
+
+    async def delete_file(self, key: str) -> bool:
+        return key not in self.failing and await super().delete_file(key)
+
+    async def head_object(self, key: str):
+        if key in self.failing:
+            await self._call("head_object")
+            raise ConnectionError(f"cannot read {key}")
+        return await super().head_object(key)
+
+
+async def test_delete_files_chunks_and_reports_each_key(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(storage_module, "DELETE_BATCH_SIZE", 4)
+    storage = BatchStorage(delay=0.01)
+    keys = [f"k{i}" for i in range(10)]
+    for key in keys:
+        storage.put(key, b"x")
+    storage.failing = {"k1", "k8"}
+
+    results = await storage.delete_files([*keys, "k0"])
+
+    # 重复的 key 只删除一次，按批大小切分
+    assert [len(batch) for batch in storage.batches] == [4, 4, 2]
+    assert list(results) == keys
+    assert {key for key, result in results.items() if not result.ok} == {"k1", "k8"}
+    assert results["k1"].error == "Delete failed"
+    assert set(storage.objects) == {"k1", "k8"}
+    # 单个批次内逐个删除的并发不超过 STORAGE_BATCH_CONCURRENCY
+    assert storage.max_active["delete_file"] == 3
+
+
+async def test_failed_delete_batch_only_fails_its_own_keys(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(storage_module, "DELETE_BATCH_SIZE", 2)
+    storage = BatchStorage()
+    for key in "abcde":
+        storage.put(key, b"x")
+    delete_objects = storage._delete_objects
+
+    async def fail_second_batch(keys: list[str]) -> dict[str, str]:
+        if len(storage.batches) == 1:
+            storage.batches.append(keys)
+            raise ConnectionError("batch rejected")
+        return await delete_objects(keys)
+
+    monkeypatch.setattr(storage, "_delete_objects", fail_second_batch)
+
+    results = await storage.delete_files(list("abcde"))
+
+    assert {key: result.ok for key, result in results.items()} == {"a": True, "b": True, "c": False, "d": False, "e": True}
+    assert results["c"].error == "batch rejected"
+    assert set(storage.objects) == {"c", "d"}
+
+
+async def test_head_objects_bounds_concurrency_and_reports_each_key():
+    storage = BatchStorage(delay=0.01)
+    for key in ("a", "b", "c", "d"):
+        storage.put(key, key.encode() * 2)
+    storage.failing = {"b"}
+
+    results = await storage.head_objects(["a", "b", "c", "missing", "d", "a"], max_concurrency=2)
+
+    assert list(results) == ["a", "b", "c", "missing", "d"]
+    assert (results["a"].ok, results["a"].value.size) == (True, 2)
+    assert (results["b"].ok, results["b"].error) == (False, "cannot read b")
+    assert (results["missing"].ok, results["missing"].error) == (False, "NotFound")
+    assert storage.max_active["head_object"] == 2
+
+
+async def test_head_objects_defaults_to_configured_concurrency():
+    storage = BatchStorage(delay=0.01)
+    keys = [f"k{i}" for i in range(10)]
+    for key in keys:
+        storage.put(key, b"x")
+
+    results = await storage.head_objects(keys)
+
+    assert all(result.ok for result in results.values())
+    assert storage.max_active["head_object"] == 3
+
+
+async def test_presigned_urls_report_each_key():
+    storage = BatchStorage()
+
+    results = await storage.generate_presigned_urls_for_download(["a", "invalid/b", "c"], expiration=60)
+
+    assert results["a"].ok and results["a"].value == "https://storage.test/a?expires=60"
+    assert (results["invalid/b"].ok, results["invalid/b"].error) == (False, "Presign failed")
+    assert results["c"].ok
@@ -0,0 +1,222 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.providers.storage import CachedStorageService
+from tests.fakes import MemoryStorageService
+
+pytestmark = pytest.mark.asyncio
+
+
+def _make_cache(tmp_path: Path, **overrides) -> tuple[CachedStorageService, MemoryStorageService]:
+    cache_settings = settings.model_copy(
+        update={
+            "STORAGE_CACHE_MAX_BYTES": 1024,
+            "STORAGE_CACHE_MAX_OBJECT_BYTES": 1024,
+            "STORAGE_CACHE_VALIDATE_SECONDS": 3600,
+            **overrides,
+        }
+    )
+    inner = MemoryStorageService(cache_settings)
+    return CachedStorageService(inner, cache_settings, cache_dir=str(tmp_path)), inner
+
+
+async def _read(cache: CachedStorageService, key: str) -> bytes:
+    stream = await cache.open_stream(key)
+    return b"".join([bytes(chunk) async for chunk in stream.chunks])
+
+
+@pytest_asyncio.fixture
+async def cache(tmp_path: Path):
+    cache, inner = _make_cache(tmp_path)
+    yield cache, inner
+    await cache.close()
+
+
+async def test_hit_after_miss(cache):
+    cache, inner = cache
+    inner.put("a", b"hello")
+
+    assert await _read(cache, "a") == b"hello"
+    assert await _read(cache, "a") == b"hello"
+    assert (await cache.download_stream("a")).getvalue() == b"hello"
+
+    assert inner.calls["open_stream"] == 1
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["entries"], stats["size_bytes"]) == (1, 2, 1, 5)
+
+
+async def test_cached_range_read(cache):
+    cache, inner = cache
+    inner.put("a", b"0123456789")
+    await _read(cache, "a")
+
+    stream = await cache.open_stream("a", "bytes=2-5")
+    assert stream.content_range == "bytes 2-5/10"
+    assert b"".join([bytes(chunk) async for chunk in stream.chunks]) == b"2345"
+
+
+async def test_concurrent_misses_are_coalesced(cache):
+    cache, inner = cache
+    inner.put("a", b"hello")
+    inner.gate = asyncio.Event()
+
+    readers = [asyncio.create_task(_read(cache, "a")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert inner.calls["open_stream"] == 1
+    inner.gate.set()
+
+    assert await asyncio.gather(*readers) == [b"hello"] * 3
+    assert inner.calls["open_stream"] == 1
+    assert (cache.stats()["misses"], cache.stats()["coalesced"]) == (1, 2)
+
+
+async def test_lru_eviction_at_byte_bound(tmp_path: Path):
+    cache, inner = _make_cache(tmp_path, STORAGE_CACHE_MAX_BYTES=10)
+    for key in "abc":
+        inner.put(key, key.encode() * 4)
+
+    await _read(cache, "a")
+    await _read(cache, "b")
+    await _read(cache, "a")
+    b_path = cache._path("b")
+    await _read(cache, "c")
+
+    # 超过 10 字节上限时淘汰最久未使用的 b，缓存文件一并删除
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] == 8
+    assert not b_path.exists()
+    assert await _read(cache, "b") == b"bbbb"
+    assert inner.calls["open_stream"] == 4
+    await cache.close()
+
+
+async def test_revalidation_keeps_unchanged_object(tmp_path: Path):
+    cache, inner = _make_cache(tmp_path, STORAGE_CACHE_VALIDATE_SECONDS=0)
+    inner.put("a", b"v1")
+    await _read(cache, "a")
+
+    assert await _read(cache, "a") == b"v1"
+    assert inner.calls["head_object"] == 1
+    assert inner.calls["open_stream"] == 1
+    assert (cache.stats()["validations"], cache.stats()["stale"]) == (1, 0)
+    await cache.close()
+
+
+async def test_revalidation_refetches_changed_object(tmp_path: Path):
+    cache, inner = _make_cache(tmp_path, STORAGE_CACHE_VALIDATE_SECONDS=0)
+    inner.put("a", b"v1")
+    await _read(cache, "a")
+    # 绕过缓存直接修改底层对象，ETag 随之变化
+    inner.put("a", b"v2")
+
+    assert await _read(cache, "a") == b"v2"
+    assert cache.stats()["stale"] == 1
+    assert inner.calls["open_stream"] == 2
+    await cache.close()
+
+
+async def test_revalidation_error_serves_cached_copy(tmp_path: Path):
+    cache, inner = _make_cache(tmp_path, STORAGE_CACHE_VALIDATE_SECONDS=0)
+    inner.put("a", b"v1")
+    await _read(cache, "a")
+    inner.failures["head_object"] = ConnectionError("storage unavailable")
+
+    assert await _read(cache, "a") == b"v1"
+    assert cache.stats()["validation_errors"] == 1
+    assert inner.calls["open_stream"] == 1
+    await cache.close()
+
+
+@pytest.mark.parametrize("operation", ["upload", "delete"])
+async def test_write_during_fetch_is_not_cached(cache, operation: str):
+    cache, inner = cache
+    inner.put("a", b"old")
+    inner.gate = asyncio.Event()
+
+    reader = asyncio.create_task(cache.download_stream("a"))
+    await asyncio.sleep(0.01)
+    if operation == "upload":
+        assert await cache.upload_stream("a", b"new", "text/plain")
+    else:
+        assert await cache.delete_file("a")
+    inner.gate.set()
+    await reader
+
+    # 回源期间被失效的下载结果不写入缓存
+    assert cache.stats()["entries"] == 0
+    assert cache._dirty == set()
+    inner.gate = None
+    if operation == "upload":
+        assert await _read(cache, "a") == b"new"
+        assert cache.stats()["entries"] == 1
+    else:
+        assert await cache.open_stream("a") is None
+
+
+async def test_write_invalidates_cached_object(cache):
+    cache, inner = cache
+    inner.put("a", b"old")
+    await _read(cache, "a")
+
+    await cache.upload_stream("a", b"new", "text/plain")
+
+    assert await _read(cache, "a") == b"new"
+    assert inner.calls["open_stream"] == 2
+
+
+async def test_oversized_objects_bypass_the_cache(tmp_path: Path):
+    cache, inner = _make_cache(tmp_path, STORAGE_CACHE_MAX_OBJECT_BYTES=4)
+    inner.put("big", b"0123456789")
+
+    assert await _read(cache, "big") == b"0123456789"
+    assert await _read(cache, "big") == b"0123456789"
+
+    # 第一次回源发现超限后直接转发，不再尝试缓存
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bypassed"] == 1
+    assert inner.calls["open_stream"] == 3
+    assert [path.name for path in cache.cache_dir.iterdir()] == [".lock"]
+    await cache.close()
+
+
+async def test_each_process_uses_its_own_directory(tmp_path: Path):
+    first, first_inner = _make_cache(tmp_path)
+    first_inner.put("a", b"first")
+    await _read(first, "a")
+
+    second, second_inner = _make_cache(tmp_path)
+    second_inner.put("a", b"second")
+    await _read(second, "a")
+
+    # 同一目录下的另一个实例启动时不会清理或覆盖仍在使用的缓存文件
+    assert first.cache_dir != second.cache_dir
+    assert first._path("a").read_bytes() == b"first"
+    assert await _read(first, "a") == b"first"
+
+    await first.close()
+    assert not first.cache_dir.exists()
+    assert second._path("a").read_bytes() == b"second"
+    await second.close()
+
+
+async def test_leftover_directories_are_cleaned_up(tmp_path: Path):
+    objects = tmp_path / "objects"
+    stale = objects / "12345-deadbeef"
+    stale.mkdir(parents=True)
+    (stale / ".lock").touch()
+    (stale / ("0" * 64)).write_bytes(b"stale")
+    legacy = objects / ("f" * 64)
+    legacy.write_bytes(b"legacy")
+    unrelated = objects / "keep.txt"
+    unrelated.write_bytes(b"keep")
+
+    cache, _ = _make_cache(tmp_path)
+
+    assert not stale.exists()
+    assert not legacy.exists()
+    assert unrelated.exists()
+    await cache.close()
@@ -0,0 +1,109 @@
+from typing import Optional
+
+import httpx
+import pytest
+
+from app.api.deps import get_storage_service
+from app.core.config import settings
+from app.providers.storage import (
+    AsyncCOSStorageService,
+    CachedStorageService,
+    LocalStorageService,
+    S3StorageService,
+    StorageFactory,
+)
+from tests.fakes import MemoryStorageService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def instances(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """替换共享实例表，测试结束后恢复应用使用的实例。"""
+    instances = {}
+    monkeypatch.setattr(StorageFactory, "_instances", instances)
+    return instances
+
+
+class ClosingStorage(MemoryStorageService):
+    def __init__(self, error: Optional[Exception] = None):
+        super().__init__()
+        self.closed = 0
+        self.error = error
+
+    async def close(self) -> None:
+        self.closed += 1
+        if self.error is not None:
+            raise self.error
+
+
+async def test_shared_service_is_created_once(instances, tmp_path):
+    local_settings = settings.model_copy(update={"LOCAL_STORAGE_DIR": str(tmp_path)})
+
+    service = StorageFactory.get_shared_service("LOCAL", local_settings)
+
+    assert isinstance(service, LocalStorageService)
+    assert StorageFactory.get_shared_service("local", local_settings) is service
+    assert instances == {"local": service}
+
+
+async def test_dependency_returns_the_shared_service(client):
+    # 应用启动时已创建共享实例，请求间复用
+    assert get_storage_service() is StorageFactory._instances[settings.STORAGE_PROVIDER]
+    assert get_storage_service() is get_storage_service()
+
+
+async def test_close_all_closes_every_instance_and_clears(instances):
+    failing, healthy = ClosingStorage(RuntimeError("close failed")), ClosingStorage()
+    instances.update({"a": failing, "b": healthy})
+
+    await StorageFactory.close_all()
+
+    # 某个实例关闭失败不影响其余实例
+    assert (failing.closed, healthy.closed) == (1, 1)
+    assert instances == {}
+
+
+async def test_remote_service_is_wrapped_with_cache(instances, tmp_path):
+    cache_settings = settings.model_copy(update={"STORAGE_CACHE_ENABLED": True, "STORAGE_CACHE_DIR": str(tmp_path)})
+
+    service = StorageFactory.get_shared_service("cos_async", cache_settings)
+    await service.start()
+    try:
+        assert isinstance(service, CachedStorageService)
+        assert isinstance(service.inner, AsyncCOSStorageService)
+        assert service.inner._client is not None
+    finally:
+        await StorageFactory.close_all()
+    assert service.inner._client is None
+
+
+async def test_async_cos_client_lifecycle():
+    service = AsyncCOSStorageService(settings)
+    assert service._client is None
+
+    await service.start()
+    client = service._client
+    await service.start()
+
+    assert isinstance(client, httpx.AsyncClient)
+    assert service._get_client() is client
+    await service.close()
+    assert client.is_closed and service._client is None
+    # 关闭后再次使用时重新创建客户端
+    assert service._get_client() is not client
+    await service.close()
+
+
+async def test_s3_client_lifecycle():
+    service = S3StorageService(settings)
+
+    await service.start()
+    client = await service._get_client()
+
+    assert await service._get_client() is client
+    await service.close()
+    assert service._client is None
+    await service.start()
+    assert await service._get_client() is not client
+    await service.close()
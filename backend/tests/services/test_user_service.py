@@ -0,0 +1,130 @@
+import datetime
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import principal_cache
+from app.core.db import db_sessionmaker
+from app.core.revocation import revocation_filter
+from app.schemas import UserCreate, UserUpdate
+from app.services.user_service import UserService, decode_cursor, encode_cursor
+from tests.utils import TEST_PASSWORD
+
+
+def test_cursor_round_trip():
+    created_at = datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)
+    user_id = uuid.uuid4()
+
+    cursor = encode_cursor(created_at, user_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, user_id)
+
+
+def test_cursor_round_trip_without_timezone():
+    created_at = datetime.datetime(2025, 1, 2, 3, 4, 5)
+    user_id = uuid.uuid4()
+
+    assert decode_cursor(encode_cursor(created_at, user_id)) == (created_at, user_id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not-a-cursor",
+        "W10",  # []
+        "WyJ4IiwgInkiXQ",  # ["x", "y"]
+        "eyJhIjogMX0",  # {"a": 1}
+    ],
+)
+def test_invalid_cursor_raises_value_error(cursor: str):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+@pytest.fixture(params=["returning", "fallback"])
+def service_call(request: pytest.FixtureRequest, run, monkeypatch: pytest.MonkeyPatch):
+    """
+    在新会话中调用 UserService 的方法。
+    fallback 模式下把方言声明为不支持 RETURNING，走先查询再写入的分支。
+    """
+    if request.param == "fallback":
+        dialect = UserService._dialect
+        monkeypatch.setattr(
+            UserService,
+            "_dialect",
+            lambda self: SimpleNamespace(name=dialect(self).name, insert_returning=False, update_returning=False),
+        )
+
+    def call(method: str, *args, **kwargs):
+        async def scenario():
+            async with db_sessionmaker() as session:
+                return await getattr(UserService(session), method)(*args, **kwargs)
+
+        return run(scenario)
+
+    return call
+
+
+def _new_user(service_call, email: str | None = None):
+    email = email or f"service-{uuid.uuid4().hex[:12]}@example.com"
+    return service_call("create_user", UserCreate(full_name="Service User", email=email, password=TEST_PASSWORD))
+
+
+def test_create_user_rejects_duplicate_email(service_call):
+    user = _new_user(service_call)
+
+    assert (user.is_active, user.token_version) == (True, 0)
+    with pytest.raises(Exception, match="Email already registered"):
+        _new_user(service_call, user.email)
+
+
+def test_update_missing_user(service_call):
+    with pytest.raises(Exception, match="User not found"):
+        service_call("update_user", uuid.uuid4(), UserUpdate(full_name="Nobody", email="nobody@example.com"))
+
+
+def test_update_email_conflict(service_call):
+    first, second = _new_user(service_call), _new_user(service_call)
+
+    with pytest.raises(Exception, match="already registered to another user"):
+        service_call("update_user", second.id, UserUpdate(full_name=second.full_name, email=first.email))
+
+
+@pytest.mark.parametrize(
+    "change, bumped",
+    [
+        ({"full_name": "Renamed"}, False),
+        ({"email": "new"}, True),
+        ({"password": "another-password"}, True),
+        ({"is_active": False}, True),
+    ],
+)
+def test_token_version_bumps_only_on_credential_changes(service_call, change: dict, bumped: bool):
+    user = _new_user(service_call)
+    change = dict(change)
+    if change.get("email") == "new":
+        change["email"] = f"changed-{uuid.uuid4().hex[:12]}@example.com"
+    user_id = str(user.id)
+
+    updated = service_call(
+        "update_user", user.id, UserUpdate(**{"full_name": user.full_name, "email": user.email, **change})
+    )
+
+    assert updated.token_version == user.token_version + int(bumped)
+    assert revocation_filter.is_revoked(user_id, user.token_version) is bumped
+    assert updated.full_name == change.get("full_name", user.full_name)
+
+
+def test_update_invalidates_cached_principal(service_call, run):
+    user = _new_user(service_call)
+    user_id = str(user.id)
+    service_call("get_principal", user.id)
+    assert (run(principal_cache.get, user_id))["full_name"] == "Service User"
+
+    service_call("update_user", user.id, UserUpdate(full_name="Renamed", email=user.email))
+
+    assert run(principal_cache.get, user_id) is None
+    assert service_call("get_principal", user.id).full_name == "Renamed"
@@ -0,0 +1,17 @@
+"""测试辅助函数"""
+
+from fastapi.testclient import TestClient
+
+TEST_PASSWORD = "password-123"
+
+
+def login(client: TestClient, email: str, password: str = TEST_PASSWORD) -> dict:
+    response = client.post(
+        "/api/v1/login/access-token", data={"username": email, "password": password}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}